@@ -0,0 +1,94 @@
+"""Peak memory of the data preparation pipeline
+
+Measures the peak memory needed to prepare a training dataframe with `full_pipeline`, including the raw dataframe
+itself, as a multiple of the size of the raw dataframe. Each measurement runs in a fresh process so the peak resident
+set size (RSS) only reflects that run.
+
+Usage:
+    python benchmarks/full_pipeline_memory.py [number of rows]
+
+This uses the `resource` module, so it only runs on unix-like systems.
+"""
+import multiprocessing
+import resource
+import sys
+
+import numpy as np
+import pandas as pd
+
+import healthcareai.pipelines.data_preparation as hcai_pipelines
+
+
+def make_training_dataframe(rows, seed=0):
+    """Build a synthetic training dataframe with missing numeric and categorical values."""
+    random = np.random.RandomState(seed)
+
+    dataframe = pd.DataFrame({'PatientEncounterID': np.arange(rows)})
+    for i in range(10):
+        numeric = random.normal(size=rows)
+        numeric[random.rand(rows) < 0.05] = np.nan
+        dataframe['Numeric{}'.format(i)] = numeric
+
+    for i in range(4):
+        categorical = random.choice(['Level A', 'Level B', 'Level C', 'Level D', 'Level E'], size=rows).astype(object)
+        categorical[random.rand(rows) < 0.05] = None
+        dataframe['Category{}'.format(i)] = categorical
+
+    dataframe['AdmitDTS'] = '2017-01-01'
+    dataframe['ThirtyDayReadmitFLG'] = random.choice(['Y', 'N'], size=rows)
+
+    return dataframe
+
+
+def _peak_rss_bytes():
+    """The peak resident set size of this process in bytes (linux reports kilobytes, macOS bytes)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _measure(rows, impute, queue):
+    # At this point the peak is just the interpreter and the libraries
+    rss_before = _peak_rss_bytes()
+
+    dataframe = make_training_dataframe(rows)
+    input_bytes = dataframe.memory_usage(deep=True).sum()
+
+    pipeline = hcai_pipelines.full_pipeline('classification', 'ThirtyDayReadmitFLG', 'PatientEncounterID',
+                                            impute=impute, verbose=False)
+    pipeline.fit_transform(dataframe)
+
+    queue.put((input_bytes, _peak_rss_bytes() - rss_before))
+
+
+def measure_peak_memory(rows, impute=True):
+    """
+    Measure the peak memory needed to hold a synthetic dataframe and prepare it with `full_pipeline`.
+
+    Args:
+        rows (int): The number of rows of synthetic training data
+        impute (bool): True to impute missing values, False to drop rows with missing values
+
+    Returns:
+        tuple: The size of the raw dataframe in bytes and the peak RSS in bytes (not counting the interpreter and
+            libraries) while preparing it
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(rows, impute, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    for impute in [True, False]:
+        input_bytes, peak_bytes = measure_peak_memory(rows, impute=impute)
+        print('full_pipeline (impute={}) on {:,} rows: input {:.1f} MB, peak RSS {:.1f} MB ({:.2f}x the input '
+              'size)'.format(impute, rows, input_bytes / 1e6, peak_bytes / 1e6, peak_bytes / input_bytes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Memory of a saved model loaded by several scoring processes
+
+Saves a random forest trained on synthetic data, then loads it in several processes in three ways:
+
+- independent: every process reads the whole artifact into its own memory
+- memory mapped: every process memory-maps the artifact's arrays
+- forked: one process memory-maps the artifact and forks the others afterwards (as `healthcareai.serve --processes`)
+
+and reports the total proportional set size (PSS) of the processes, which splits each shared page between the
+processes sharing it, so the total is the real memory used by all of them. The memory the model takes is that total
+less the total of the same processes started the same way without loading a model.
+
+Usage:
+    python benchmarks/model_loading_memory.py [number of processes] [number of trees]
+
+This reads /proc/<pid>/smaps_rollup, so it only runs on linux.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import healthcareai.common.file_io_utilities as hcai_io
+from full_pipeline_memory import make_training_dataframe
+from healthcareai.supervised_model_trainer import SupervisedModelTrainer
+
+# Every measurement runs in freshly started interpreters, which don't share the memory of this process
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+def _pss_bytes(pid):
+    """The proportional set size of a process in bytes."""
+    with open('/proc/{}/smaps_rollup'.format(pid)) as smaps:
+        for line in smaps:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+
+
+def _load_and_report(filename, memory_map, queue, loaded, done):
+    if filename is not None:
+        model = hcai_io.load_saved_model(filename, debug=False, scoring_only=True, memory_map=memory_map)
+    # Measure once every process has loaded the model, so shared pages are split between all of them
+    loaded.wait()
+    queue.put(_pss_bytes(os.getpid()))
+    done.wait()
+
+
+def _load_fork_and_report(filename, processes, queue):
+    if filename is not None:
+        model = hcai_io.load_saved_model(filename, debug=False, scoring_only=True, memory_map=True)
+    gc.freeze()
+
+    read_end, write_end = os.pipe()
+    children = []
+    for _ in range(processes - 1):
+        pid = os.fork()
+        if pid == 0:
+            os.read(read_end, 1)
+            os._exit(0)
+        children.append(pid)
+
+    queue.put(_pss_bytes(os.getpid()) + sum(_pss_bytes(pid) for pid in children))
+    os.write(write_end, b'x' * len(children))
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def measure_loads(filename, processes, memory_map=False):
+    """
+    The total PSS in bytes of processes that each load the model (or just import the libraries if the file name is
+    None).
+    """
+    queue = CONTEXT.Queue()
+    loaded = CONTEXT.Barrier(processes)
+    done = CONTEXT.Event()
+    workers = [CONTEXT.Process(target=_load_and_report, args=(filename, memory_map, queue, loaded, done))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    total = sum(queue.get() for _ in workers)
+    done.set()
+    for worker in workers:
+        worker.join()
+
+    return total
+
+
+def measure_forked_loads(filename, processes):
+    """
+    The total PSS in bytes of a process that loads the model (or just imports the libraries if the file name is None)
+    and the processes it forks afterwards.
+    """
+    queue = CONTEXT.Queue()
+    process = CONTEXT.Process(target=_load_fork_and_report, args=(filename, processes, queue))
+    process.start()
+    total = queue.get()
+    process.join()
+
+    return total
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    trees = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    dataframe = make_training_dataframe(20000)
+    trainer = SupervisedModelTrainer(dataframe, 'ThirtyDayReadmitFLG', 'classification',
+                                     grain_column='PatientEncounterID', verbose=False)
+    trained_model = trainer._advanced_trainer.random_forest_classifier(trees=trees, randomized_search=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'model.hcai')
+        trained_model.save(filename, debug=False)
+        print('{}-tree random forest saved as a {:.1f} MB artifact'.format(trees, os.path.getsize(filename) / 1e6))
+
+        baseline = measure_loads(None, processes)
+        forked_baseline = measure_forked_loads(None, processes)
+        for name, total, without_model in [
+                ('independent', measure_loads(filename, processes), baseline),
+                ('memory mapped', measure_loads(filename, processes, memory_map=True), baseline),
+                ('forked', measure_forked_loads(filename, processes), forked_baseline)]:
+            print('{} processes, {}: {:.1f} MB in total, {:.1f} MB of it for the model'.format(
+                processes, name, total / 1e6, (total - without_model) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
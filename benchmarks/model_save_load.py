@@ -0,0 +1,89 @@
+"""Size and save/load time of saved models
+
+Trains a random forest on synthetic data and saves and loads it in each format: a plain pickle, a compressed pickle
+and a model artifact, uncompressed and with each available compression, on one thread and on all CPUs. Reports the
+file size and the best save and load times of a few runs.
+
+Usage:
+    python benchmarks/model_save_load.py [number of rows] [number of trees]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import healthcareai.common.compression as hcai_compression
+import healthcareai.common.file_io_utilities as hcai_io
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from full_pipeline_memory import make_training_dataframe
+from healthcareai.supervised_model_trainer import SupervisedModelTrainer
+
+REPEATS = 3
+
+
+def available_compressions():
+    """The compressions whose libraries are installed."""
+    compressions = []
+    for compression in hcai_compression.COMPRESSIONS:
+        try:
+            hcai_compression.validate_compression(compression)
+            compressions.append(compression)
+        except HealthcareAIError:
+            pass
+
+    return compressions
+
+
+def best_time(function):
+    """The shortest of a few runs of a function in seconds."""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def measure(trained_model, filename, file_format, compression, n_jobs):
+    """The file size in bytes and the best save and load times in seconds of one format."""
+    if file_format == 'pickle':
+        def save():
+            hcai_io.save_object_as_pickle(trained_model, filename, compression=compression, n_jobs=n_jobs)
+    else:
+        def save():
+            trained_model.save(filename, debug=False, compression=compression, n_jobs=n_jobs)
+
+    save_seconds = best_time(save)
+    load_seconds = best_time(lambda: hcai_io.load_saved_model(filename, debug=False, n_jobs=n_jobs))
+
+    return os.path.getsize(filename), save_seconds, load_seconds
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    trees = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    dataframe = make_training_dataframe(rows)
+    trainer = SupervisedModelTrainer(dataframe, 'ThirtyDayReadmitFLG', 'classification',
+                                     grain_column='PatientEncounterID', verbose=False)
+    trained_model = trainer._advanced_trainer.random_forest_classifier(trees=trees, randomized_search=False)
+
+    print('{}-tree random forest trained on {:,} rows, {} CPUs'.format(trees, rows, os.cpu_count()))
+    print('{:<10} {:<12} {:>6} {:>10} {:>8} {:>8}'.format('format', 'compression', 'n_jobs', 'size (MB)', 'save (s)',
+                                                           'load (s)'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format in ['pickle', 'artifact']:
+            filename = os.path.join(directory, 'model.{}'.format(file_format))
+            runs = [(None, 1)] + [(compression, n_jobs) for compression in available_compressions()
+                                  for n_jobs in [1, -1]]
+
+            for compression, n_jobs in runs:
+                size, save_seconds, load_seconds = measure(trained_model, filename, file_format, compression, n_jobs)
+                print('{:<10} {:<12} {:>6} {:>10.1f} {:>8.3f} {:>8.3f}'.format(
+                    file_format, compression or 'none', n_jobs, size / 1e6, save_seconds, load_seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,9 +3,11 @@ from .supervised_model_trainer import SupervisedModelTrainer
 from .datasets import load_diabetes
 from .common.csv_loader import load_csv
 from .common.file_io_utilities import load_saved_model
+from .common.model_registry import ModelRegistry
 
 __all__ = [
     'AdvancedSupervisedModelTrainer',
+    'ModelRegistry',
     'SupervisedModelTrainer',
     'load_csv',
     'load_diabetes',
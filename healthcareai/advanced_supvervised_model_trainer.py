@@ -10,8 +10,10 @@ import healthcareai.common.model_eval as hcai_model_evaluation
 import healthcareai.common.top_factors as hcai_factors
 import healthcareai.trained_models.trained_supervised_model as hcai_tsm
 import healthcareai.common.helpers as hcai_helpers
+import healthcareai.common.parallel_training as hcai_parallel_training
 
-from healthcareai.common.randomized_search import get_algorithm
+from healthcareai.common.parallel_scoring import effective_n_jobs
+from healthcareai.common.randomized_search import get_algorithm, set_estimator_n_jobs
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
 SUPPORTED_MODEL_TYPES = ['classification', 'regression']
@@ -32,7 +34,8 @@ class AdvancedSupervisedModelTrainer(object):
         predicted_column,
         grain_column=None,
         original_column_names=None,
-        verbose=False):
+        verbose=False,
+        n_jobs=-1):
         """     
         Creates an instance of AdvancedSupervisedModelTrainer.
         
@@ -52,6 +55,9 @@ class AdvancedSupervisedModelTrainer(object):
             pre-pipeline data is going to be fed to the trained model.
 
             verbose (bool): Verbose output
+
+            n_jobs (int): The number of CPUs used to train models. Defaults to
+            -1 (all CPUs).
         """
         # Validate model type is sane
         if model_type not in SUPPORTED_MODEL_TYPES:
@@ -69,6 +75,9 @@ class AdvancedSupervisedModelTrainer(object):
         self.pipeline = pipeline
         self.original_column_names = original_column_names
         self.categorical_column_info = None
+        # Validate early so that a bad value doesn't surface after a long search
+        self.n_jobs = n_jobs
+        effective_n_jobs(n_jobs)
 
         self._console_log(
             'Shape and top 5 rows of original dataframe:\n{}\n{}'.format(self.dataframe.shape, self.dataframe.head()))
@@ -122,6 +131,9 @@ class AdvancedSupervisedModelTrainer(object):
         This provides a simple way to put data in and have healthcare.ai train 
         a few models and pick the best one for your data.
 
+        The default models are trained concurrently (sharing the trainer's
+        n_jobs CPUs) and only the best one gets a factor model.
+
         Args:
             scoring_metric (str): The metric used to rank the models. Defaults 
             to 'roc_auc'
@@ -134,45 +146,69 @@ class AdvancedSupervisedModelTrainer(object):
         """
         self.validate_classification('Ensemble Classification')
         self.validate_score_metric_for_number_of_classes(scoring_metric)
+
+        if trained_model_by_name is not None:
+            score_by_name = {}
+            for name, model in trained_model_by_name.items():
+                # Unroll estimator from trained supervised model
+                estimator = hcai_tsm.get_estimator_from_trained_supervised_model(model)
+
+                # Get the score objects for the estimator
+                score = self.metrics(estimator)
+                self._console_log('{} algorithm: score = {}'.format(name, score))
+
+                # TODO this may need to ferret out each classification score separately
+                score_by_name[name] = score[scoring_metric]
+
+            best_algorithm_name = self._best_algorithm_name(score_by_name, scoring_metric)
+
+            return trained_model_by_name[best_algorithm_name]
+
+        # Here is the default list of algorithms to try for the ensemble. They are fit and evaluated concurrently in
+        # worker processes, each with an equal share of the CPUs for its own trees or neighbor searches. Worker
+        # processes can't start processes of their own, so each randomized search runs its candidates one at a time.
+        n_jobs = effective_n_jobs(self.n_jobs)
+        process_count = min(n_jobs, 3)
+        candidate_n_jobs = max(n_jobs // process_count, 1)
+        search_n_jobs = 1 if process_count > 1 else None
+
+        # Adding an ensemble method is as easy as adding a new key:value pair
+        # in the `algorithm_by_name` dictionary
+        algorithm_by_name = {
+            'KNN': self._knn_algorithm(scoring_metric, None, True, 10, n_jobs=candidate_n_jobs,
+                                       search_n_jobs=search_n_jobs),
+            'Logistic Regression': self._logistic_regression_algorithm('roc_auc', None, True, 10,
+                                                                       n_jobs=candidate_n_jobs,
+                                                                       search_n_jobs=search_n_jobs),
+            'Random Forest Classifier': self._random_forest_classifier_algorithm(200, scoring_metric, None, True, 5,
+                                                                                 n_jobs=candidate_n_jobs,
+                                                                                 search_n_jobs=search_n_jobs)}
+
+        fit_candidate_by_name = hcai_parallel_training.fit_candidates(algorithm_by_name, self.model_type,
+                                                                      self.x_train, self.y_train,
+                                                                      self.X_test, self.y_test,
+                                                                      n_jobs=process_count)
+
         score_by_name = {}
+        for name, fit_candidate in fit_candidate_by_name.items():
+            self._console_log('{} algorithm: score = {}'.format(name, fit_candidate.metric_by_name))
+            score_by_name[name] = fit_candidate.metric_by_name[scoring_metric]
 
-        # Here is the default list of algorithms to try for the ensemble
-        # Adding an ensemble method is as easy as adding a new key:value pair 
-        # in the `model_by_name` dictionary
-        if trained_model_by_name is None:
-            # TODO because these now all return TSMs it will be additionally 
-            # slow by all the factor models.
-
-            # TODO Could these be trained separately then after the best is 
-            # found, train the factor model and add to TSM?
-            trained_model_by_name = {
-                'KNN': self.knn(randomized_search=True, scoring_metric=scoring_metric),
-                'Logistic Regression': self.logistic_regression(randomized_search=True),
-                'Random Forest Classifier': self.random_forest_classifier(
-                    trees=200,
-                    randomized_search=True,
-                    scoring_metric=scoring_metric)}
-
-        for name, model in trained_model_by_name.items():
-            # Unroll estimator from trained supervised model
-            estimator = hcai_tsm.get_estimator_from_trained_supervised_model(model)
-
-            # Get the score objects for the estimator
-            score = self.metrics(estimator)
-            self._console_log('{} algorithm: score = {}'.format(name, score))
-
-            # TODO this may need to ferret out each classification score separately
-            score_by_name[name] = score[scoring_metric]
+        best_algorithm_name = self._best_algorithm_name(score_by_name, scoring_metric)
 
+        # Only the winner gets a factor model and a full TrainedSupervisedModel
+        return self._build_trained_supervised_model(fit_candidate_by_name[best_algorithm_name])
+
+    def _best_algorithm_name(self, score_by_name, scoring_metric):
+        """Return the name of the algorithm with the highest score."""
         sorted_names_and_scores = sorted(score_by_name.items(), key=lambda x: x[1])
         best_algorithm_name, best_score = sorted_names_and_scores[-1]
-        best_model = trained_model_by_name[best_algorithm_name]
 
         self._console_log('Based on the scoring metric {}, the best algorithm found is: {}'.format(scoring_metric,
                                                                                                    best_algorithm_name))
         self._console_log('{} {} = {}'.format(best_algorithm_name, scoring_metric, best_score))
 
-        return best_model
+        return best_algorithm_name
 
     def validate_score_metric_for_number_of_classes(self, metric):
         """
@@ -220,7 +256,8 @@ class AdvancedSupervisedModelTrainer(object):
                             scoring_metric='roc_auc',
                             hyperparameter_grid=None,
                             randomized_search=True,
-                            number_iteration_samples=10):
+                            number_iteration_samples=10,
+                            search_strategy='randomized'):
         """
         A light wrapper for Sklearn's logistic regression that performs randomized 
         search over an overideable default 
@@ -236,29 +273,43 @@ class AdvancedSupervisedModelTrainer(object):
             hyperparameter space. More may lead to a better model, but will 
             take longer.
 
+            search_strategy (str): 'randomized' (default) or 'halving'. See get_algorithm.
+
         Returns:
             TrainedSupervisedModel: 
         """
         self.validate_classification('Logistic Regression')
-        if hyperparameter_grid is None:
-            hyperparameter_grid = {'C': [0.01, 0.1, 1, 10, 100], 'class_weight': [None, 'balanced']}
-            number_iteration_samples = 10
-
-        algorithm = get_algorithm(LogisticRegression,
-                                  scoring_metric,
-                                  hyperparameter_grid,
-                                  randomized_search,
-                                  number_iteration_samples=number_iteration_samples)
+        algorithm = self._logistic_regression_algorithm(scoring_metric, hyperparameter_grid, randomized_search,
+                                                        number_iteration_samples, n_jobs=self.n_jobs,
+                                                        search_strategy=search_strategy)
 
         trained_supervised_model = self._create_trained_supervised_model(algorithm)
 
         return trained_supervised_model
 
+    def _logistic_regression_algorithm(self, scoring_metric, hyperparameter_grid, randomized_search,
+                                       number_iteration_samples, n_jobs, search_n_jobs=None,
+                                       search_strategy='randomized'):
+        """Build an unfit logistic regression (or randomized search) over the default or given grid."""
+        if hyperparameter_grid is None:
+            hyperparameter_grid = {'C': [0.01, 0.1, 1, 10, 100], 'class_weight': [None, 'balanced']}
+            number_iteration_samples = 10
+
+        return get_algorithm(LogisticRegression,
+                             scoring_metric,
+                             hyperparameter_grid,
+                             randomized_search,
+                             number_iteration_samples=number_iteration_samples,
+                             n_jobs=n_jobs,
+                             search_n_jobs=search_n_jobs,
+                             search_strategy=search_strategy)
+
     def linear_regression(self,
                           scoring_metric='neg_mean_squared_error',
                           hyperparameter_grid=None,
                           randomized_search=True,
-                          number_iteration_samples=2):
+                          number_iteration_samples=2,
+                          search_strategy='randomized'):
         """
         A light wrapper for Sklearn's linear regression that performs randomized 
         search over an overridable default hyperparameter grid.
@@ -272,6 +323,8 @@ class AdvancedSupervisedModelTrainer(object):
             randomized search for exploring the hyperparameter space. More may 
             lead to a better model, but will take longer.
 
+            search_strategy (str): 'randomized' (default) or 'halving'. See get_algorithm.
+
         Returns:
             TrainedSupervisedModel:
         """
@@ -284,7 +337,9 @@ class AdvancedSupervisedModelTrainer(object):
                                   scoring_metric,
                                   hyperparameter_grid,
                                   randomized_search,
-                                  number_iteration_samples=number_iteration_samples)
+                                  number_iteration_samples=number_iteration_samples,
+                                  n_jobs=self.n_jobs,
+                                  search_strategy=search_strategy)
 
         trained_supervised_model = self._create_trained_supervised_model(algorithm)
 
@@ -293,7 +348,8 @@ class AdvancedSupervisedModelTrainer(object):
     def lasso_regression(self, scoring_metric='neg_mean_squared_error',
                          hyperparameter_grid=None,
                          randomized_search=True,
-                         number_iteration_samples=2):
+                         number_iteration_samples=2,
+                         search_strategy='randomized'):
         """
         A light wrapper for Sklearn's lasso regression that performs randomized 
         search over an overridable default hyperparameter grid.
@@ -307,6 +363,8 @@ class AdvancedSupervisedModelTrainer(object):
             randomized search for exploring the hyperparameter space. More may lead 
             to a better model, but will take longer.
 
+            search_strategy (str): 'randomized' (default) or 'halving'. See get_algorithm.
+
         Returns:
             TrainedSupervisedModel:
         """
@@ -319,7 +377,9 @@ class AdvancedSupervisedModelTrainer(object):
                                   scoring_metric,
                                   hyperparameter_grid,
                                   randomized_search,
-                                  number_iteration_samples=number_iteration_samples)
+                                  number_iteration_samples=number_iteration_samples,
+                                  n_jobs=self.n_jobs,
+                                  search_strategy=search_strategy)
 
         trained_supervised_model = self._create_trained_supervised_model(algorithm)
 
@@ -329,7 +389,8 @@ class AdvancedSupervisedModelTrainer(object):
             scoring_metric='roc_auc',
             hyperparameter_grid=None,
             randomized_search=True,
-            number_iteration_samples=10):
+            number_iteration_samples=10,
+            search_strategy='randomized'):
         """
         A light wrapper for Sklearn's knn classifier that performs randomized 
         search over an overridable default
@@ -344,32 +405,45 @@ class AdvancedSupervisedModelTrainer(object):
             randomized search for exploring the
             hyperparameter space. More may lead to a better model, but will take longer.
 
+            search_strategy (str): 'randomized' (default) or 'halving'. See get_algorithm.
+
         Returns:
             TrainedSupervisedModel: 
         """
         self.validate_classification('KNN')
+        algorithm = self._knn_algorithm(scoring_metric, hyperparameter_grid, randomized_search,
+                                        number_iteration_samples, n_jobs=self.n_jobs,
+                                        search_strategy=search_strategy)
+
+        trained_supervised_model = self._create_trained_supervised_model(algorithm)
+
+        return trained_supervised_model
+
+    def _knn_algorithm(self, scoring_metric, hyperparameter_grid, randomized_search, number_iteration_samples,
+                       n_jobs, search_n_jobs=None, search_strategy='randomized'):
+        """Build an unfit knn classifier (or randomized search) over the default or given grid."""
         if hyperparameter_grid is None:
             neighbors = list(range(5, 26))
             hyperparameter_grid = {'n_neighbors': neighbors, 'weights': ['uniform', 'distance']}
             number_iteration_samples = 10
 
             print('KNN Grid: {}'.format(hyperparameter_grid))
-        algorithm = get_algorithm(KNeighborsClassifier,
-                                  scoring_metric,
-                                  hyperparameter_grid,
-                                  randomized_search,
-                                  number_iteration_samples=number_iteration_samples)
-
-        trained_supervised_model = self._create_trained_supervised_model(algorithm)
-
-        return trained_supervised_model
+        return get_algorithm(KNeighborsClassifier,
+                             scoring_metric,
+                             hyperparameter_grid,
+                             randomized_search,
+                             number_iteration_samples=number_iteration_samples,
+                             n_jobs=n_jobs,
+                             search_n_jobs=search_n_jobs,
+                             search_strategy=search_strategy)
 
     def random_forest_classifier(self,
                                  trees=200,
                                  scoring_metric='roc_auc',
                                  hyperparameter_grid=None,
                                  randomized_search=True,
-                                 number_iteration_samples=5):
+                                 number_iteration_samples=5,
+                                 search_strategy='randomized'):
         """
         A light wrapper for Sklearn's random forest classifier that performs 
         randomized search over an overridable
@@ -384,33 +458,48 @@ class AdvancedSupervisedModelTrainer(object):
             randomized search for exploring the hyperparameter space. More may lead 
             to a better model, but will take longer.
 
+            search_strategy (str): 'randomized' (default), 'halving' or 'warm_start'. See get_algorithm.
+
         Returns:
             TrainedSupervisedModel: 
         """
         self.validate_classification('Random Forest Classifier')
+        algorithm = self._random_forest_classifier_algorithm(trees, scoring_metric, hyperparameter_grid,
+                                                             randomized_search, number_iteration_samples,
+                                                             n_jobs=self.n_jobs,
+                                                             search_strategy=search_strategy)
+
+        trained_supervised_model = self._create_trained_supervised_model(algorithm)
+
+        return trained_supervised_model
+
+    def _random_forest_classifier_algorithm(self, trees, scoring_metric, hyperparameter_grid, randomized_search,
+                                            number_iteration_samples, n_jobs, search_n_jobs=None,
+                                            search_strategy='randomized'):
+        """Build an unfit random forest classifier (or randomized search) over the default or given grid."""
         if hyperparameter_grid is None:
             max_features = hcai_helpers.calculate_random_forest_mtry_hyperparameter(len(self.X_test.columns),
                                                                                     self.model_type)
             hyperparameter_grid = {'n_estimators': [100, 200, 300], 'max_features': max_features}
             number_iteration_samples = 5
 
-        algorithm = get_algorithm(RandomForestClassifier,
-                                  scoring_metric,
-                                  hyperparameter_grid,
-                                  randomized_search,
-                                  number_iteration_samples=number_iteration_samples,
-                                  n_estimators=trees)
-
-        trained_supervised_model = self._create_trained_supervised_model(algorithm)
-
-        return trained_supervised_model
+        return get_algorithm(RandomForestClassifier,
+                             scoring_metric,
+                             hyperparameter_grid,
+                             randomized_search,
+                             number_iteration_samples=number_iteration_samples,
+                             n_jobs=n_jobs,
+                             search_n_jobs=search_n_jobs,
+                             search_strategy=search_strategy,
+                             n_estimators=trees)
 
     def random_forest_regressor(self,
                                 trees=200,
                                 scoring_metric='neg_mean_squared_error',
                                 hyperparameter_grid=None,
                                 randomized_search=True,
-                                number_iteration_samples=5):
+                                number_iteration_samples=5,
+                                search_strategy='randomized'):
         """
         A light wrapper for Sklearn's random forest regressor that performs 
         randomized search over an overridable default hyperparameter grid.
@@ -428,6 +517,8 @@ class AdvancedSupervisedModelTrainer(object):
             randomized search for exploring the hyperparameter space. More may 
             lead to a better model, but will take longer.
 
+            search_strategy (str): 'randomized' (default), 'halving' or 'warm_start'. See get_algorithm.
+
         Returns:
             TrainedSupervisedModel: 
         """
@@ -443,6 +534,8 @@ class AdvancedSupervisedModelTrainer(object):
                                   hyperparameter_grid,
                                   randomized_search,
                                   number_iteration_samples=number_iteration_samples,
+                                  n_jobs=self.n_jobs,
+                                  search_strategy=search_strategy,
                                   n_estimators=trees)
 
         trained_supervised_model = self._create_trained_supervised_model(algorithm)
@@ -460,27 +553,36 @@ class AdvancedSupervisedModelTrainer(object):
         Returns:
             TrainedSupervisedModel: a TrainedSupervisedModel
         """
-        # Get time before model training
-        t0 = time.time()
+        fit_candidate = hcai_parallel_training.fit_and_evaluate(algorithm, self.model_type, self.x_train,
+                                                                self.y_train, self.X_test, self.y_test)
+
+        return self._build_trained_supervised_model(fit_candidate, include_factor_model=include_factor_model)
+
+    def _build_trained_supervised_model(self, fit_candidate, include_factor_model=True):
+        """
+        Builds a TrainedSupervisedModel from an already fit and evaluated algorithm.
+
+        Args:
+            fit_candidate (healthcareai.common.parallel_training.FitCandidate): The fit algorithm with its test set
+                predictions and metrics
+            include_factor_model (bool): Trains a model for top factors. Defaults to True
+
+        Returns:
+            TrainedSupervisedModel: a TrainedSupervisedModel
+        """
+        algorithm = fit_candidate.algorithm
 
-        algorithm.fit(self.x_train, self.y_train)
-
-        # Build prediction sets for ROC/PR curve generation. Note this does 
-        # increase the size of the TSM because the test set is saved inside 
-        # the object as well as the calculated thresholds.
-        # See https://github.com/HealthCatalyst/healthcareai-py/issues/264 
-        # for a discussion on pros/cons PEP 8
-        test_set_predictions = None
-        test_set_class_labels = None
-        if self.is_classification:
-            # Save both the probabilities and labels
-            test_set_predictions = algorithm.predict_proba(self.X_test)
-            test_set_class_labels = algorithm.predict(self.X_test)
-        elif self.is_regression:
-            test_set_predictions = algorithm.predict(self.X_test)
+        # Score with a single thread by default. Scoring parallelism is chosen at prediction time (for example
+        # make_predictions(n_jobs=4)) and threads inside each worker would oversubscribe the CPUs.
+        set_estimator_n_jobs(algorithm, 1)
+
+        # The factor model is trained here, for the returned model only, so candidates that are compared and thrown
+        # away (such as in ensemble) never pay for the linear fit, and the model doesn't keep the training data
+        t0 = time.time()
 
         if include_factor_model:
-            factor_model = hcai_factors.prepare_fit_model_for_factors(self.model_type, self.x_train, self.y_train)
+            factor_model = hcai_factors.prepare_fit_model_for_factors(self.model_type, self.x_train, self.y_train,
+                                                                      n_jobs=self.n_jobs)
         else:
             factor_model = None
 
@@ -492,13 +594,13 @@ class AdvancedSupervisedModelTrainer(object):
             column_names=self.X_test.columns.values,
             grain_column=self.grain_column,
             prediction_column=self.predicted_column,
-            test_set_predictions=test_set_predictions,
-            test_set_class_labels=test_set_class_labels,
+            test_set_predictions=fit_candidate.test_set_predictions,
+            test_set_class_labels=fit_candidate.test_set_class_labels,
             test_set_actual=self.y_test,
-            metric_by_name=self.metrics(algorithm),
+            metric_by_name=fit_candidate.metric_by_name,
             original_column_names=self.original_column_names,
             categorical_column_info=self.categorical_column_info,
-            training_time=time.time() - t0)
+            training_time=fit_candidate.training_time + time.time() - t0)
 
         return trained_supervised_model
 
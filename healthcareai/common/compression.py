@@ -0,0 +1,154 @@
+"""Compression
+
+Chunked compression of saved models. The data is split into fixed size chunks that are compressed and decompressed
+independently, so several threads can work on one file at the same time (all the codecs release the GIL while they
+work on a chunk).
+
+Codecs:
+
+    zlib        Always available (from the standard library). Uses its fastest level.
+    lz4         Requires the lz4 package. The fastest to decompress.
+    zstd        Requires the zstandard package. Compresses about as well as zlib, several times faster.
+"""
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.parallel_scoring import effective_n_jobs
+
+try:
+    # Note we don't want to force lz4 as a requirement
+    import lz4.frame
+
+    lz4_is_loaded = True
+except ImportError:
+    lz4_is_loaded = False
+
+try:
+    # Note we don't want to force zstandard as a requirement
+    import zstandard
+
+    zstandard_is_loaded = True
+except ImportError:
+    zstandard_is_loaded = False
+
+COMPRESSIONS = ['zlib', 'lz4', 'zstd']
+
+# The uncompressed size of every chunk but the last one. Files record the chunk size they were written with, so
+# changing this doesn't affect reading existing files.
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Saved models are moved around far more often than their size matters, so favor speed
+ZLIB_LEVEL = 1
+ZSTD_LEVEL = 3
+
+
+def validate_compression(compression):
+    """Raise an error if a compression isn't known or its library isn't installed."""
+    if compression not in COMPRESSIONS:
+        raise HealthcareAIError('Compression must be one of {} (or None). You passed in {}'.format(
+            ', '.join(COMPRESSIONS), compression))
+
+    if compression == 'lz4' and not lz4_is_loaded:
+        raise HealthcareAIError('lz4 compression requires installation of the lz4 package (pip install lz4).')
+
+    if compression == 'zstd' and not zstandard_is_loaded:
+        raise HealthcareAIError('zstd compression requires installation of the zstandard package '
+                                '(pip install zstandard).')
+
+
+def compress_chunks(data, compression, n_jobs=1, chunk_bytes=CHUNK_BYTES):
+    """
+    Compress data in chunks of chunk_bytes.
+
+    Record the chunk size with the compressed chunks, `decompress_chunks` needs it.
+
+    Args:
+        data (bytes-like): The data
+        compression (str): The codec, one of COMPRESSIONS
+        n_jobs (int): The number of threads. -1 uses all CPUs.
+        chunk_bytes (int): The uncompressed size of every chunk but the last one
+
+    Returns:
+        list: The compressed chunks (bytes)
+    """
+    validate_compression(compression)
+
+    data = memoryview(data).cast('B')
+    chunks = [data[start:start + chunk_bytes] for start in range(0, len(data), chunk_bytes)]
+
+    return _map(_COMPRESSORS[compression], chunks, n_jobs)
+
+
+def decompress_chunks(chunks, compression, size, chunk_bytes, n_jobs=1):
+    """
+    Decompress chunks written by `compress_chunks` into one block.
+
+    Args:
+        chunks (list): The compressed chunks (bytes-like)
+        compression (str): The codec they were compressed with
+        size (int): The uncompressed size in bytes
+        chunk_bytes (int): The chunk size they were compressed with
+        n_jobs (int): The number of threads. -1 uses all CPUs.
+
+    Returns:
+        bytearray: The (writeable) uncompressed data
+
+    Raises:
+        HealthcareAIError: If the chunks don't decompress to the recorded sizes
+    """
+    validate_compression(compression)
+
+    if len(chunks) != -(-size // chunk_bytes):
+        raise HealthcareAIError('The file is corrupt: {} bytes in chunks of {} bytes can\'t make {} chunks.'.format(
+            size, chunk_bytes, len(chunks)))
+
+    block = bytearray(size)
+    block_view = memoryview(block)
+    decompress = _DECOMPRESSORS[compression]
+
+    def decompress_chunk(index):
+        data = decompress(chunks[index])
+        start = index * chunk_bytes
+        expected_bytes = min(chunk_bytes, size - start)
+        if len(data) != expected_bytes:
+            raise HealthcareAIError('The file is corrupt: chunk {} decompressed to {} bytes instead of {}.'.format(
+                index, len(data), expected_bytes))
+        block_view[start:start + len(data)] = data
+
+    _map(decompress_chunk, range(len(chunks)), n_jobs)
+
+    return block
+
+
+def _map(function, items, n_jobs):
+    """Apply a function to each item on up to n_jobs threads and return the results in order."""
+    n_jobs = effective_n_jobs(n_jobs)
+    items = list(items)
+    if n_jobs == 1 or len(items) < 2:
+        return [function(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(n_jobs, len(items))) as executor:
+        return list(executor.map(function, items))
+
+
+def _zstd_compress(data):
+    # Compressor objects can't be shared between threads
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+_COMPRESSORS = {
+    'zlib': lambda data: zlib.compress(data, ZLIB_LEVEL),
+    'lz4': lambda data: lz4.frame.compress(data),
+    'zstd': _zstd_compress,
+}
+
+_DECOMPRESSORS = {
+    'zlib': zlib.decompress,
+    'lz4': lambda data: lz4.frame.decompress(data),
+    'zstd': _zstd_decompress,
+}
@@ -1,13 +1,16 @@
 import pandas as pd
 
+import healthcareai.common.dtype_planning as hcai_dtypes
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
 
-def load_csv(file_path):
+def load_csv(file_path, downcast=False):
     """
     Loads a csv file into a pandas dataframe. Checks for common null/missing values.
     Args:
         file_path (str): Full or relative path to file.
+        downcast (bool): True to store the columns with compact dtypes (float32, small integers and categoricals for
+            low cardinality strings, see `healthcareai.common.dtype_planning`)
 
     Returns:
         (pandas.core.frame.DataFrame): The csv file in a dataframe
@@ -16,6 +19,8 @@ def load_csv(file_path):
         # Need to strip out whitespaces from the column names
         df = pd.read_csv(file_path, na_values=['None', 'null'])
         df = df.rename(columns=lambda x: x.strip())
+        if downcast:
+            hcai_dtypes.downcast_dtypes(df)
         return df
     except FileNotFoundError:
         raise HealthcareAIError(
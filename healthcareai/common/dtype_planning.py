@@ -0,0 +1,205 @@
+"""Dtype Planning
+
+Pandas reads data with wide default dtypes: every number is a float64 or an int64 and every string is a python object.
+Clinical training data rarely needs that: measurements fit in float32, counts and 0/1 flags fit in a byte and string
+flags or codes only have a handful of levels. A dtype plan maps each column to a compact dtype that holds its values
+(close enough to) losslessly, which cuts the memory of a training dataframe several times over. It also gives
+scikit-learn a float32 matrix, which the tree based models use as is instead of converting it.
+
+A plan is a dictionary of column name to dtype, so it can be passed straight to `pandas.read_csv(dtype=...)`.
+"""
+import numpy as np
+import pandas as pd
+
+# Object columns with at most this fraction of distinct values are stored as categoricals
+MAX_CATEGORY_FRACTION = 0.5
+
+# Floats are stored as float32 when that changes them by at most this relative amount (float32 has 7 significant
+# digits)
+FLOAT32_RELATIVE_TOLERANCE = 1e-6
+
+# Whole numbers (such as IDs or counts with missing values) are only stored as float32 up to this size, which float32
+# stores exactly
+FLOAT32_MAX_EXACT_INTEGER = 2 ** 24
+
+INTEGER_DTYPES = [np.dtype(dtype) for dtype in [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]]
+
+
+def plan_dtypes(dataframe, excluded_columns=None, max_category_fraction=MAX_CATEGORY_FRACTION):
+    """
+    Infer the compact dtype of each column of a dataframe.
+
+    - floats become float32 where that is lossless enough
+    - integers become the smallest integer dtype that holds them
+    - low cardinality string columns (such as 'Y'/'N' or 'M'/'F' flags) become categoricals
+    - everything else (booleans, dates, high cardinality strings) keeps its dtype
+
+    Args:
+        dataframe (pandas.core.frame.DataFrame): The dataframe
+        excluded_columns (list): Columns to leave as they are
+        max_category_fraction (float): The largest fraction of distinct values a string column can have to be stored
+            as a categorical
+
+    Returns:
+        dict: The column names that can be stored more compactly mapped to their dtypes
+    """
+    excluded_columns = excluded_columns or []
+    plan = {}
+
+    for column in dataframe.columns:
+        if column in excluded_columns:
+            continue
+
+        dtype = _compact_dtype(dataframe[column], max_category_fraction)
+        if dtype is not None:
+            plan[column] = dtype
+
+    return plan
+
+
+def apply_dtype_plan(dataframe, plan):
+    """
+    Convert the columns of a dataframe in place to the dtypes of a plan.
+
+    The plan may come from different data (for example the training data when preparing prediction data), so a
+    column is only converted when its values fit the planned dtype: integers that overflow it or contain missing
+    values and columns that aren't numeric anymore keep their dtype.
+
+    Args:
+        dataframe (pandas.core.frame.DataFrame): The dataframe
+        plan (dict): Column names mapped to dtypes (see `plan_dtypes`)
+
+    Returns:
+        pandas.core.frame.DataFrame: The same dataframe
+    """
+    for column, dtype in plan.items():
+        if column not in dataframe.columns or dataframe[column].dtype == dtype:
+            continue
+
+        values = dataframe[column]
+        if pd.api.types.is_categorical_dtype(dtype):
+            if values.dtype == np.dtype('O'):
+                dataframe[column] = values.astype('category')
+        elif not isinstance(dtype, np.dtype):
+            continue
+        elif np.issubdtype(dtype, np.integer):
+            if pd.api.types.is_integer_dtype(values) and _fits_integer_dtype(values.values, dtype):
+                dataframe[column] = values.astype(dtype)
+        elif np.issubdtype(dtype, np.floating):
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                dataframe[column] = values.astype(dtype)
+
+    return dataframe
+
+
+def merge_dtype_plans(plan, other_plan):
+    """
+    Combine the plans of two chunks of the same data into one plan that holds the values of both.
+
+    Integer and float dtypes are widened to hold both chunks (for example uint8 and int16 become int16, and float32
+    and float64 become float64). A column is only planned as a categorical if it is in both chunks, otherwise it
+    keeps its object dtype.
+
+    Args:
+        plan (dict): Column names mapped to dtypes (see `plan_dtypes`)
+        other_plan (dict): The plan of another chunk
+
+    Returns:
+        dict: The combined plan
+    """
+    merged_plan = dict(plan)
+    for column, dtype in other_plan.items():
+        merged_plan[column] = _merge_dtypes(plan[column], dtype) if column in plan else dtype
+
+    return merged_plan
+
+
+def downcast_dtypes(dataframe, excluded_columns=None):
+    """
+    Store the columns of a dataframe in place with compact dtypes (see `plan_dtypes`).
+
+    Args:
+        dataframe (pandas.core.frame.DataFrame): The dataframe
+        excluded_columns (list): Columns to leave as they are
+
+    Returns:
+        pandas.core.frame.DataFrame: The same dataframe
+    """
+    return apply_dtype_plan(dataframe, plan_dtypes(dataframe, excluded_columns=excluded_columns))
+
+
+def _merge_dtypes(dtype, other_dtype):
+    """The dtype that holds the values of two chunks planned with these dtypes."""
+    if pd.api.types.is_categorical_dtype(dtype) and pd.api.types.is_categorical_dtype(other_dtype):
+        return 'category'
+
+    if isinstance(dtype, np.dtype) and isinstance(other_dtype, np.dtype):
+        if dtype == other_dtype:
+            return dtype
+        if pd.api.types.is_numeric_dtype(dtype) and pd.api.types.is_numeric_dtype(other_dtype):
+            return np.promote_types(dtype, other_dtype)
+
+    # The chunks disagree (for example a string column with few levels in one chunk and many in another), so the
+    # column is left as it is
+    return np.dtype('O')
+
+
+def _compact_dtype(values, max_category_fraction):
+    """The compact dtype of a column, or None if it is already compact."""
+    if pd.api.types.is_bool_dtype(values):
+        return None
+
+    if pd.api.types.is_integer_dtype(values):
+        dtype = _smallest_integer_dtype(values.values)
+        return dtype if dtype is not None and dtype.itemsize < values.dtype.itemsize else None
+
+    if pd.api.types.is_float_dtype(values):
+        return np.dtype(np.float32) if values.dtype.itemsize > 4 and _fits_float32(values.values) else None
+
+    if values.dtype == np.dtype('O'):
+        non_null = values.dropna()
+        if len(non_null) > 0 and pd.api.types.infer_dtype(non_null, skipna=True) == 'string' \
+                and non_null.nunique() <= max_category_fraction * len(non_null):
+            return 'category'
+
+    return None
+
+
+def _smallest_integer_dtype(values):
+    """The smallest integer dtype that holds all the values, or None if they need 64 bits."""
+    if len(values) == 0:
+        return None
+
+    for dtype in INTEGER_DTYPES:
+        if _fits_integer_dtype(values, dtype):
+            return dtype
+
+    return None
+
+
+def _fits_integer_dtype(values, dtype):
+    """True if every integer value is in the range of the integer dtype."""
+    if len(values) == 0:
+        return True
+
+    info = np.iinfo(dtype)
+    return info.min <= values.min() and values.max() <= info.max
+
+
+def _fits_float32(values):
+    """True if storing the floats as float32 changes them by a negligible relative amount and keeps whole numbers."""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return True
+
+    magnitudes = np.abs(finite)
+    if magnitudes.max() > np.finfo(np.float32).max:
+        return False
+
+    # Whole numbers (typically identifiers or counts) must survive exactly
+    whole = finite == np.round(finite)
+    if (magnitudes[whole] > FLOAT32_MAX_EXACT_INTEGER).any():
+        return False
+
+    rounded = finite.astype(np.float32).astype(np.float64)
+    return np.all(np.abs(rounded - finite) <= FLOAT32_RELATIVE_TOLERANCE * magnitudes)
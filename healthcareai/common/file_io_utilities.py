@@ -1,8 +1,17 @@
 import json
 import pickle
+import struct
 
+import healthcareai.common.compression as hcai_compression
+import healthcareai.common.model_artifact as hcai_artifact
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
+# Compressed pickles start with this, followed by the length of their json header and the header itself
+COMPRESSED_PICKLE_MAGIC = b'HCAIPKL1'
+
+# Out of band buffers are laid out at offsets that are multiples of this, like the arrays of model artifacts
+BUFFER_ALIGNMENT = hcai_artifact.ARRAY_ALIGNMENT
+
 
 def save_dict_object_to_json(dictionary, filename):
     """
@@ -18,27 +27,63 @@ def save_dict_object_to_json(dictionary, filename):
         json.dump(dictionary, open_file, indent=4, sort_keys=True)
 
 
-def save_object_as_pickle(object_to_pickle, filename):
+def save_object_as_pickle(object_to_pickle, filename, compression=None, n_jobs=1):
     """
     Saves a python object of any type to a pickle file with the given filename
+
+    The object is pickled with protocol 5, which writes large binary buffers (such as numpy arrays) without copying
+    them first. Without a compression the file is a plain pickle that `pickle.load` can read. With a compression, the
+    large buffers are kept out of the pickle stream, and the pickle and the buffers are compressed in chunks on n_jobs
+    threads. Such files can only be read with `load_pickle_file`.
     
     Args:
         object_to_pickle (object): the object to save to disk
         filename (str): file name to save the object to
-        
+        compression (str): Optional compression: 'zlib', 'lz4' or 'zstd' (see `healthcareai.common.compression`)
+        n_jobs (int): The number of threads compressing. -1 uses all CPUs.
     """
     _validate_filename_is_string(filename)
 
+    if compression is None:
+        with open(filename, 'wb') as open_file:
+            pickle.dump(object_to_pickle, open_file, protocol=5)
+        return
+
+    hcai_compression.validate_compression(compression)
+
+    buffers = []
+    pickle_data = pickle.dumps(object_to_pickle, protocol=5, buffer_callback=buffers.append)
+    buffer_block, buffer_offsets = _buffer_block([buffer.raw() for buffer in buffers])
+
+    pickle_chunks = hcai_compression.compress_chunks(pickle_data, compression, n_jobs=n_jobs)
+    buffer_chunks = hcai_compression.compress_chunks(buffer_block, compression, n_jobs=n_jobs)
+
+    header = {
+        'compression': compression,
+        'chunk_bytes': hcai_compression.CHUNK_BYTES,
+        'pickle_bytes': len(pickle_data),
+        'pickle_chunks': [len(chunk) for chunk in pickle_chunks],
+        'buffer_bytes': len(buffer_block),
+        'buffer_chunks': [len(chunk) for chunk in buffer_chunks],
+        'buffers': buffer_offsets,
+    }
+    header_data = json.dumps(header).encode('utf-8')
+
     with open(filename, 'wb') as open_file:
-        pickle.dump(object_to_pickle, open_file)
+        open_file.write(COMPRESSED_PICKLE_MAGIC)
+        open_file.write(struct.pack('<Q', len(header_data)))
+        open_file.write(header_data)
+        for chunk in pickle_chunks + buffer_chunks:
+            open_file.write(chunk)
 
 
-def load_pickle_file(filename):
+def load_pickle_file(filename, n_jobs=1):
     """
     Loads a python object of any type from a pickle file with the given filename
 
     Args:
         filename (str): File name to load 
+        n_jobs (int): The number of threads decompressing a compressed pickle. -1 uses all CPUs.
 
     Returns:
         (object): A python object
@@ -47,26 +92,41 @@ def load_pickle_file(filename):
 
     try:
         with open(filename, 'rb') as open_file:
-            return pickle.load(open_file)
+            if open_file.read(len(COMPRESSED_PICKLE_MAGIC)) != COMPRESSED_PICKLE_MAGIC:
+                open_file.seek(0)
+                return pickle.load(open_file)
+
+            return _load_compressed_pickle(open_file, n_jobs)
     except FileNotFoundError:
         raise HealthcareAIError(
             'No file named \'{}\' was found. Please verify the file you intend to load'.format(filename))
 
 
-def load_saved_model(filename, debug=True):
+def load_saved_model(filename, debug=True, scoring_only=False, memory_map=False, n_jobs=1):
     """
     Convenience method for a simple API without users needing to know what pickling is. Also prints model metadata
+
+    Loads both model artifacts (saved with `TrainedSupervisedModel.save()`) and models pickled by older versions.
     
     Args:
         filename (str): name of saved file to laod 
         debug (bool): Print debug output to console by default
+        scoring_only (bool): True to skip loading the evaluation payload (test set predictions, ROC/PR curves and
+            hyperparameter search results) of a model artifact, which is all a scoring job needs
+        memory_map (bool): True to memory-map the arrays of a model artifact read-only instead of reading them, so
+            the processes scoring with the same model file share one copy of them
+        n_jobs (int): The number of threads decompressing a compressed model. -1 uses all CPUs.
 
     Returns:
         (TrainedSupervisedModel): a saved model
     """
     _validate_filename_is_string(filename)
 
-    trained_model = load_pickle_file(filename)
+    if hcai_artifact.is_model_artifact(filename):
+        trained_model = hcai_artifact.load_model_artifact(filename, scoring_only=scoring_only,
+                                                          memory_map=memory_map, n_jobs=n_jobs)
+    else:
+        trained_model = load_pickle_file(filename, n_jobs=n_jobs)
 
     if debug:
         print('Trained model loaded from file: {}\n    Type: {}'.format(filename, type(trained_model)))
@@ -76,6 +136,45 @@ def load_saved_model(filename, debug=True):
     return trained_model
 
 
+def _buffer_block(buffers):
+    """Lay pickle buffers out (aligned) one after the other in one block and return it with their offsets and sizes."""
+    offsets = []
+    size = 0
+    for buffer in buffers:
+        offset = -(-size // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+        offsets.append([offset, buffer.nbytes])
+        size = offset + buffer.nbytes
+
+    block = bytearray(size)
+    block_view = memoryview(block)
+    for (offset, length), buffer in zip(offsets, buffers):
+        block_view[offset:offset + length] = buffer.cast('B')
+
+    return block, offsets
+
+
+def _load_compressed_pickle(open_file, n_jobs):
+    """Load a pickle written by `save_object_as_pickle` with a compression, from just after its magic bytes."""
+    header_length, = struct.unpack('<Q', open_file.read(8))
+    header = json.loads(open_file.read(header_length).decode('utf-8'))
+
+    compression = header['compression']
+    chunk_bytes = header['chunk_bytes']
+    pickle_chunks = [open_file.read(length) for length in header['pickle_chunks']]
+    buffer_chunks = [open_file.read(length) for length in header['buffer_chunks']]
+
+    pickle_data = hcai_compression.decompress_chunks(pickle_chunks, compression, header['pickle_bytes'], chunk_bytes,
+                                                     n_jobs=n_jobs)
+    buffer_block = hcai_compression.decompress_chunks(buffer_chunks, compression, header['buffer_bytes'], chunk_bytes,
+                                                      n_jobs=n_jobs)
+
+    # The unpickled arrays are views into the decompressed block rather than copies of it
+    block_view = memoryview(buffer_block)
+    buffers = [block_view[offset:offset + length] for offset, length in header['buffers']]
+
+    return pickle.loads(pickle_data, buffers=buffers)
+
+
 def _validate_filename_is_string(filename):
     """ Validates the a parameter is a string and returns a helpful error message if it is not. """
     if not isinstance(filename, str):
@@ -22,7 +22,11 @@ def is_dataframe(possible_dataframe):
 
 
 class DataframeColumnSuffixFilter(TransformerMixin):
-    """Given a pandas dataframe, remove columns with suffix 'DTS'."""
+    """
+    Given a pandas dataframe, remove columns with suffix 'DTS'.
+
+    This always returns a new dataframe, which makes it the one copy of the input in the data preparation pipeline.
+    """
 
     def __init__(self):
         pass
@@ -36,8 +40,9 @@ class DataframeColumnSuffixFilter(TransformerMixin):
         # Build a list that contains column names that do not end in 'DTS'
         filtered_column_names = [column for column in x.columns if not column.endswith('DTS')]
 
-        # Select all data excluding datetime columns
-        return x[filtered_column_names]
+        # Select all data excluding datetime columns. Unlike x[filtered_column_names], reindexing returns a copy that
+        # isn't flagged as a slice of x, so later steps can safely modify it in place.
+        return x.reindex(columns=filtered_column_names)
 
 
 class DataFrameColumnDateTimeFilter(TransformerMixin):
@@ -57,10 +62,18 @@ class DataFrameColumnDateTimeFilter(TransformerMixin):
 
 
 class DataframeColumnRemover(TransformerMixin):
-    """Given a pandas dataframe, remove the given column or columns in list form."""
+    """
+    Given a pandas dataframe, remove the given column or columns in list form.
+
+    Set copy to False to remove the columns from the given dataframe in place instead of returning a filtered copy.
+    """
 
-    def __init__(self, columns_to_remove):
+    # Pipelines pickled before the copy option existed always copied
+    copy = True
+
+    def __init__(self, columns_to_remove, copy=True):
         self.columns_to_remove = columns_to_remove
+        self.copy = copy
 
     def fit(self, x, y=None):
         return self
@@ -71,6 +84,12 @@ class DataframeColumnRemover(TransformerMixin):
             # if there is no grain column, for example
             return X
 
+        if not self.copy:
+            for column in [c for c in X.columns if c in self.columns_to_remove]:
+                del X[column]
+
+            return X
+
         # Build a list of all columns except for the grain column'
         filtered_column_names = [c for c in X.columns if c not in self.columns_to_remove]
 
@@ -79,11 +98,19 @@ class DataframeColumnRemover(TransformerMixin):
 
 
 class DataframeNullValueFilter(TransformerMixin):
-    """Given a pandas dataframe, remove rows that contain null values in any column except the excluded."""
+    """
+    Given a pandas dataframe, remove rows that contain null values in any column except the excluded.
+
+    Set copy to False to drop the rows from the given dataframe in place instead of returning a filtered copy.
+    """
+
+    # Pipelines pickled before the copy option existed dropped the rows in place. Either way gives the same result.
+    copy = True
 
-    def __init__(self, excluded_columns=None):
+    def __init__(self, excluded_columns=None, copy=True):
         # TODO validate excluded column is a list
         self.excluded_columns = excluded_columns or []
+        self.copy = copy
 
     def fit(self, x, y=None):
         return self
@@ -91,9 +118,13 @@ class DataframeNullValueFilter(TransformerMixin):
     def transform(self, x, y=None):
         validate_dataframe_input(x)
 
-        subset = [c for c in x.columns if c not in self.excluded_columns]
+        subset = [c for c in x.columns if c not in self.excluded_columns] if self.excluded_columns else None
 
-        x.dropna(axis=0, how='any', inplace=True, subset=subset)
+        if self.copy:
+            x = x.dropna(axis=0, how='any', subset=subset)
+        elif (x if subset is None else x[subset]).isnull().values.any():
+            # Only drop rows if there are any to drop, since dropna copies the whole dataframe even when nothing is null
+            x.dropna(axis=0, how='any', inplace=True, subset=subset)
 
         if x.empty:
             raise HealthcareAIError(
@@ -14,23 +14,67 @@ def get_categorical_levels(dataframe, columns_to_ignore):
         dict: a dictionary mapping categorical columns to Pandas dataframes containing the levels and their
         relative frequencies
     """
-    # Identify the categorical columns
-    categorical_columns = dataframe.select_dtypes(include=[object, 'category']).columns.copy()
-
-    for column in categorical_columns:
-        if column in columns_to_ignore:
-            categorical_columns = categorical_columns.drop(column)
-
-    column_info = {}
-
-    # Get the distribution of values for each categorical column
-    for column in categorical_columns:
-        value_distribution = dataframe[column].value_counts(sort=False)
-        # Sort by the index to ensure the correct dummy is dropped in get_dummies(drop_first=True)
-        value_distribution.sort_index(inplace=True)  # get counts for each factor level
-        total_count = value_distribution.values.sum()  # get the number of occurences for all levels of the factor
-        # divide the factor level counts by the total number to get the factor level frequencies
-        value_distribution *= 1 / total_count
-        column_info[column] = value_distribution
-
-    return column_info
+    return CategoricalLevelCounter(columns_to_ignore).partial_fit(dataframe).levels()
+
+
+class CategoricalLevelCounter(object):
+    """
+    Count the categorical levels of a dataframe that arrives in chunks (for example from `pd.read_sql(chunksize=...)`
+    or `pd.read_csv(chunksize=...)`).
+
+    Call `partial_fit` on each chunk, then `levels` returns the same dictionary `get_categorical_levels` would have
+    returned for all the chunks concatenated.
+    """
+
+    def __init__(self, columns_to_ignore):
+        """
+        Args:
+            columns_to_ignore (list): The names of columns that should not be included
+        """
+        self.columns_to_ignore = columns_to_ignore
+        self.level_counts = {}
+
+    def partial_fit(self, dataframe):
+        """
+        Add the level counts of another chunk.
+
+        Args:
+            dataframe (pandas.core.DataFrame): A chunk of the dataframe
+
+        Returns:
+            CategoricalLevelCounter: self
+        """
+        # Identify the categorical columns
+        categorical_columns = dataframe.select_dtypes(include=[object, 'category']).columns.copy()
+
+        for column in categorical_columns:
+            if column in self.columns_to_ignore:
+                categorical_columns = categorical_columns.drop(column)
+
+        # Get the distribution of values for each categorical column
+        for column in categorical_columns:
+            value_counts = dataframe[column].value_counts(sort=False)
+            previous = self.level_counts.get(column)
+            self.level_counts[column] = value_counts if previous is None else previous.add(value_counts, fill_value=0)
+
+        return self
+
+    def levels(self):
+        """
+        The levels and relative frequencies of the categorical columns seen so far.
+
+        Returns:
+            dict: a dictionary mapping categorical columns to Pandas dataframes containing the levels and their
+            relative frequencies
+        """
+        column_info = {}
+
+        for column, level_counts in self.level_counts.items():
+            # Sort by the index to ensure the correct dummy is dropped in get_dummies(drop_first=True)
+            value_distribution = level_counts.sort_index()  # get counts for each factor level
+            total_count = value_distribution.values.sum()  # get the number of occurences for all levels of the factor
+            # divide the factor level counts by the total number to get the factor level frequencies
+            value_distribution *= 1 / total_count
+            column_info[column] = value_distribution
+
+        return column_info
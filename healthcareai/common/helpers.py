@@ -1,5 +1,8 @@
 import math
+import numbers
+import pandas as pd
 import sklearn
+from pandas.core.frame import DataFrame
 
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
@@ -76,7 +79,7 @@ def get_hyperparameters_from_meta_estimator(model):
     if not issubclass(type(model), sklearn.base.BaseEstimator):
         raise HealthcareAIError('This requires an instance of sklearn.base.BaseEstimator')
 
-    if issubclass(type(model), sklearn.base.MetaEstimatorMixin):
+    if issubclass(type(model), sklearn.base.MetaEstimatorMixin) and hasattr(model, 'best_params_'):
         result = model.best_params_
     else:
         result = None
@@ -84,5 +87,49 @@ def get_hyperparameters_from_meta_estimator(model):
     return result
 
 
+def iter_dataframe_chunks(source, chunk_size=None):
+    """
+    Yield dataframes of at most `chunk_size` rows from a dataframe or an iterable of dataframes.
+
+    This lets large prediction populations be processed with bounded memory, for example from
+    `pandas.read_csv(..., chunksize=...)` or `pandas.read_sql(..., chunksize=...)`.
+
+    Args:
+        source (pandas.core.frame.DataFrame or iterable): A single dataframe or an iterable of dataframes
+        chunk_size (int): Maximum number of rows per yielded chunk. None yields the source chunks as they are.
+
+    Returns:
+        generator: pandas.core.frame.DataFrame chunks in the original row order
+    """
+    if chunk_size is not None and (not isinstance(chunk_size, numbers.Integral) or isinstance(chunk_size, bool) or
+                                   chunk_size < 1):
+        raise HealthcareAIError('The chunk_size must be a positive integer. You passed in {}'.format(chunk_size))
+
+    if isinstance(source, DataFrame):
+        source = [source]
+
+    for dataframe in source:
+        if not isinstance(dataframe, DataFrame):
+            raise HealthcareAIError('Chunked processing requires pandas dataframes and you passed in a {}'.format(
+                type(dataframe)))
+
+        if chunk_size is None or len(dataframe) <= chunk_size:
+            yield dataframe
+        else:
+            for start in range(0, len(dataframe), chunk_size):
+                yield dataframe.iloc[start:start + chunk_size]
+
+
+def is_sparse_dataframe(dataframe):
+    """Return True if the input is a dataframe whose columns are all sparse (see `pandas.SparseDtype`)."""
+    return isinstance(dataframe, DataFrame) and len(dataframe.columns) > 0 and all(
+        isinstance(dtype, pd.SparseDtype) for dtype in dataframe.dtypes)
+
+
+def to_sparse_matrix(dataframe):
+    """Convert a dataframe of sparse columns to a scipy.sparse CSR matrix without densifying it."""
+    return dataframe.sparse.to_coo().tocsr()
+
+
 if __name__ == '__main__':
     pass
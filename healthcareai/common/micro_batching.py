@@ -0,0 +1,356 @@
+"""Micro Batching
+
+This module coalesces many small concurrent scoring requests into larger batches for a trained supervised model.
+
+Most of the cost of scoring a handful of rows is fixed per call (running the preparation plan, validating inputs and,
+for random forests, walking every tree in `predict_proba`), so scoring 50 single-row requests as one 50-row batch is
+much faster than scoring them one at a time.
+
+`MicroBatcher` serves callers on ordinary threads (such as the HTTP scoring service) and `AsyncMicroBatcher` serves
+coroutines running on an asyncio event loop.
+"""
+import asyncio
+import numbers
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+
+
+def score_dataframes(trained_model, dataframes, number_top_features=None):
+    """
+    Score several raw prediction dataframes with as few calls to the model as possible and split the results back out.
+
+    Each result is the same as calling `make_predictions` (or `make_predictions_with_k_factors` when factors are
+    requested) on that dataframe alone. Only dataframes with the same columns are combined, so that a request missing a
+    required column is never silently imputed from the others. If a combined batch fails, each of its dataframes is
+    scored on its own so that one bad request doesn't fail the others.
+
+    Args:
+        trained_model (TrainedSupervisedModel): The model to score with
+        dataframes (list): Raw prediction dataframes
+        number_top_features (int): Optional number of top features. Factors are skipped if None.
+
+    Returns:
+        list: A result dataframe or an Exception for each input dataframe, in the same order
+    """
+    positions_by_columns = {}
+    for position, dataframe in enumerate(dataframes):
+        positions_by_columns.setdefault(frozenset(dataframe.columns), []).append(position)
+
+    results = [None] * len(dataframes)
+    for positions in positions_by_columns.values():
+        group_results = _score_group(trained_model, [dataframes[i] for i in positions], number_top_features)
+        for position, result in zip(positions, group_results):
+            results[position] = result
+
+    return results
+
+
+def score_requests(trained_model, requests):
+    """
+    Score a batch of (dataframe, number of top features) requests, grouping those that ask for the same output.
+
+    Args:
+        trained_model (TrainedSupervisedModel): The model to score with
+        requests (list): (raw prediction dataframe, number of top features or None) tuples
+
+    Returns:
+        list: A result dataframe or an Exception for each request, in the same order
+    """
+    positions_by_factor_count = {}
+    for position, (_, number_top_features) in enumerate(requests):
+        positions_by_factor_count.setdefault(number_top_features, []).append(position)
+
+    results = [None] * len(requests)
+    for number_top_features, positions in positions_by_factor_count.items():
+        group_results = score_dataframes(trained_model, [requests[i][0] for i in positions],
+                                         number_top_features=number_top_features)
+        for position, result in zip(positions, group_results):
+            results[position] = result
+
+    return results
+
+
+class BatchMetrics(object):
+    """Thread safe counts of the requests, rows, batches and errors scored by a micro batcher."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {'requests': 0, 'rows': 0, 'batches': 0, 'errors': 0, 'scoring_seconds': 0.0}
+
+    def record(self, requests, results, scoring_seconds):
+        """Record a scored batch of (dataframe, number of top features) requests and their results."""
+        with self._lock:
+            self._metrics['requests'] += len(requests)
+            self._metrics['rows'] += sum(len(dataframe) for dataframe, _ in requests)
+            self._metrics['batches'] += 1
+            self._metrics['errors'] += sum(isinstance(result, Exception) for result in results)
+            self._metrics['scoring_seconds'] += scoring_seconds
+
+    def snapshot(self):
+        """Return a copy of the counts and the mean number of requests per batch."""
+        with self._lock:
+            metrics = dict(self._metrics)
+
+        metrics['mean_batch_size'] = metrics['requests'] / metrics['batches'] if metrics['batches'] else 0.0
+        return metrics
+
+
+class MicroBatcher(object):
+    """
+    Collect concurrent scoring requests for a few milliseconds and score them together on worker threads.
+
+    Requests are submitted from any thread and return a `concurrent.futures.Future` that resolves to the same
+    dataframe `make_predictions` (or `make_predictions_with_k_factors`) would have returned for that request.
+    """
+
+    def __init__(self, trained_model, max_batch_size=1000, max_wait=0.005, workers=1):
+        """
+        Create a micro batcher and start its worker threads.
+
+        Args:
+            trained_model (TrainedSupervisedModel): The model to score with
+            max_batch_size (int): A batch is scored as soon as it holds this many rows
+            max_wait (float): The maximum number of seconds to wait for more requests before scoring a batch
+            workers (int): The number of threads scoring batches
+        """
+        if not isinstance(workers, numbers.Integral) or isinstance(workers, bool) or workers < 1:
+            raise HealthcareAIError('The number of workers must be a positive integer. You passed in {}'.format(
+                workers))
+
+        self.trained_model = trained_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._requests = queue.Queue()
+        self._metrics = BatchMetrics()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def metrics(self):
+        """Return a snapshot of the request, row, batch and error counts and the total time spent scoring."""
+        return self._metrics.snapshot()
+
+    def submit(self, dataframe, number_top_features=None):
+        """
+        Queue a raw prediction dataframe for scoring in the next batch.
+
+        Args:
+            dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
+            number_top_features (int): Optional number of top features. Factors are skipped if None.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the result dataframe
+        """
+        future = Future()
+        self._requests.put((dataframe, number_top_features, future))
+        return future
+
+    def score(self, dataframe, number_top_features=None):
+        """Submit a raw prediction dataframe and block until its results are ready."""
+        return self.submit(dataframe, number_top_features=number_top_features).result()
+
+    def close(self):
+        """Stop the worker threads once the requests already queued have been scored."""
+        for _ in self._workers:
+            self._requests.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _work(self):
+        """Worker thread loop: gather a batch, score it and resolve each request's future."""
+        while True:
+            batch = self._gather_batch()
+            if batch is None:
+                return
+            self._score_batch(batch)
+
+    def _gather_batch(self):
+        """Block for one request, then keep collecting until the batch is full or max_wait has passed."""
+        request = self._requests.get()
+        if request is None:
+            return None
+
+        batch = [request]
+        rows = len(request[0])
+        deadline = time.time() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Put the stop signal back so this worker stops after scoring the current batch
+                self._requests.put(None)
+                break
+            batch.append(request)
+            rows += len(request[0])
+
+        return batch
+
+    def _score_batch(self, batch):
+        """Score a batch and resolve each request's future."""
+        start = time.time()
+        requests = [(dataframe, number_top_features) for dataframe, number_top_features, _ in batch]
+        results = score_requests(self.trained_model, requests)
+
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self._metrics.record(requests, results, time.time() - start)
+
+
+class AsyncMicroBatcher(object):
+    """
+    Coalesce concurrent scoring coroutines on an asyncio event loop into vectorized batches.
+
+    Each awaiting caller gets back the same dataframe `make_predictions` (or `make_predictions_with_k_factors`) would
+    have returned for its request. Batches are scored in an executor so the event loop is never blocked. For example:
+
+        batcher = AsyncMicroBatcher(trained_model, max_wait=0.005)
+        predictions = await batcher.score(encounter_dataframe)
+    """
+
+    def __init__(self, trained_model, max_batch_size=1000, max_wait=0.005, executor=None):
+        """
+        Create an asyncio micro batcher.
+
+        Args:
+            trained_model (TrainedSupervisedModel): The model to score with
+            max_batch_size (int): A batch is scored as soon as it holds this many rows
+            max_wait (float): The maximum number of seconds the first request of a batch waits for others
+            executor (concurrent.futures.Executor): Where batches are scored. Defaults to the event loop's default
+                executor.
+        """
+        self.trained_model = trained_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+
+        self._pending = []
+        self._pending_rows = 0
+        self._flush_handle = None
+        # The event loop only keeps weak references to tasks, so scoring tasks are kept here until they finish
+        self._tasks = set()
+        self._metrics = BatchMetrics()
+
+    @property
+    def metrics(self):
+        """Return a snapshot of the request, row, batch and error counts and the total time spent scoring."""
+        return self._metrics.snapshot()
+
+    async def score(self, dataframe, number_top_features=None):
+        """
+        Score a raw prediction dataframe as part of the next batch.
+
+        Args:
+            dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
+            number_top_features (int): Optional number of top features. Factors are skipped if None.
+
+        Returns:
+            pandas.core.frame.DataFrame: The predictions (with factors if requested)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self._pending.append((dataframe, number_top_features, future))
+        self._pending_rows += len(dataframe)
+
+        if self._pending_rows >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand the pending requests to the executor as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch = self._pending
+        self._pending = []
+        self._pending_rows = 0
+
+        if len(batch) > 0:
+            task = asyncio.get_running_loop().create_task(self._score_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score_batch(self, batch):
+        """Score a batch in the executor and resolve each caller's future on the event loop."""
+        loop = asyncio.get_running_loop()
+        start = time.time()
+        requests = [(dataframe, number_top_features) for dataframe, number_top_features, _ in batch]
+
+        try:
+            results = await loop.run_in_executor(self.executor, score_requests, self.trained_model, requests)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                # The caller was cancelled while waiting
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self._metrics.record(requests, results, time.time() - start)
+
+
+def _score_group(trained_model, dataframes, number_top_features):
+    """Score dataframes that have the same columns as one combined dataframe and split the results back out."""
+    if len(dataframes) == 1:
+        return [_score_or_error(trained_model, dataframes[0], number_top_features)]
+
+    try:
+        combined_results = _score(trained_model, pd.concat(dataframes, ignore_index=True), number_top_features)
+    except Exception:
+        return [_score_or_error(trained_model, dataframe, number_top_features) for dataframe in dataframes]
+
+    results = []
+    start = 0
+    for dataframe in dataframes:
+        result = combined_results.iloc[start:start + len(dataframe)]
+        start += len(dataframe)
+
+        # Restore the index each result would have had if the dataframe was scored alone
+        if number_top_features is None:
+            result = result.reset_index(drop=True)
+        else:
+            result = result.set_index(dataframe.index)
+        results.append(result)
+
+    return results
+
+
+def _score(trained_model, dataframe, number_top_features):
+    """Score a dataframe with predictions only or with predictions and factors."""
+    if number_top_features is None:
+        return trained_model.make_predictions(dataframe)
+
+    return trained_model.make_predictions_with_k_factors(dataframe, number_top_features=number_top_features)
+
+
+def _score_or_error(trained_model, dataframe, number_top_features):
+    """Score a dataframe, returning any error instead of raising it."""
+    try:
+        return _score(trained_model, dataframe, number_top_features)
+    except Exception as e:
+        return e
@@ -0,0 +1,445 @@
+"""Model Artifacts
+
+This module saves and loads trained models in a compact, versioned artifact format instead of pickling the whole
+TrainedSupervisedModel into a single opaque file.
+
+An artifact is a zip file with
+
+    manifest.json           The format version, model metadata (type, algorithm, columns, scalar metrics) and an index
+                            of the other members
+    scoring.pkl             Everything needed to make predictions: the estimator, the factor model, the fit pipeline
+                            and the column metadata
+    scoring.arrays          The numeric arrays of the scoring objects (such as tree nodes and coefficients)
+    evaluation.pkl          The evaluation payload: test set predictions and actuals, all the metrics (including the
+                            ROC and PR threshold arrays) and the hyperparameter search with its cross validation results
+    evaluation.arrays       The numeric arrays of the evaluation payload
+
+Numeric arrays are pulled out of the pickles while pickling and laid out (aligned) one after the other in an
+uncompressed array block, so loading reads them in one go and the arrays are views into the block rather than copies
+made by the pickle stream. The pickles and manifest are compressed. Scoring jobs load just the manifest and the
+scoring members, never the evaluation payload.
+
+The data of an array block starts at an aligned offset in the file, so the block can also be memory-mapped read-only
+instead of read (`load_model_artifact(filename, memory_map=True)`). Every process that maps the same artifact then
+shares one copy of its arrays through the operating system's page cache.
+
+Artifacts can also be saved compressed (`save_model_artifact(trained_model, filename, compression='zlib')`, see
+`healthcareai.common.compression`), which makes them smaller to move between environments. The pickle and array block
+of each section are then compressed in chunks that are (de)compressed on several threads, and stored as is in the zip
+file. Compressed array blocks can't be memory-mapped.
+"""
+import copy
+import io
+import json
+import pickle
+import struct
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+import healthcareai.common.compression as hcai_compression
+import healthcareai.common.helpers as hcai_helpers
+from healthcareai.common.healthcareai_error import HealthcareAIError
+
+ARTIFACT_FORMAT = 'healthcareai-model'
+
+# Bump this when the layout changes in a way older versions can't read
+ARTIFACT_FORMAT_VERSION = 2
+
+# Version 2 added compressed sections. Artifacts without them are still saved as version 1, which older versions of
+# healthcareai read.
+UNCOMPRESSED_FORMAT_VERSION = 1
+
+MANIFEST_NAME = 'manifest.json'
+
+# Arrays smaller than this stay inside the pickles, where they cost less than a reference to the array block
+ARRAY_MIN_BYTES = 256
+
+# The offset of every array in an array block is a multiple of this
+ARRAY_ALIGNMENT = 64
+
+# Array blocks are read in chunks of this size, so reading one never needs twice its size in memory
+READ_CHUNK_BYTES = 16 * 1024 * 1024
+
+# The zip local file header: a signature, fixed size fields, then the file name and extra field (whose lengths are the
+# last two fixed fields)
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+LOCAL_HEADER_SIZE = 30
+ZIP64_EXTRA_SIZE = 20
+
+# The (otherwise unused) extra field id that pads the local header of an array block, as Android's zipalign does
+PADDING_EXTRA_ID = 0xD935
+
+# The TrainedSupervisedModel attributes that only matter for evaluating the model, not for scoring with it
+EVALUATION_ATTRIBUTES = ['test_set_predictions', 'test_set_class_labels', 'test_set_actual', '_metric_by_name']
+
+# Cached attributes that are rebuilt the first time they are needed
+CACHED_ATTRIBUTES = ['_prediction_plan', '_categorical_encoder']
+
+
+def save_model_artifact(trained_model, filename, compression=None, n_jobs=1):
+    """
+    Save a trained supervised model as a model artifact.
+
+    Args:
+        trained_model (TrainedSupervisedModel): The model to save
+        filename (str): The file name of the artifact
+        compression (str): Optional compression of the pickles and arrays: 'zlib', 'lz4' or 'zstd'
+        n_jobs (int): The number of threads compressing. -1 uses all CPUs.
+    """
+    if not isinstance(filename, str):
+        raise HealthcareAIError('Filename must be a string. You passed in a {}'.format(filename))
+    if compression is not None:
+        hcai_compression.validate_compression(compression)
+
+    scoring_model, evaluation = _split_scoring_and_evaluation(trained_model)
+
+    with zipfile.ZipFile(filename, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        sections = {
+            'scoring': _write_section(archive, 'scoring', scoring_model, compression=compression, n_jobs=n_jobs),
+            'evaluation': _write_section(archive, 'evaluation', evaluation, compression=compression, n_jobs=n_jobs),
+        }
+
+        format_version = UNCOMPRESSED_FORMAT_VERSION if compression is None else ARTIFACT_FORMAT_VERSION
+        manifest = _build_manifest(trained_model, sections, format_version)
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=4, sort_keys=True),
+                         compress_type=zipfile.ZIP_DEFLATED)
+
+
+def load_model_artifact(filename, scoring_only=False, memory_map=False, n_jobs=1):
+    """
+    Load a trained supervised model from a model artifact.
+
+    Args:
+        filename (str): The file name of the artifact
+        scoring_only (bool): True to only load what is needed to make predictions. The test set predictions and
+            actuals, the ROC and PR curves and the hyperparameter search results are then not loaded, and the metrics
+            are the scalar metrics from the manifest.
+        memory_map (bool): True to memory-map the arrays read-only instead of reading them into memory, so processes
+            scoring with the same artifact share them. Estimators that copy their arrays into their own buffers when
+            they are unpickled (such as scikit-learn's trees) still get private copies. Load those once and fork the
+            scoring processes afterwards to share them. Compressed artifacts are always read.
+        n_jobs (int): The number of threads decompressing a compressed artifact. -1 uses all CPUs.
+
+    Returns:
+        TrainedSupervisedModel: The model
+    """
+    with zipfile.ZipFile(filename, 'r') as archive:
+        manifest = read_manifest(archive)
+        trained_model = _read_section(archive, manifest['sections']['scoring'], memory_map=memory_map, n_jobs=n_jobs)
+
+        if scoring_only:
+            _drop_evaluation(trained_model, manifest['metrics'])
+        else:
+            evaluation = _read_section(archive, manifest['sections']['evaluation'], memory_map=memory_map,
+                                       n_jobs=n_jobs)
+            _restore_evaluation(trained_model, evaluation)
+
+    return trained_model
+
+
+def is_model_artifact(filename):
+    """True if the file is a model artifact (rather than, for example, a pickled model)."""
+    return zipfile.is_zipfile(filename)
+
+
+def read_manifest(archive):
+    """
+    Read and validate the manifest of an open model artifact.
+
+    Args:
+        archive (zipfile.ZipFile): The open artifact
+
+    Returns:
+        dict: The manifest
+
+    Raises:
+        HealthcareAIError: If the file isn't a model artifact or was saved by a newer version of healthcareai
+    """
+    try:
+        manifest = json.loads(archive.read(MANIFEST_NAME).decode('utf-8'))
+    except KeyError:
+        raise HealthcareAIError('{} is not a healthcareai model artifact (it has no manifest).'.format(
+            archive.filename))
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise HealthcareAIError('{} is not a healthcareai model artifact.'.format(archive.filename))
+
+    if manifest['format_version'] > ARTIFACT_FORMAT_VERSION:
+        raise HealthcareAIError(
+            '{} was saved in model artifact format version {}, but this version of healthcareai only reads versions up '
+            'to {}. Please upgrade healthcareai to load it.'.format(archive.filename, manifest['format_version'],
+                                                                    ARTIFACT_FORMAT_VERSION))
+
+    return manifest
+
+
+def scoring_copy(trained_model):
+    """
+    A copy of a trained model without its evaluation payload (see `TrainedSupervisedModel.export_for_scoring`).
+
+    Args:
+        trained_model (TrainedSupervisedModel): The model, which is not changed
+
+    Returns:
+        TrainedSupervisedModel: The copy
+    """
+    scoring_model, _ = _split_scoring_and_evaluation(trained_model)
+    _drop_evaluation(scoring_model, scalar_metrics(trained_model.metrics))
+
+    return scoring_model
+
+
+def scalar_metrics(metrics):
+    """The metrics that are single numbers (such as the ROC AUC), without the curves and their thresholds."""
+    return {name: value for name, value in (metrics or {}).items() if np.isscalar(value) and not isinstance(value, str)}
+
+
+def _split_scoring_and_evaluation(trained_model):
+    """
+    Split a trained model into a copy that only holds what scoring needs and a dictionary of the evaluation payload.
+
+    The model itself is not changed.
+    """
+    scoring_model = copy.copy(trained_model)
+
+    evaluation = {attribute: scoring_model.__dict__.pop(attribute, None) for attribute in EVALUATION_ATTRIBUTES}
+    for attribute in CACHED_ATTRIBUTES:
+        scoring_model.__dict__.pop(attribute, None)
+
+    # Scoring only needs the best estimator of a hyperparameter search. The search (without its best estimator, which
+    # is stored once with the scoring objects) is part of the evaluation payload.
+    evaluation['search'] = None
+    best_estimator = hcai_helpers.extract_estimator_from_meta_estimator(trained_model.model)
+    if best_estimator is not trained_model.model:
+        search = copy.copy(trained_model.model)
+        del search.best_estimator_
+        evaluation['search'] = search
+        scoring_model.model = best_estimator
+
+    return scoring_model, evaluation
+
+
+def _drop_evaluation(trained_model, metrics):
+    """Clear the evaluation payload of a model loaded from its scoring objects, keeping the given metrics."""
+    for attribute in EVALUATION_ATTRIBUTES:
+        setattr(trained_model, attribute, None)
+    trained_model._metric_by_name = metrics
+
+
+def _restore_evaluation(trained_model, evaluation):
+    """Put the evaluation payload back on a model loaded from its scoring objects."""
+    for attribute in EVALUATION_ATTRIBUTES:
+        setattr(trained_model, attribute, evaluation[attribute])
+
+    search = evaluation['search']
+    if search is not None:
+        search.best_estimator_ = trained_model.model
+        trained_model.model = search
+
+
+class _ArrayExtractingPickler(pickle.Pickler):
+    """
+    A pickler that lays large numeric arrays out one after the other in a separate array block instead of writing
+    them into the pickle stream. The pickle only refers to each array by its offset, dtype and shape.
+    """
+
+    def __init__(self, file):
+        super(_ArrayExtractingPickler, self).__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = []
+        self.block_size = 0
+        # The same array can be referenced from several places, but is only stored once
+        self._reference_by_id = {}
+
+    def persistent_id(self, obj):
+        if type(obj) not in (np.ndarray, np.memmap) or obj.dtype.hasobject or obj.nbytes < ARRAY_MIN_BYTES:
+            return None
+
+        reference = self._reference_by_id.get(id(obj))
+        if reference is None:
+            # Fortran ordered arrays (such as some coefficient matrices) are stored as their C ordered transpose
+            fortran_order = obj.flags.f_contiguous and not obj.flags.c_contiguous
+            offset = _aligned(self.block_size)
+            reference = (offset, obj.dtype, obj.shape, fortran_order)
+
+            self._reference_by_id[id(obj)] = reference
+            self.arrays.append((offset, obj.T if fortran_order else obj))
+            self.block_size = offset + obj.nbytes
+
+        return reference
+
+
+class _ArrayLoadingUnpickler(pickle.Unpickler):
+    """An unpickler that rebuilds the arrays a `_ArrayExtractingPickler` stored as views into the array block."""
+
+    def __init__(self, file, array_block):
+        super(_ArrayLoadingUnpickler, self).__init__(file)
+        self.array_block = array_block
+
+    def persistent_load(self, pid):
+        offset, dtype, shape, fortran_order = pid
+        count = 1
+        for length in shape:
+            count *= length
+        array = np.frombuffer(self.array_block, dtype=dtype, count=count, offset=offset)
+
+        if fortran_order:
+            return array.reshape(shape[::-1]).T
+
+        return array.reshape(shape)
+
+
+def _aligned(offset):
+    """The next array offset at or after the given one, aligned for any dtype (and SIMD loads)."""
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+def _write_section(archive, section_name, obj, compression=None, n_jobs=1):
+    """Pickle an object into an artifact with its arrays in a separate array block and return its manifest entry."""
+    stream = io.BytesIO()
+    pickler = _ArrayExtractingPickler(stream)
+    pickler.dump(obj)
+
+    pickle_name = '{}.pkl'.format(section_name)
+    arrays_name = '{}.arrays'.format(section_name)
+    section = {'pickle': pickle_name, 'arrays': arrays_name, 'array_count': len(pickler.arrays),
+               'array_bytes': pickler.block_size}
+
+    if compression is not None:
+        array_block = bytearray(pickler.block_size)
+        for offset, piece in _array_block_pieces(pickler.arrays):
+            array_block[offset:offset + len(piece)] = piece
+
+        section.update(compression=compression, chunk_bytes=hcai_compression.CHUNK_BYTES, pickle_bytes=len(stream.getbuffer()),
+                       pickle_chunks=_write_chunks(archive, pickle_name, stream.getbuffer(), compression, n_jobs),
+                       array_chunks=_write_chunks(archive, arrays_name, array_block, compression, n_jobs))
+        return section
+
+    archive.writestr(pickle_name, stream.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+
+    # The array block is stored uncompressed, so the array data sits as is (and aligned) in the artifact
+    block_info = zipfile.ZipInfo(arrays_name, date_time=time.localtime()[:6])
+    block_info.extra = _alignment_padding(archive.fp.tell(), arrays_name)
+    with archive.open(block_info, 'w', force_zip64=True) as block:
+        for _, piece in _array_block_pieces(pickler.arrays):
+            block.write(piece)
+
+    return section
+
+
+def _array_block_pieces(arrays):
+    """The (offset, bytes) pieces that make up an array block: the bytes of each array preceded by its padding."""
+    position = 0
+    for offset, array in arrays:
+        yield position, b'\0' * (offset - position)
+        yield offset, memoryview(np.ascontiguousarray(array).reshape(-1).view(np.uint8))
+        position = offset + array.nbytes
+
+
+def _write_chunks(archive, member_name, data, compression, n_jobs):
+    """Write data compressed in chunks as an (uncompressed) member of an artifact and return the chunk sizes."""
+    chunks = hcai_compression.compress_chunks(data, compression, n_jobs=n_jobs)
+
+    info = zipfile.ZipInfo(member_name, date_time=time.localtime()[:6])
+    with archive.open(info, 'w', force_zip64=True) as member:
+        for chunk in chunks:
+            member.write(chunk)
+
+    return [len(chunk) for chunk in chunks]
+
+
+def _read_chunks(archive, member_name, section, chunk_sizes, size, n_jobs):
+    """Read and decompress a member of a section written by `_write_chunks`."""
+    with archive.open(member_name) as member:
+        chunks = [member.read(chunk_size) for chunk_size in chunk_sizes]
+
+    return hcai_compression.decompress_chunks(chunks, section['compression'], size, section['chunk_bytes'],
+                                              n_jobs=n_jobs)
+
+
+def _read_section(archive, section, memory_map=False, n_jobs=1):
+    """Unpickle an object written by `_write_section`."""
+    if section.get('compression') is not None:
+        pickle_data = _read_chunks(archive, section['pickle'], section, section['pickle_chunks'],
+                                   section['pickle_bytes'], n_jobs)
+        array_block = _read_chunks(archive, section['arrays'], section, section['array_chunks'],
+                                   section['array_bytes'], n_jobs)
+        return _ArrayLoadingUnpickler(io.BytesIO(pickle_data), array_block).load()
+
+    block_info = archive.getinfo(section['arrays'])
+
+    if memory_map and section['array_bytes'] > 0 and block_info.compress_type == zipfile.ZIP_STORED:
+        # The arrays are read-only views into the mapped file
+        array_block = np.memmap(archive.filename, dtype=np.uint8, mode='r', offset=_data_offset(archive, block_info),
+                                shape=(section['array_bytes'],))
+    else:
+        # All the arrays are read into one (writeable) block, which they are then views into
+        array_block = bytearray(section['array_bytes'])
+        block_view = memoryview(array_block)
+        with archive.open(block_info) as block:
+            for start in range(0, len(array_block), READ_CHUNK_BYTES):
+                chunk = block.read(READ_CHUNK_BYTES)
+                block_view[start:start + len(chunk)] = chunk
+
+    with archive.open(section['pickle']) as pickle_file:
+        return _ArrayLoadingUnpickler(pickle_file, array_block).load()
+
+
+def _alignment_padding(header_offset, member_name):
+    """
+    The extra field that pads the local header of a zip64 member written at the given offset, so its data starts at an
+    offset aligned to ARRAY_ALIGNMENT.
+    """
+    header_size = LOCAL_HEADER_SIZE + len(member_name.encode('utf-8')) + ZIP64_EXTRA_SIZE + 4
+    padding = -(header_offset + header_size) % ARRAY_ALIGNMENT
+
+    return struct.pack('<HH', PADDING_EXTRA_ID, padding) + b'\0' * padding
+
+
+def _data_offset(archive, info):
+    """The offset in the file of the data of an (uncompressed) member, which follows its local header."""
+    archive.fp.seek(info.header_offset)
+    header = archive.fp.read(LOCAL_HEADER_SIZE)
+    if header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise HealthcareAIError('{} is not a valid model artifact (the {} member is corrupt).'.format(
+            archive.filename, info.filename))
+
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    return info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+
+def _build_manifest(trained_model, sections, format_version):
+    """The manifest of a model artifact: the format, model metadata and an index of the members."""
+    return {
+        'format': ARTIFACT_FORMAT,
+        'format_version': format_version,
+        'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'library_versions': {'numpy': np.__version__, 'pandas': pd.__version__, 'scikit-learn': sklearn.__version__},
+        'model_type': trained_model.model_type,
+        'algorithm_name': trained_model.algorithm_name,
+        'grain_column': _to_json_value(trained_model.grain_column),
+        'prediction_column': _to_json_value(trained_model.prediction_column),
+        'column_names': _to_json_value(trained_model.column_names),
+        'original_column_names': _to_json_value(trained_model.original_column_names),
+        'training_time': _to_json_value(trained_model.train_time),
+        'best_hyperparameters': _to_json_value(trained_model.best_hyperparameters),
+        'metrics': _to_json_value(scalar_metrics(trained_model.metrics)),
+        'sections': sections,
+    }
+
+
+def _to_json_value(value):
+    """Convert numpy and pandas values (recursively) to their json counterparts, and anything else to a string."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {str(key): _to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return [_to_json_value(item) for item in value]
+
+    return str(value)
@@ -0,0 +1,152 @@
+"""Model Registry
+
+Jobs that score with many saved models (for example one per metric or service line) would otherwise pay the cost of
+reading and unpickling each file on every `load_saved_model` call. A `ModelRegistry` loads each model the first time
+it is asked for and hands out the same loaded model after that.
+
+Models are keyed by their absolute path, and a model is reloaded when its file's modification time or size changes,
+so retraining a model in place is picked up without restarting the job. When the registry holds more than its memory
+budget, the least recently used models are evicted. The size of a loaded model is estimated by the size of its file,
+which is close for model artifacts (whose arrays are stored uncompressed) and an underestimate for compressed files.
+
+The registry is safe to use from several threads. Different models load concurrently, while threads asking for a model
+that is being loaded wait for that one load instead of loading it again.
+"""
+import collections
+import numbers
+import os
+import threading
+
+import healthcareai.common.file_io_utilities as hcai_io
+from healthcareai.common.healthcareai_error import HealthcareAIError
+
+_LoadedModel = collections.namedtuple('_LoadedModel', ['version', 'trained_model', 'size'])
+
+
+class ModelRegistry(object):
+    """An in-process cache of loaded models with least recently used eviction under a memory budget."""
+
+    def __init__(self, max_bytes=None, scoring_only=False, memory_map=False):
+        """
+        Create an empty model registry.
+
+        Args:
+            max_bytes (int): The memory budget in bytes. When the loaded models take more, the least recently used
+                ones are evicted. None for no budget.
+            scoring_only (bool): True to load the models without their evaluation payload (see `load_saved_model`)
+            memory_map (bool): True to memory-map the arrays of the models (see `load_saved_model`)
+        """
+        if max_bytes is not None and (not isinstance(max_bytes, numbers.Integral) or isinstance(max_bytes, bool) or
+                                      max_bytes < 1):
+            raise HealthcareAIError('The memory budget must be a positive number of bytes or None. You passed in '
+                                    '{}'.format(max_bytes))
+
+        self.max_bytes = max_bytes
+        self.scoring_only = scoring_only
+        self.memory_map = memory_map
+
+        # Ordered from least to most recently used
+        self._models = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._loading_locks = {}
+        self._metrics = collections.Counter()
+
+    def get(self, filename):
+        """
+        Return the loaded model saved in a file, loading it the first time and again when the file changes.
+
+        Args:
+            filename (str): The file name of the saved model
+
+        Returns:
+            TrainedSupervisedModel: The loaded model
+        """
+        path = os.path.abspath(filename)
+        version = _file_version(path)
+
+        loaded = self._cached(path, version)
+        if loaded is not None:
+            return loaded.trained_model
+
+        # Only one thread loads a given model, others asking for it at the same time wait for it
+        with self._loading_lock(path):
+            loaded = self._cached(path, version)
+            if loaded is not None:
+                return loaded.trained_model
+
+            trained_model = hcai_io.load_saved_model(path, debug=False, scoring_only=self.scoring_only,
+                                                     memory_map=self.memory_map)
+            self._add(path, _LoadedModel(version, trained_model, version[1]))
+
+        return trained_model
+
+    def evict(self, filename):
+        """Evict a model from the registry. Returns True if it was loaded."""
+        with self._lock:
+            return self._models.pop(os.path.abspath(filename), None) is not None
+
+    def clear(self):
+        """Evict all models from the registry."""
+        with self._lock:
+            self._models.clear()
+
+    @property
+    def loaded_bytes(self):
+        """The estimated memory in bytes of the loaded models."""
+        with self._lock:
+            return sum(loaded.size for loaded in self._models.values())
+
+    @property
+    def metrics(self):
+        """Return the number of hits, loads (misses), reloads of changed files and evictions."""
+        with self._lock:
+            return {name: self._metrics[name] for name in ['hits', 'loads', 'reloads', 'evictions']}
+
+    def __contains__(self, filename):
+        with self._lock:
+            return os.path.abspath(filename) in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+    def _cached(self, path, version):
+        """The loaded model of a path if it is loaded from the current version of the file, otherwise None."""
+        with self._lock:
+            loaded = self._models.get(path)
+            if loaded is None or loaded.version != version:
+                return None
+
+            self._models.move_to_end(path)
+            self._metrics['hits'] += 1
+            return loaded
+
+    def _loading_lock(self, path):
+        """The lock a thread holds while it loads the model of a path."""
+        with self._lock:
+            return self._loading_locks.setdefault(path, threading.Lock())
+
+    def _add(self, path, loaded):
+        """Add a newly loaded model as the most recently used one and evict others until it fits the budget."""
+        with self._lock:
+            self._metrics['reloads' if path in self._models else 'loads'] += 1
+            self._models.pop(path, None)
+            self._models[path] = loaded
+
+            # The newly loaded model is kept even if it doesn't fit the budget on its own
+            total = sum(model.size for model in self._models.values())
+            while self.max_bytes is not None and total > self.max_bytes and len(self._models) > 1:
+                _, evicted = self._models.popitem(last=False)
+                total -= evicted.size
+                self._metrics['evictions'] += 1
+
+
+def _file_version(path):
+    """The modification time and size of a file, which change when the file is saved again."""
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        raise HealthcareAIError(
+            'No file named \'{}\' was found. Please verify the file you intend to load'.format(path))
+
+    return status.st_mtime_ns, status.st_size
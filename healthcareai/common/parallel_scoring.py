@@ -0,0 +1,89 @@
+"""Parallel Scoring
+
+This module contains helpers for scoring dataframe chunks with a trained supervised model in a pool of worker
+processes. Each worker receives the model once when it starts rather than with every chunk of work.
+"""
+import collections
+import multiprocessing
+import numbers
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+
+# The trained model of the current worker process, set once by the pool initializer
+_worker_model = None
+
+
+def effective_n_jobs(n_jobs):
+    """
+    Convert a scikit-learn style n_jobs value into the number of worker processes to use.
+
+    Args:
+        n_jobs (int): The number of processes. -1 uses all CPUs, -2 all CPUs but one, etc. None means 1.
+
+    Returns:
+        int: The number of worker processes (at least 1)
+    """
+    if n_jobs is None:
+        return 1
+
+    if not isinstance(n_jobs, numbers.Integral) or isinstance(n_jobs, bool) or n_jobs == 0:
+        raise HealthcareAIError('n_jobs must be a non-zero integer (use -1 for all CPUs). You passed in {}'.format(
+            n_jobs))
+
+    if n_jobs < 0:
+        return max(multiprocessing.cpu_count() + 1 + int(n_jobs), 1)
+
+    return int(n_jobs)
+
+
+def imap_ordered(trained_model, method_name, chunks, n_jobs, method_kwargs=None):
+    """
+    Score dataframe chunks in a pool of worker processes, yielding the results in the original chunk order.
+
+    Only a bounded number of chunks are in flight at once, so this can stream from a lazy source such as
+    `pandas.read_sql(..., chunksize=...)` without pulling it all into memory.
+
+    Args:
+        trained_model (TrainedSupervisedModel): The model, sent to each worker once when it starts
+        method_name (str): The name of the TrainedSupervisedModel prediction method run on each chunk
+        chunks (iterable): Raw prediction dataframes
+        n_jobs (int): The number of worker processes
+        method_kwargs (dict): Optional keyword arguments for the prediction method
+
+    Returns:
+        generator: The prediction method result for each chunk
+    """
+    method_kwargs = method_kwargs or {}
+    n_jobs = effective_n_jobs(n_jobs)
+
+    pool = multiprocessing.Pool(processes=n_jobs, initializer=_initialize_worker, initargs=(trained_model,))
+
+    try:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_score_chunk, (method_name, chunk, method_kwargs)))
+
+            # Keep every worker busy, but don't read further ahead of the consumer than that
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+
+def _initialize_worker(trained_model):
+    """Store the trained model in the worker process so that it is only transferred once per worker."""
+    global _worker_model
+    _worker_model = trained_model
+
+
+def _score_chunk(method_name, dataframe, method_kwargs):
+    """Run a prediction method of the worker's model on a chunk."""
+    return getattr(_worker_model, method_name)(dataframe, **method_kwargs)
@@ -0,0 +1,120 @@
+"""Parallel Training
+
+This module contains helpers for fitting and evaluating several candidate algorithms on the same train/test split in a
+pool of worker processes, for example to pick the best model of an ensemble. Each worker receives the data once when
+it starts rather than with every candidate.
+"""
+import multiprocessing
+import time
+
+import healthcareai.common.model_eval as hcai_model_evaluation
+
+# The (model type, x_train, y_train, x_test, y_test) of the current worker process, set once by the pool initializer
+_worker_data = None
+
+
+class FitCandidate(object):
+    """A fit algorithm with its test set predictions and performance metrics."""
+
+    def __init__(self, algorithm, test_set_predictions, test_set_class_labels, metric_by_name, training_time):
+        """
+        Create a fit candidate.
+
+        Args:
+            algorithm (sklearn.base.BaseEstimator): The fit algorithm
+            test_set_predictions (numpy.ndarray): Predictions (probabilities for classification) on the test set
+            test_set_class_labels (numpy.ndarray): Class label predictions on the test set (classification only)
+            metric_by_name (dict): The performance metrics on the test set
+            training_time (float): The number of seconds fitting and evaluating took
+        """
+        self.algorithm = algorithm
+        self.test_set_predictions = test_set_predictions
+        self.test_set_class_labels = test_set_class_labels
+        self.metric_by_name = metric_by_name
+        self.training_time = training_time
+
+
+def fit_and_evaluate(algorithm, model_type, x_train, y_train, x_test, y_test):
+    """
+    Fit an algorithm and calculate its test set predictions and performance metrics.
+
+    Args:
+        algorithm (sklearn.base.BaseEstimator): The scikit learn algorithm, ready to fit
+        model_type (str): 'classification' or 'regression'
+        x_train (pandas.core.frame.DataFrame): The training features
+        y_train (pandas.core.series.Series): The training target
+        x_test (pandas.core.frame.DataFrame): The test features
+        y_test (pandas.core.series.Series): The test target
+
+    Returns:
+        FitCandidate: The fit algorithm with its test set predictions and metrics
+    """
+    t0 = time.time()
+    algorithm.fit(x_train, y_train)
+
+    # Build prediction sets for ROC/PR curve generation. Note this does
+    # increase the size of the TSM because the test set is saved inside
+    # the object as well as the calculated thresholds.
+    # See https://github.com/HealthCatalyst/healthcareai-py/issues/264
+    # for a discussion on pros/cons PEP 8
+    test_set_predictions = None
+    test_set_class_labels = None
+    metric_by_name = None
+    if model_type == 'classification':
+        # Save both the probabilities and labels
+        test_set_predictions = algorithm.predict_proba(x_test)
+        test_set_class_labels = algorithm.predict(x_test)
+        metric_by_name = hcai_model_evaluation.calculate_binary_classification_metrics(algorithm, x_test, y_test)
+    elif model_type == 'regression':
+        test_set_predictions = algorithm.predict(x_test)
+        metric_by_name = hcai_model_evaluation.calculate_regression_metrics(algorithm, x_test, y_test)
+
+    return FitCandidate(algorithm, test_set_predictions, test_set_class_labels, metric_by_name, time.time() - t0)
+
+
+def fit_candidates(algorithm_by_name, model_type, x_train, y_train, x_test, y_test, n_jobs=1):
+    """
+    Fit and evaluate several candidate algorithms, concurrently in worker processes if n_jobs is more than 1.
+
+    Args:
+        algorithm_by_name (dict): The scikit learn algorithms to fit by name
+        model_type (str): 'classification' or 'regression'
+        x_train (pandas.core.frame.DataFrame): The training features
+        y_train (pandas.core.series.Series): The training target
+        x_test (pandas.core.frame.DataFrame): The test features
+        y_test (pandas.core.series.Series): The test target
+        n_jobs (int): The number of worker processes (already resolved to a positive number)
+
+    Returns:
+        dict: A FitCandidate by name
+    """
+    names = list(algorithm_by_name.keys())
+    data = (model_type, x_train, y_train, x_test, y_test)
+    n_jobs = min(n_jobs, len(names))
+
+    if n_jobs <= 1:
+        return {name: fit_and_evaluate(algorithm_by_name[name], *data) for name in names}
+
+    pool = multiprocessing.Pool(processes=n_jobs, initializer=_initialize_worker, initargs=(data,))
+    try:
+        candidates = pool.map(_fit_candidate, [algorithm_by_name[name] for name in names], chunksize=1)
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+    return dict(zip(names, candidates))
+
+
+def _initialize_worker(data):
+    """Store the train and test data in the worker process so that it is only transferred once per worker."""
+    global _worker_data
+    _worker_data = data
+
+
+def _fit_candidate(algorithm):
+    """Fit and evaluate an algorithm on the worker's data."""
+    return fit_and_evaluate(algorithm, *_worker_data)
@@ -0,0 +1,291 @@
+"""Prediction Plan
+
+This module compiles the fit data preparation pipeline of a trained model into a fixed plan for preparing new data.
+
+At prediction time the fit pipeline replays every training-time step (column filters, imputation, null row filtering,
+target conversions and `pandas.get_dummies`) on a chain of intermediate dataframes, only for the result to be
+subsetted to the columns the model was trained on. Since all of the fitted state is known after training, a
+`PredictionPlan` instead stores the exact output column layout, the imputation fill values and an index mapping each
+category level to its dummy column, and writes the prepared values straight into a preallocated float matrix.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from sklearn.pipeline import Pipeline
+
+import healthcareai.common.filters as hcai_filters
+import healthcareai.common.transformers as hcai_transformers
+
+# The fit pipeline steps (see healthcareai.pipelines.data_preparation.full_pipeline) that a plan reproduces
+PLANNABLE_PIPELINE_STEPS = [
+    hcai_filters.DataframeColumnSuffixFilter,
+    hcai_filters.DataframeColumnRemover,
+    hcai_transformers.DataFrameImputer,
+    hcai_filters.DataframeNullValueFilter,
+    hcai_transformers.DataFrameConvertTargetToBinary,
+    hcai_transformers.DataFrameConvertColumnToNumeric,
+    hcai_transformers.DataFrameCreateDummyVariables,
+]
+
+class PredictionPlan(object):
+    """
+    A compiled, fixed-layout version of a fit data preparation pipeline for preparing prediction data.
+
+    The plan produces exactly the same values as running the fit pipeline and subsetting to the model columns.
+    """
+
+    # Plans pickled before sparse plans and downcast dtypes existed are dense float64
+    sparse = False
+    dtype = np.float64
+
+    def __init__(self, column_names, required_columns, numeric_columns, categorical_columns, sparse=False,
+                 dtype=np.float64):
+        """
+        Create a prediction plan.
+
+        Args:
+            column_names (list): The prepared column names in the order the model expects them
+            required_columns (list): The raw columns that must be present in the prediction data
+            numeric_columns (list): (column name, output index, fill value) tuples of columns that pass through
+            categorical_columns (list): (column name, levels, fill code, output index by level code) tuples of
+                columns that are converted to dummy variables. An output index of -1 means the level has no dummy
+                column (for example the dropped first level).
+            sparse (bool): True to prepare data as sparse columns, for models trained on sparse dummy variables
+            dtype (numpy.dtype): The float dtype of the prepared values, float32 for models trained on downcast data
+        """
+        self.column_names = list(column_names)
+        self.required_columns = list(required_columns)
+        self.numeric_columns = numeric_columns
+        self.categorical_columns = categorical_columns
+        self.sparse = sparse
+        self.dtype = dtype
+
+    @property
+    def categorical_encoder(self):
+        """
+        The fit DataFrameCategoricalEncoder that looks up the level codes of the categorical columns.
+
+        It is built the first time it is needed, which also covers plans saved before the encoder existed.
+        """
+        if not hasattr(self, '_categorical_encoder'):
+            levels_by_column = {column: levels for column, levels, _, _ in self.categorical_columns}
+            self._categorical_encoder = hcai_transformers.DataFrameCategoricalEncoder(levels_by_column).fit()
+
+        return self._categorical_encoder
+
+    def transform(self, dataframe):
+        """
+        Prepare a raw prediction dataframe.
+
+        Args:
+            dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
+
+        Returns:
+            pandas.core.frame.DataFrame: A float dataframe containing only the columns the model expects, in order.
+            The columns are sparse if the plan is.
+
+        Raises:
+            KeyError: If any of the required columns are missing from the dataframe
+        """
+        missing_columns = [column for column in self.required_columns if column not in dataframe.columns]
+        if len(missing_columns) > 0:
+            raise KeyError(missing_columns)
+
+        if self.sparse:
+            return self._transform_sparse(dataframe)
+
+        matrix = np.zeros((len(dataframe), len(self.column_names)), dtype=self.dtype)
+
+        for column, output_index, fill_value in self.numeric_columns:
+            values = matrix[:, output_index]
+            values[:] = dataframe[column].values
+            values[np.isnan(values)] = fill_value
+
+        rows = np.arange(len(dataframe))
+        for column, levels, fill_code, output_index_by_code in self.categorical_columns:
+            codes = self.categorical_encoder.codes(column, dataframe[column].values)
+            # Unseen levels and missing values are imputed with the most frequent training level
+            codes[codes == -1] = fill_code
+
+            output_indices = output_index_by_code[codes]
+            has_dummy = output_indices != -1
+            matrix[rows[has_dummy], output_indices[has_dummy]] = 1
+
+        result = pd.DataFrame(matrix, columns=self.column_names, index=dataframe.index)
+
+        # Rows can only still contain nulls here if a column was entirely null in the training data. Drop them just
+        # like the pipeline's null row filter would.
+        if len(result) == 0 or np.isnan(matrix).any():
+            result = hcai_filters.DataframeNullValueFilter(copy=False).transform(result)
+
+        return result
+
+    def _transform_sparse(self, dataframe):
+        """Prepare a raw prediction dataframe as sparse columns, without ever building the dense matrix."""
+        rows = np.arange(len(dataframe))
+        entry_rows = []
+        entry_columns = []
+        entry_values = []
+
+        for column, output_index, fill_value in self.numeric_columns:
+            values = dataframe[column].values.astype(self.dtype)
+            values[np.isnan(values)] = fill_value
+            non_zero = values != 0
+            entry_rows.append(rows[non_zero])
+            entry_columns.append(np.full(non_zero.sum(), output_index, dtype=np.intp))
+            entry_values.append(values[non_zero])
+
+        for column, levels, fill_code, output_index_by_code in self.categorical_columns:
+            codes = self.categorical_encoder.codes(column, dataframe[column].values)
+            # Unseen levels and missing values are imputed with the most frequent training level
+            codes[codes == -1] = fill_code
+
+            output_indices = output_index_by_code[codes]
+            has_dummy = output_indices != -1
+            entry_rows.append(rows[has_dummy])
+            entry_columns.append(output_indices[has_dummy])
+            entry_values.append(np.ones(has_dummy.sum(), dtype=self.dtype))
+
+        matrix = scipy.sparse.csr_matrix(
+            (np.concatenate(entry_values), (np.concatenate(entry_rows), np.concatenate(entry_columns))),
+            shape=(len(dataframe), len(self.column_names)))
+
+        result = pd.DataFrame.sparse.from_spmatrix(matrix, index=dataframe.index, columns=self.column_names)
+
+        # Rows can only still contain nulls here if a column was entirely null in the training data. Drop them just
+        # like the pipeline's null row filter would.
+        if len(result) == 0 or np.isnan(matrix.data).any():
+            result = hcai_filters.DataframeNullValueFilter(copy=False).transform(result)
+
+        return result
+
+    def transform_records(self, records):
+        """
+        Prepare a list of raw records (dictionaries of column name to value) without building a dataframe.
+
+        This is intended for low latency scoring of one or a few records at a time.
+
+        Args:
+            records (list): Dictionaries mapping the raw column names to values
+
+        Returns:
+            numpy.ndarray: A 2D float array with a row per record and the columns the model expects, in order. Values
+            that can't be imputed (columns that were entirely null in the training data) are left as NaN.
+
+        Raises:
+            KeyError: If any of the required columns are missing from a record
+        """
+        matrix = np.zeros((len(records), len(self.column_names)), dtype=self.dtype)
+
+        for row, record in enumerate(records):
+            missing_columns = [column for column in self.required_columns if column not in record]
+            if len(missing_columns) > 0:
+                raise KeyError(missing_columns)
+
+            for column, output_index, fill_value in self.numeric_columns:
+                value = record[column]
+                # Impute missing values (None or NaN) with the training mean
+                matrix[row, output_index] = fill_value if value is None or value != value else value
+
+            for column, levels, fill_code, output_index_by_code in self.categorical_columns:
+                value = record[column]
+                code = self.categorical_encoder.code(column, value)
+                if code == -1:
+                    code = fill_code
+
+                output_index = output_index_by_code[code]
+                if output_index != -1:
+                    matrix[row, output_index] = 1
+
+        return matrix
+
+
+def compile_prediction_plan(fit_pipeline, column_names, original_column_names, categorical_column_info,
+                            prediction_column):
+    """
+    Compile a fit data preparation pipeline into a PredictionPlan.
+
+    Only the standard `full_pipeline` can be compiled. Custom pipelines (or models trained without the original
+    column metadata) return None so that callers can fall back to running the pipeline itself.
+
+    Args:
+        fit_pipeline (sklearn.pipeline.Pipeline): The fit data preparation pipeline
+        column_names (list): The prepared column names the model was trained on
+        original_column_names (list): The raw column names before the pipeline ran
+        categorical_column_info (dict): Categorical column names mapped to a Series whose index holds the levels
+        prediction_column (str): The name of the prediction column
+
+    Returns:
+        PredictionPlan: The compiled plan, or None if the pipeline can't be compiled
+    """
+    if original_column_names is None or categorical_column_info is None or not isinstance(fit_pipeline, Pipeline):
+        return None
+
+    steps = [step for _, step in fit_pipeline.steps]
+
+    # Downcasting only changes how values are stored, which the plan reproduces with its dtype
+    downcast_steps = [step for step in steps if isinstance(step, hcai_transformers.DataFrameDowncastDtypes)]
+    steps = [step for step in steps if step not in downcast_steps]
+
+    if [type(step) for step in steps] != PLANNABLE_PIPELINE_STEPS:
+        return None
+
+    imputer = steps[2]
+    if not imputer.impute or imputer.fill is None:
+        return None
+
+    output_index_by_name = {name: index for index, name in enumerate(column_names)}
+    planned_names = set()
+
+    numeric_columns = []
+    categorical_columns = []
+    for column in original_column_names:
+        if column == prediction_column:
+            continue
+
+        if column in categorical_column_info:
+            levels = categorical_column_info[column].index
+            if len(levels) == 0 or imputer.fill.get(column) not in levels:
+                # Not imputed with a training level, so this column didn't make it into the model
+                continue
+
+            # The first level is dropped to match get_dummies(drop_first=True)
+            output_index_by_code = np.full(len(levels), -1, dtype=np.intp)
+            for code, level in enumerate(levels[1:], start=1):
+                dummy_name = '{}.{}'.format(column, level)
+                if dummy_name in output_index_by_name:
+                    output_index_by_code[code] = output_index_by_name[dummy_name]
+                    planned_names.add(dummy_name)
+
+            if (output_index_by_code != -1).any():
+                fill_code = levels.get_loc(imputer.fill[column])
+                categorical_columns.append((column, levels, fill_code, output_index_by_code))
+        elif column in output_index_by_name:
+            numeric_columns.append((column, output_index_by_name[column], imputer.fill.get(column, np.nan)))
+            planned_names.add(column)
+
+    # Every model column must come from a known source for the plan to be exact
+    if planned_names != set(column_names):
+        return None
+
+    required_columns = [column for column in original_column_names if column != prediction_column]
+    dummy_variables = steps[6]
+    dtype = _prepared_dtype(downcast_steps, numeric_columns)
+
+    return PredictionPlan(column_names, required_columns, numeric_columns, categorical_columns,
+                          sparse=dummy_variables.sparse, dtype=dtype)
+
+
+def _prepared_dtype(downcast_steps, numeric_columns):
+    """
+    The float dtype a model matrix of the pipeline output has: float32 if every numeric column was downcast to a dtype
+    that float32 holds (the dummy variables always are), float64 otherwise.
+    """
+    if len(downcast_steps) != 1:
+        return np.float64
+
+    dtype_plan = downcast_steps[0].dtype_plan
+    column_dtypes = [dtype_plan.get(column, np.float64) for column, _, _ in numeric_columns]
+    column_dtypes = [dtype if isinstance(dtype, np.dtype) else np.float64 for dtype in column_dtypes]
+
+    return np.result_type(np.float32, *column_dtypes)
@@ -1,4 +1,15 @@
-from sklearn.model_selection import RandomizedSearchCV
+# Successive halving is still an experimental feature of scikit-learn and has to be enabled before it is imported
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, RandomizedSearchCV, check_cv
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.parallel_scoring import effective_n_jobs
+from healthcareai.common.warm_start_search import WarmStartForestSearchCV
+
+SUPPORTED_SEARCH_STRATEGIES = ['randomized', 'halving', 'warm_start']
+
+# Each successive halving round keeps the best third of the candidates and gives them three times the budget
+HALVING_FACTOR = 3
 
 
 def get_algorithm(estimator,
@@ -6,6 +17,9 @@ def get_algorithm(estimator,
                   hyperparameter_grid,
                   randomized_search,
                   number_iteration_samples=10,
+                  n_jobs=1,
+                  search_n_jobs=None,
+                  search_strategy='randomized',
                   **non_randomized_estimator_kwargs):
     """
     Given an estimator and various params, initialize an algorithm with optional randomized search.
@@ -18,9 +32,19 @@ def get_algorithm(estimator,
             through.
         randomized_search (bool): Whether the method should return a randomized search estimator (as opposed to a
             simple algorithm).
-        number_iteration_samples (int): If performing randomized search, this is the number of samples that are run in 
+        number_iteration_samples (int): If performing randomized search, this is the number of samples that are run in
             the hyperparameter space. Higher numbers will be slower, but end up with better results, since it is more
             likely that the true optimal hyperparameter is found.
+        n_jobs (int): The number of CPUs to train with. -1 uses all CPUs. These are split between the search and the
+            estimator (for example the trees of a random forest) so that the two never oversubscribe the machine.
+        search_n_jobs (int): Optionally fix the number of CPUs the search itself uses, giving the estimator all n_jobs.
+            Use 1 when training inside a worker process, which can't start worker processes of its own.
+        search_strategy (str): 'randomized' (default) to fully train every sampled candidate, or 'halving' for a
+            successive halving search that samples three times as many candidates, scores them on a small budget
+            (fewer trees for random forests with n_estimators in the grid, otherwise fewer rows) and only promotes the
+            best third of each round to a three times larger budget. Tree ensembles can also use 'warm_start', which
+            grows one forest per combination of the other hyperparameters and scores it at every n_estimators value
+            in the grid instead of training a forest from scratch for each.
         **non_randomized_estimator_kwargs: Keyword arguments that you can pass directly to the algorithm. Only used when
             radomized_search is False
 
@@ -28,15 +52,111 @@ def get_algorithm(estimator,
         sklearn.base.BaseEstimator: a scikit learn algorithm ready to `.fit()`
 
     """
+    if search_strategy not in SUPPORTED_SEARCH_STRATEGIES:
+        raise HealthcareAIError('A search strategy must be one of these: {}'.format(SUPPORTED_SEARCH_STRATEGIES))
+
+    n_jobs = effective_n_jobs(n_jobs)
+    estimator_supports_n_jobs = 'n_jobs' in estimator().get_params()
+
     if randomized_search:
-        algorithm = RandomizedSearchCV(estimator=estimator(),
-                                       scoring=scoring_metric,
-                                       param_distributions=hyperparameter_grid,
-                                       n_iter=number_iteration_samples,
-                                       verbose=0,
-                                       n_jobs=1)
+        number_of_candidates = number_iteration_samples
+        if search_strategy == 'halving':
+            number_of_candidates *= HALVING_FACTOR
+
+        if search_n_jobs is None:
+            number_of_fits = number_of_candidates * check_cv(None).get_n_splits()
+            search_n_jobs, estimator_n_jobs = split_n_jobs(n_jobs, number_of_fits)
+        else:
+            estimator_n_jobs = n_jobs
+
+        estimator_kwargs = {'n_jobs': estimator_n_jobs} if estimator_supports_n_jobs else {}
+
+        if search_strategy == 'warm_start':
+            estimator_params = estimator().get_params()
+            if 'warm_start' not in estimator_params or 'n_estimators' not in estimator_params:
+                raise HealthcareAIError('The warm_start search strategy only works with tree ensembles such as random '
+                                        'forests.')
+
+            # The forests are grown one after another, so all the CPUs go to growing their trees
+            estimator_kwargs = {'n_jobs': n_jobs} if estimator_supports_n_jobs else {}
+            algorithm = WarmStartForestSearchCV(estimator=estimator(**estimator_kwargs),
+                                                param_distributions=hyperparameter_grid,
+                                                scoring=scoring_metric,
+                                                n_iter=number_iteration_samples)
+        elif search_strategy == 'halving':
+            algorithm = _halving_search(estimator(**estimator_kwargs), scoring_metric, hyperparameter_grid,
+                                        number_of_candidates, search_n_jobs)
+        else:
+            algorithm = RandomizedSearchCV(estimator=estimator(**estimator_kwargs),
+                                           scoring=scoring_metric,
+                                           param_distributions=hyperparameter_grid,
+                                           n_iter=number_iteration_samples,
+                                           verbose=0,
+                                           n_jobs=search_n_jobs)
 
     else:
+        if estimator_supports_n_jobs:
+            non_randomized_estimator_kwargs.setdefault('n_jobs', n_jobs)
         algorithm = estimator(**non_randomized_estimator_kwargs)
 
     return algorithm
+
+
+def _halving_search(estimator, scoring_metric, hyperparameter_grid, number_of_candidates, n_jobs):
+    """
+    Build a successive halving randomized search.
+
+    If the estimator is an ensemble of trees and the grid searches over `n_estimators`, the budget is the number of
+    trees: every candidate starts with a small forest and only the best grow to the largest `n_estimators` in the
+    grid. Otherwise the budget is the number of training rows.
+    """
+    hyperparameter_grid = dict(hyperparameter_grid)
+    resource_kwargs = {'resource': 'n_samples'}
+
+    if isinstance(hyperparameter_grid.get('n_estimators'), list) and 'n_estimators' in estimator.get_params():
+        resource_kwargs = {'resource': 'n_estimators',
+                           'max_resources': max(hyperparameter_grid.pop('n_estimators'))}
+
+    return HalvingRandomSearchCV(estimator=estimator,
+                                 scoring=scoring_metric,
+                                 param_distributions=hyperparameter_grid,
+                                 n_candidates=number_of_candidates,
+                                 factor=HALVING_FACTOR,
+                                 # Size the first round so that the last round uses the full budget
+                                 min_resources='exhaust',
+                                 verbose=0,
+                                 n_jobs=n_jobs,
+                                 **resource_kwargs)
+
+
+def split_n_jobs(n_jobs, number_of_fits):
+    """
+    Split CPUs between a search (which fits candidates in parallel) and the estimators it fits.
+
+    The search gets as many CPUs as it has fits to run in parallel and each estimator gets an equal share of the rest,
+    so the total number of busy threads never exceeds n_jobs.
+
+    Args:
+        n_jobs (int): The number of CPUs available (already resolved to a positive number)
+        number_of_fits (int): The number of candidate fits the search runs (iterations times cross validation folds)
+
+    Returns:
+        tuple: (search n_jobs, estimator n_jobs)
+    """
+    search_n_jobs = max(min(n_jobs, number_of_fits), 1)
+    estimator_n_jobs = max(n_jobs // search_n_jobs, 1)
+
+    return search_n_jobs, estimator_n_jobs
+
+
+def set_estimator_n_jobs(algorithm, n_jobs):
+    """
+    Set the number of CPUs a fit algorithm (and the best estimator of a fit search) uses when predicting.
+
+    Args:
+        algorithm (sklearn.base.BaseEstimator): A fit estimator or randomized search
+        n_jobs (int): The number of CPUs
+    """
+    for estimator in [algorithm, getattr(algorithm, 'best_estimator_', None)]:
+        if estimator is not None and 'n_jobs' in estimator.get_params(deep=False):
+            estimator.set_params(n_jobs=n_jobs)
@@ -1,26 +1,11 @@
 import numpy as np
-import pandas as pd
-from distutils.version import StrictVersion
+import scipy.sparse
 
 from sklearn.linear_model import LogisticRegression, LinearRegression
 
+import healthcareai.common.helpers as hcai_helpers
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
-CHECK_PANDAS_VERSION = StrictVersion("0.23.1")
-
-def descending_sort(row):
-    # TODO Low priority, consider testing
-    """
-    Sorts (descending) the columns of a dataframe by value or a single row
-    
-    Args:
-        row (Pandas.Series): a row of a pandas data frame
-    
-    Returns:
-        (list): an array of column names
-    """
-    return row.sort_values(ascending=False).index.values
-
 
 def top_k_features(dataframe, linear_model, k=3):
     """
@@ -37,6 +22,28 @@ def top_k_features(dataframe, linear_model, k=3):
         (pandas.core.frame.DataFrame): The top features for each row in dataframe format 
 
     """
+    if hcai_helpers.is_sparse_dataframe(dataframe):
+        values = hcai_helpers.to_sparse_matrix(dataframe)
+    else:
+        values = dataframe.values
+
+    return top_k_features_from_array(values, dataframe.columns, linear_model, k=k)
+
+
+def top_k_features_from_array(values, column_names, linear_model, k=3):
+    """
+    Get lists of top features for a 2D array of prepared data based on an already-fit linear model.
+
+    Args:
+        values (numpy.ndarray or scipy.sparse.spmatrix): A 2D array of prepared data for which to score top features.
+            Sparse data is scored without densifying it.
+        column_names (list): The column names of the values
+        linear_model (sklearn.base.BaseEstimator): A pre-fit scikit learn model instance that has linear coefficients.
+        k (int): k lists of top features (the first list is the top features, the second list are the #2 features, etc)
+
+    Returns:
+        (list): An array of the k top feature names for each row
+    """
     # Basic validation for number of features vs column count
     # Squeeze the array (which might be 1D or 2D down to 1D
     max_model_features = len(np.squeeze(linear_model.coef_))
@@ -45,18 +52,113 @@ def top_k_features(dataframe, linear_model, k=3):
                                 ' model. Please choose {} or less.'.format(k, max_model_features, max_model_features))
 
     # Multiply the values with the coefficients from the trained model and take the magnitude
-    step1 = pd.DataFrame(np.abs(dataframe.values * linear_model.coef_), columns=dataframe.columns)
-
-    if StrictVersion(pd.__version__) >= CHECK_PANDAS_VERSION:
-        step2 = step1.apply(descending_sort, axis=1, result_type='expand')
+    if scipy.sparse.issparse(values):
+        contributions = abs(scipy.sparse.csr_matrix(values).multiply(np.atleast_2d(linear_model.coef_)))
+        top_indices = top_k_indices_sparse(contributions, k)
     else:
-        step2 = step1.apply(descending_sort, axis=1)
+        contributions = np.abs(values * linear_model.coef_)
+        top_indices = top_k_indices(contributions, k)
 
-    results = list(step2.values[:, :k])
+    # Map the column indices of the top k contributions to column names in one fancy-index
+    column_names = np.asarray(column_names, dtype=object)
+    results = list(column_names[top_indices])
     return results
 
 
-def prepare_fit_model_for_factors(model_type, x_train, y_train):
+def top_k_indices(contributions, k):
+    """
+    Find the column indices of the k largest values in each row of a 2D array, in descending order.
+
+    Only the top k columns of each row are sorted (using `numpy.argpartition`) instead of sorting every row. Ties are
+    broken by column order (the leftmost column wins) and NaNs are sorted last, which matches a descending pandas sort
+    of each row.
+
+    Args:
+        contributions (numpy.ndarray): A 2D array of row level feature contributions
+        k (int): The number of top columns to return per row
+
+    Returns:
+        (numpy.ndarray): A 2D integer array of shape (rows, k) of column indices
+    """
+    number_of_rows, number_of_columns = contributions.shape
+    if k == 0:
+        return np.zeros((number_of_rows, 0), dtype=np.intp)
+
+    # Negate so that an ascending stable sort gives descending values with ties kept in column order
+    keys = -np.asarray(contributions, dtype=float)
+
+    if k >= number_of_columns:
+        return np.argsort(keys, axis=1, kind='mergesort')[:, :k]
+
+    rows = np.arange(number_of_rows)[:, np.newaxis]
+
+    # Select the (unordered) top k columns of each row, then order only those k columns by value and column index
+    candidates = np.sort(np.argpartition(keys, k - 1, axis=1)[:, :k], axis=1)
+    order = np.argsort(keys[rows, candidates], axis=1, kind='mergesort')
+    top_indices = candidates[rows, order]
+
+    # A tie at the kth value means argpartition may have picked an arbitrary one of the tied columns. Those rows (and
+    # rows with fewer than k non-NaN values) are fully sorted so the result is deterministic.
+    kth_values = keys[rows[:, 0], top_indices[:, -1]]
+    ambiguous_rows = np.sum(keys <= kth_values[:, np.newaxis], axis=1) != k
+    if np.any(ambiguous_rows):
+        top_indices[ambiguous_rows] = np.argsort(keys[ambiguous_rows], axis=1, kind='mergesort')[:, :k]
+
+    return top_indices
+
+
+def top_k_indices_sparse(contributions, k):
+    """
+    Find the column indices of the k largest values in each row of a sparse 2D array, in descending order.
+
+    This gives the same result as `top_k_indices` on the dense array, but only the stored non-zero values are sorted.
+    Rows with fewer than k non-zero values are filled with their first zero valued columns, just like the dense sort
+    breaks ties by column order.
+
+    Args:
+        contributions (scipy.sparse.spmatrix): A sparse 2D array of non-negative row level feature contributions
+        k (int): The number of top columns to return per row
+
+    Returns:
+        (numpy.ndarray): A 2D integer array of shape (rows, k) of column indices
+    """
+    number_of_rows, number_of_columns = contributions.shape
+    if k == 0:
+        return np.zeros((number_of_rows, 0), dtype=np.intp)
+
+    contributions = scipy.sparse.csr_matrix(contributions, copy=True)
+    contributions.sum_duplicates()
+    contributions.eliminate_zeros()
+
+    non_zero_counts = np.diff(contributions.indptr)
+    entry_rows = np.repeat(np.arange(number_of_rows), non_zero_counts)
+
+    # Order the stored values by row, then descending value (NaNs last), then column
+    order = np.lexsort((contributions.indices, -contributions.data, entry_rows))
+    ranks = np.arange(len(order)) - np.repeat(contributions.indptr[:-1], non_zero_counts)
+    in_top_k = ranks < k
+
+    top_non_zero = np.zeros((number_of_rows, k), dtype=np.intp)
+    top_non_zero[entry_rows[in_top_k], ranks[in_top_k]] = contributions.indices[order][in_top_k]
+
+    # The leftmost columns that have no stored value in each row. Since a row with n < k stored values needs k - n of
+    # them, they are always among its first k + n <= 2k - 1 columns.
+    width = min(2 * k, number_of_columns)
+    is_stored = np.zeros((number_of_rows, width), dtype=bool)
+    in_width = contributions.indices < width
+    is_stored[entry_rows[in_width], contributions.indices[in_width]] = True
+    zero_columns = np.argsort(is_stored, axis=1, kind='mergesort')
+
+    # Take the top stored values first, then the zero valued columns
+    top_count = np.minimum(non_zero_counts, k)[:, np.newaxis]
+    slots = np.arange(k)[np.newaxis, :]
+    zero_slots = np.clip(slots - top_count, 0, width - 1)
+    zero_fill = zero_columns[np.arange(number_of_rows)[:, np.newaxis], zero_slots]
+
+    return np.where(slots < top_count, top_non_zero, zero_fill)
+
+
+def prepare_fit_model_for_factors(model_type, x_train, y_train, n_jobs=1):
     """
     Given a model type, train and test data
     
@@ -64,15 +166,16 @@ def prepare_fit_model_for_factors(model_type, x_train, y_train):
         model_type (str): 'classification' or 'regression'
         x_train:
         y_train:
+        n_jobs (int): The number of CPUs to fit with. -1 uses all CPUs.
 
     Returns:
         (sklearn.base.BaseEstimator): A fit model.
     """
 
     if model_type == 'classification':
-        algorithm = LogisticRegression()
+        algorithm = LogisticRegression(n_jobs=n_jobs)
     elif model_type == 'regression':
-        algorithm = LinearRegression()
+        algorithm = LinearRegression(n_jobs=n_jobs)
     else:
         algorithm = None
 
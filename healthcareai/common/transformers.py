@@ -2,6 +2,8 @@
 
 This module contains transformers for preprocessing data. Most operate on DataFrames and are named appropriately.
 """
+import warnings
+
 import numpy as np
 import pandas as pd
 
@@ -10,51 +12,116 @@ from imblearn.over_sampling import RandomOverSampler
 from imblearn.under_sampling import RandomUnderSampler
 from sklearn.preprocessing import StandardScaler
 
+from healthcareai.common.get_categorical_levels import get_categorical_levels
+import healthcareai.common.dtype_planning as hcai_dtypes
+
+UNSEEN_LEVELS_MESSAGE = """Column {} contains levels not seen in the training set. These levels have
+                        been removed and will be imputed or the corresponding rows dropped.\nNew levels: {}"""
+
 class DataFrameImputer(TransformerMixin):
     """
     Impute missing values in a dataframe.
 
     Columns of dtype object or category (assumed categorical) are imputed with the mode (most frequent value in column).
+    Ties go to the level that appears first (or the first category).
 
     Columns of other types (assumed continuous) are imputed with mean of column.
+
+    Set copy to False to impute the given dataframe in place instead of returning an imputed copy.
+
+    The statistics are computed a block of columns at a time (the means from one sum and count over all the numeric
+    columns and the modes from counting integer level codes) rather than column by column. Set sample_size to fit on a
+    random sample of that many rows, or call `partial_fit` on each chunk of the training data to fit in a streaming
+    fashion. The running statistics are not pickled, so `partial_fit` on an unpickled imputer starts over.
     """
 
-    def __init__(self, impute=True, verbose=True):
+    # Pipelines pickled before these options existed always copied and fit on every row
+    copy = True
+    sample_size = None
+    random_seed = None
+    _statistics = None
+
+    def __init__(self, impute=True, verbose=True, copy=True, sample_size=None, random_seed=None):
         self.impute = impute
         self.object_columns = None
         self.fill = None
         self.verbose = verbose
+        self.copy = copy
+        self.sample_size = sample_size
+        self.random_seed = random_seed
+        self._statistics = None
 
     def fit(self, X, y=None):
         # Return if not imputing
         if self.impute is False:
             return self
 
-        # Grab list of object column names before doing imputation
-        self.object_columns = X.select_dtypes(include=['object']).columns.values
+        if self.sample_size is not None and len(X) > self.sample_size:
+            X = X.sample(n=self.sample_size, random_state=self.random_seed)
 
-        self.fill = pd.Series([X[c].value_counts().index[0]
-                               if X[c].dtype == np.dtype('O')
-                                  or pd.api.types.is_categorical_dtype(X[c])
-                               else X[c].mean() for c in X], index=X.columns)
+        self._statistics = None
+        self.partial_fit(X)
 
         if self.verbose:
-            num_nans = sum(X.select_dtypes(include=[np.number]).isnull().sum())
-            num_total = sum(X.select_dtypes(include=[np.number]).count())
-            percentage_imputed = num_nans / num_total * 100
+            statistics = self._statistics
+            percentage_imputed = 0
+            if statistics.numeric_value_count > 0:
+                percentage_imputed = statistics.numeric_null_count / statistics.numeric_value_count * 100
             print("Percentage Imputed: %.2f%%" % percentage_imputed)
             print("Note: Impute will always happen on prediction dataframe, otherwise rows are dropped, and will lead "
                   "to missing predictions")
 
+        # Only the fill values are needed from here on, the running statistics hold every level count of the data
+        self._statistics = None
+
         # return self for scikit compatibility
         return self
 
+    def partial_fit(self, X, y=None):
+        """
+        Update the statistics with another chunk of the training data.
+
+        The fill values reflect all the chunks seen so far, so the data never has to be in memory all at once.
+
+        Args:
+            X (pandas.core.frame.DataFrame): A chunk of the training data
+
+        Returns:
+            DataFrameImputer: self
+        """
+        # Return if not imputing
+        if self.impute is False:
+            return self
+
+        if self._statistics is None:
+            self._statistics = _ImputationStatistics()
+
+        self._statistics.update(X)
+
+        # Grab list of object column names before doing imputation
+        self.object_columns = np.array(self._statistics.object_columns, dtype=object)
+        self.fill = self._statistics.fill()
+
+        return self
+
+    def __getstate__(self):
+        """Pickle the fill values without the running statistics, which saved models and pipelines don't need."""
+        state = self.__dict__.copy()
+        state.pop('_statistics', None)
+
+        return state
+
     def transform(self, X, y=None):
         # Return if not imputing
         if self.impute is False:
             return X
 
-        result = X.fillna(self.fill)
+        fill = self._fill_for(X)
+        if self.copy:
+            result = X.fillna(fill)
+        else:
+            X.fillna(fill, inplace=True)
+            result = X
 
         for i in self.object_columns:
             if result[i].dtype not in ['object', 'category']:
@@ -63,6 +130,116 @@ class DataFrameImputer(TransformerMixin):
         return result
 
 
+    def _fill_for(self, X):
+        """
+        The fill values, with the means of narrow float columns (such as downcast float32 ones) in the column's dtype
+        so filling them doesn't upcast them to float64.
+        """
+        narrow_columns = [column for column in X.columns
+                          if pd.api.types.is_float_dtype(X[column]) and X[column].dtype.itemsize < 8
+                          and column in self.fill.index]
+        if len(narrow_columns) == 0:
+            return self.fill
+
+        fill = self.fill.to_dict()
+        for column in narrow_columns:
+            fill[column] = X[column].dtype.type(fill[column])
+
+        return fill
+
+
+class _ImputationStatistics(object):
+    """Running means and level counts of a dataframe, updated a chunk at a time."""
+
+    def __init__(self):
+        self.columns = []
+        self.object_columns = []
+        # Per column sums and non-null counts of the numeric (and boolean) columns
+        self.sums = pd.Series(dtype=np.float64)
+        self.counts = pd.Series(dtype=np.float64)
+        # Running means and non-null counts of the other continuous columns (such as dates), which can't be summed
+        self.other_means = {}
+        self.other_counts = {}
+        # Level counts (a pandas.Series indexed by level) of each categorical column
+        self.level_counts = {}
+        self.numeric_null_count = 0
+        self.numeric_value_count = 0
+
+    def update(self, X):
+        """Add the statistics of a chunk of data."""
+        self.columns.extend(column for column in X.columns if column not in self.columns)
+        self.object_columns.extend(column for column in X.select_dtypes(include=['object']).columns
+                                   if column not in self.object_columns)
+
+        # One pass over the numeric blocks (without copying them) for all the sums and counts
+        counts = X.count(numeric_only=True)
+        self.sums = self.sums.add(X.sum(numeric_only=True), fill_value=0)
+        self.counts = self.counts.add(counts, fill_value=0)
+
+        self.numeric_null_count += len(X) * len(counts) - counts.sum()
+        self.numeric_value_count += counts.sum()
+
+        categorical_columns = [column for column in X.columns if self._is_categorical(X[column])]
+        other_columns = [column for column in X.columns
+                         if column not in counts.index and column not in categorical_columns]
+
+        for column in other_columns:
+            self._update_other_mean(column, X[column])
+
+        for column in categorical_columns:
+            level_counts = self._level_counts(X[column])
+            previous = self.level_counts.get(column)
+            self.level_counts[column] = level_counts if previous is None else previous.add(level_counts, fill_value=0)
+
+    def fill(self):
+        """The fill value of each column seen so far: the mean of continuous columns, the mode of categorical ones."""
+        means = self.sums / self.counts
+        fill_by_column = {}
+        for column in self.columns:
+            if column in self.level_counts:
+                level_counts = self.level_counts[column]
+                fill_by_column[column] = level_counts.idxmax() if level_counts.sum() > 0 else np.nan
+            elif column in self.other_means:
+                fill_by_column[column] = self.other_means[column]
+            else:
+                fill_by_column[column] = means.get(column, np.nan)
+
+        return pd.Series([fill_by_column[column] for column in self.columns], index=self.columns)
+
+    def _update_other_mean(self, column, values):
+        """Update a running mean, which works for any type with a mean and differences (such as timestamps)."""
+        count = values.count()
+        if count == 0:
+            return
+
+        chunk_mean = values.mean()
+        previous_count = self.other_counts.get(column, 0)
+        if previous_count == 0:
+            self.other_means[column] = chunk_mean
+        else:
+            previous_mean = self.other_means[column]
+            self.other_means[column] = previous_mean + (chunk_mean - previous_mean) * count / (previous_count + count)
+
+        self.other_counts[column] = previous_count + count
+
+    @staticmethod
+    def _is_categorical(values):
+        return values.dtype == np.dtype('O') or pd.api.types.is_categorical_dtype(values)
+
+    @staticmethod
+    def _level_counts(values):
+        """Count the levels of a column from its integer level codes with a single bincount."""
+        if pd.api.types.is_categorical_dtype(values):
+            codes = values.cat.codes.values
+            levels = values.cat.categories
+        else:
+            codes, levels = pd.factorize(values.values)
+
+        counts = np.bincount(codes[codes >= 0], minlength=len(levels))
+
+        return pd.Series(counts, index=levels)
+
+
 class DataFrameConvertTargetToBinary(TransformerMixin):
     # TODO Note that this makes healthcareai only handle N/Y in pred column
     """
@@ -85,37 +262,227 @@ class DataFrameConvertTargetToBinary(TransformerMixin):
         # TODO: put try/catch here when type = class and predictor is numeric
         # TODO this makes healthcareai only handle N/Y in pred column
         if self.model_type == 'classification':
-            # Turn off warning around replace
-            pd.options.mode.chained_assignment = None  # default='warn'
-            # Replace 'Y'/'N' with 1/0
-            X[self.target_column].replace(['Y', 'N'], [1, 0], inplace=True)
+            # Replace 'Y'/'N' with 1/0. Only the target column is rebuilt, the rest of the dataframe isn't copied.
+            X[self.target_column] = X[self.target_column].replace(['Y', 'N'], [1, 0])
 
         return X
 
 
 class DataFrameCreateDummyVariables(TransformerMixin):
-    """Convert all categorical columns into dummy/indicator variables. Exclude given columns."""
+    """
+    Convert all categorical columns into dummy/indicator variables. Exclude given columns.
 
-    def __init__(self, excluded_columns=None):
+    Set copy to False to replace the categorical columns of the given dataframe in place instead of building a new
+    dataframe. The columns are in the same order either way.
+
+    Set sparse to True for high cardinality categorical columns. The dummy variables are then stored as sparse columns
+    (see `pandas.SparseDtype`) so memory scales with the number of non-zero values. The other columns (except the
+    excluded ones) are made sparse as well, so that scikit-learn receives the features as one scipy.sparse matrix
+    rather than densifying them.
+
+    Fitting learns the levels of each categorical column, so every dataframe transformed afterwards gets the same dummy
+    variables no matter which levels it contains. Call `partial_fit` on each chunk of the training data to learn the
+    levels in a streaming fashion.
+    """
+
+    # Pipelines pickled before these options existed always copied, created dense dummy variables and didn't learn
+    # the levels
+    copy = True
+    sparse = False
+    levels_by_column = None
+
+    def __init__(self, excluded_columns=None, copy=True, sparse=False):
         self.excluded_columns = excluded_columns
+        self.copy = copy
+        self.sparse = sparse
+        self.levels_by_column = None
 
     def fit(self, X, y=None):
+        self.levels_by_column = None
+
         # return self for scikit compatibility
+        return self.partial_fit(X)
+
+    def partial_fit(self, X, y=None):
+        """
+        Add the levels of the categorical columns of another chunk of the training data to the learned levels.
+
+        Args:
+            X (pandas.core.frame.DataFrame): A chunk of the training data
+
+        Returns:
+            DataFrameCreateDummyVariables: self
+        """
+        if self.levels_by_column is None:
+            self.levels_by_column = {}
+
+        for column in self._columns_to_dummify(X):
+            # The levels are in the order get_dummies would put them in (sorted where they can be, or the categories
+            # of a categorical) so the same dummy is dropped
+            levels = pd.Categorical(X[column]).categories
+            previous = self.levels_by_column.get(column)
+            self.levels_by_column[column] = levels if previous is None else previous.union(levels)
+
         return self
 
     def transform(self, X, y=None):
+        columns_to_dummify = self._columns_to_dummify(X)
+
+        if not self.copy:
+            X = self._replace_with_dummies_in_place(X, columns_to_dummify)
+        else:
+            if self.levels_by_column:
+                X = X.copy()
+                for column in columns_to_dummify:
+                    X[column] = self._with_learned_levels(X, column)
+
+            # Create dummy variables
+            X = pd.get_dummies(X, columns=columns_to_dummify, **self._get_dummies_kwargs())
+
+        if self.sparse:
+            self._make_columns_sparse_in_place(X)
+
+        return X
+
+    def _columns_to_dummify(self, X):
+        """The categorical columns of a dataframe minus the excluded columns."""
         columns_to_dummify = list(X.select_dtypes(include=[object, 'category']))
 
         # remove excluded columns (if they are still in the list)
-        for column in columns_to_dummify:
-            if column in self.excluded_columns:
-                columns_to_dummify.remove(column)
+        return [column for column in columns_to_dummify if column not in self.excluded_columns]
+
+    def _with_learned_levels(self, X, column):
+        """
+        A column as a categorical with the learned levels (when they were learned), so its dummy variables are the
+        same for every dataframe. Values that weren't seen when fitting become missing and get no dummy variable.
+        """
+        if not self.levels_by_column or column not in self.levels_by_column:
+            return X[column]
+
+        return pd.Series(pd.Categorical(X[column], categories=self.levels_by_column[column]), index=X.index,
+                         name=column)
 
-        # Create dummy variables
-        X = pd.get_dummies(X, columns=columns_to_dummify, drop_first=True, prefix_sep='.')
+    def _get_dummies_kwargs(self):
+        """The `pandas.get_dummies` arguments for this encoding."""
+        kwargs = {'drop_first': True, 'prefix_sep': '.'}
+
+        if self.sparse:
+            # An explicit numeric dtype keeps the sparse dummies and the sparse numeric columns compatible, so they
+            # convert to a single numeric scipy.sparse matrix
+            kwargs.update(sparse=True, dtype=np.uint8)
+
+        return kwargs
+
+    def _replace_with_dummies_in_place(self, X, columns_to_dummify):
+        """Swap each column for its dummy variables one at a time, so the rest of the dataframe is never copied."""
+        # The dummies are appended as new columns, which pandas warns fragments the dataframe. It is consolidated when
+        # it is converted to an array for training anyway.
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+
+            for column in columns_to_dummify:
+                dummies = pd.get_dummies(self._with_learned_levels(X, column), prefix=column,
+                                         **self._get_dummies_kwargs())
+                del X[column]
+
+                for dummy_column in dummies.columns:
+                    X[dummy_column] = dummies[dummy_column]
 
         return X
 
+    def _make_columns_sparse_in_place(self, X):
+        """Store every dense column that isn't excluded sparsely, with zero as the fill value."""
+        for column in X.columns:
+            if column not in self.excluded_columns and not isinstance(X[column].dtype, pd.SparseDtype):
+                X[column] = X[column].astype(pd.SparseDtype(X[column].dtype, 0))
+
+
+class DataFrameCategoricalEncoder(TransformerMixin):
+    """
+    Convert categorical columns to pandas categoricals with the levels seen in the training data.
+
+    The levels of each column are indexed once at fit time, so encoding new data is a vectorized integer code lookup
+    rather than a per-value search. Unseen levels and missing values get the code -1, which a categorical stores as a
+    missing value, so they are imputed or dropped further down the pipeline. Unseen levels are reported with a warning.
+
+    The levels either come from `levels_by_column` (for example the `categorical_column_info` saved with a trained
+    model) or are learned from the object and category columns of the fit dataframe.
+    """
+
+    def __init__(self, levels_by_column=None, excluded_columns=None):
+        """
+        Create a categorical encoder.
+
+        Args:
+            levels_by_column (dict): Optional column names mapped to their levels, either as a list-like or as a
+                pandas.Series whose index holds the levels (as returned by `get_categorical_levels`)
+            excluded_columns (list): Columns that are not learned as categorical columns when fitting
+        """
+        self.levels_by_column = levels_by_column
+        self.excluded_columns = excluded_columns
+        self.level_index_by_column = None
+        self._code_by_level_by_column = None
+
+    def fit(self, X=None, y=None):
+        levels_by_column = self.levels_by_column
+        if levels_by_column is None:
+            levels_by_column = get_categorical_levels(X, columns_to_ignore=self.excluded_columns or [])
+
+        self.level_index_by_column = {}
+        for column, levels in levels_by_column.items():
+            if isinstance(levels, pd.Series):
+                levels = levels.index
+            self.level_index_by_column[column] = pd.Index(levels)
+
+        # Level to code lookups for encoding single values without building an index lookup
+        self._code_by_level_by_column = {column: {level: code for code, level in enumerate(level_index)}
+                                         for column, level_index in self.level_index_by_column.items()}
+
+        return self
+
+    def transform(self, X, y=None):
+        for column, level_index in self.level_index_by_column.items():
+            X[column] = pd.Categorical.from_codes(self.codes(column, X[column].values), categories=level_index)
+
+        return X
+
+    def codes(self, column, values):
+        """
+        Look up the integer level codes of an array of values and warn about unseen levels.
+
+        Args:
+            column (str): The name of the categorical column
+            values (numpy.ndarray): The raw values
+
+        Returns:
+            numpy.ndarray: The integer code of each value, -1 for missing values and unseen levels
+        """
+        codes = self.level_index_by_column[column].get_indexer(values).astype(np.intp)
+
+        # A value without a code that isn't missing is a level that wasn't in the training data
+        unseen = (codes == -1) & pd.notnull(values)
+        if unseen.any():
+            print(UNSEEN_LEVELS_MESSAGE.format(column, set(values[unseen])))
+
+        return codes
+
+    def code(self, column, value):
+        """
+        Look up the integer level code of a single value and warn if it is an unseen level.
+
+        Args:
+            column (str): The name of the categorical column
+            value: The raw value
+
+        Returns:
+            int: The integer code of the value, -1 for a missing value or an unseen level
+        """
+        code = self._code_by_level_by_column[column].get(value, -1)
+        if code == -1 and not (value is None or value != value):
+            print(UNSEEN_LEVELS_MESSAGE.format(column, {value}))
+
+        return code
+
 
 class DataFrameConvertColumnToNumeric(TransformerMixin):
     """Convert a column into numeric variables."""
@@ -133,6 +500,54 @@ class DataFrameConvertColumnToNumeric(TransformerMixin):
         return X
 
 
+class DataFrameDowncastDtypes(TransformerMixin):
+    """
+    Store the columns of a dataframe in place with compact dtypes: float32 floats, small integers and categoricals for
+    low cardinality strings (see `healthcareai.common.dtype_planning`).
+
+    The dtype plan is inferred when fitting and then applied to every transformed dataframe, so prediction data is
+    stored the same way as the training data was. Exclude columns (such as the predicted column) to leave them as
+    they are. Call `partial_fit` on each chunk of the training data to plan the dtypes in a streaming fashion.
+    """
+
+    def __init__(self, excluded_columns=None):
+        self.excluded_columns = excluded_columns
+        self.dtype_plan = None
+
+    def fit(self, X, y=None):
+        self.dtype_plan = None
+
+        return self.partial_fit(X)
+
+    def partial_fit(self, X, y=None):
+        """
+        Plan the dtypes of another chunk of the training data and widen the plan so it holds every chunk seen so far.
+
+        Args:
+            X (pandas.core.frame.DataFrame): A chunk of the training data
+
+        Returns:
+            DataFrameDowncastDtypes: self
+        """
+        excluded_columns = self.excluded_columns or []
+        compact_dtypes = hcai_dtypes.plan_dtypes(X, excluded_columns=excluded_columns)
+
+        # Columns that are already compact (for example loaded with `load_csv(downcast=True)`) are planned with their
+        # dtype as well, so prediction data is stored the same way as the training data
+        dtype_plan = {column: compact_dtypes.get(column, X[column].dtype) for column in X.columns
+                      if column not in excluded_columns}
+
+        if self.dtype_plan is None:
+            self.dtype_plan = dtype_plan
+        else:
+            self.dtype_plan = hcai_dtypes.merge_dtype_plans(self.dtype_plan, dtype_plan)
+
+        return self
+
+    def transform(self, X, y=None):
+        return hcai_dtypes.apply_dtype_plan(X, self.dtype_plan)
+
+
 class DataFrameUnderSampling(TransformerMixin):
     """
     Performs undersampling on a dataframe.
@@ -163,7 +578,7 @@ class DataFrameUnderSampling(TransformerMixin):
 
         # Initialize and fit the under sampler
         under_sampler = RandomUnderSampler(random_state=self.random_seed)
-        x_under_sampled, y_under_sampled = under_sampler.fit_sample(temp_dataframe, y)
+        x_under_sampled, y_under_sampled = under_sampler.fit_resample(temp_dataframe, y)
 
         # Build the resulting under sampled dataframe
         result = pd.DataFrame(x_under_sampled)
@@ -208,7 +623,7 @@ class DataFrameOverSampling(TransformerMixin):
 
         # Initialize and fit the under sampler
         over_sampler = RandomOverSampler(random_state=self.random_seed)
-        x_over_sampled, y_over_sampled = over_sampler.fit_sample(temp_dataframe, y)
+        x_over_sampled, y_over_sampled = over_sampler.fit_resample(temp_dataframe, y)
 
         # Build the resulting under sampled dataframe
         result = pd.DataFrame(x_over_sampled)
@@ -0,0 +1,121 @@
+"""Warm Start Search
+
+This module contains a hyperparameter search for tree ensembles (such as random forests) that grows each forest
+incrementally instead of training a separate forest from scratch for every `n_estimators` value.
+
+Adding trees to a random forest doesn't change the trees it already has, so a 300 tree forest contains a 100 and a 200
+tree forest. For each combination of the other hyperparameters, one forest per cross validation fold is grown with
+`warm_start=True` and scored at every `n_estimators` checkpoint.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, MetaEstimatorMixin, clone, is_classifier
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+
+import healthcareai.common.helpers as hcai_helpers
+from healthcareai.common.healthcareai_error import HealthcareAIError
+
+
+class WarmStartForestSearchCV(BaseEstimator, MetaEstimatorMixin):
+    """
+    Search a tree ensemble's hyperparameters, growing one forest per candidate and fold through every n_estimators.
+
+    After fitting, `best_params_`, `best_score_` and `best_estimator_` (refit on all the data) are available and
+    prediction is delegated to the best estimator, just like scikit-learn's search estimators.
+    """
+
+    def __init__(self, estimator, param_distributions, scoring=None, n_iter=10, cv=None):
+        """
+        Create a warm start forest search.
+
+        Args:
+            estimator (sklearn.base.BaseEstimator): A tree ensemble that supports `warm_start` (for example
+                RandomForestClassifier)
+            param_distributions (dict): Hyperparameter lists by name. Must include a list of `n_estimators`.
+            scoring (str): The scoring metric to optimize
+            n_iter (int): The maximum number of combinations of the other hyperparameters to sample
+            cv (int): The number of cross validation folds. Defaults to the scikit-learn default.
+        """
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.scoring = scoring
+        self.n_iter = n_iter
+        self.cv = cv
+
+    def fit(self, X, y):
+        """
+        Run the search and refit the best candidate on all the data.
+
+        Args:
+            X (pandas.core.frame.DataFrame): The training features
+            y (pandas.core.series.Series): The training target
+
+        Returns:
+            WarmStartForestSearchCV: self
+        """
+        n_estimators_checkpoints, other_params = self._split_param_distributions()
+        cv = check_cv(self.cv, y, classifier=is_classifier(self.estimator))
+        scorer = check_scoring(self.estimator, scoring=self.scoring)
+        # Sparse features stay sparse (and row indexable) rather than being densified
+        X_values = hcai_helpers.to_sparse_matrix(X) if hcai_helpers.is_sparse_dataframe(X) else np.asarray(X)
+        y_values = np.asarray(y)
+
+        candidates = []
+        scores = []
+        for params in self._sample_other_params(other_params):
+            # Test scores of every n_estimators checkpoint (columns) for every fold (rows)
+            fold_scores = np.empty((cv.get_n_splits(X_values, y_values), len(n_estimators_checkpoints)))
+
+            for fold, (train, test) in enumerate(cv.split(X_values, y_values)):
+                forest = clone(self.estimator).set_params(warm_start=True, **params)
+
+                for checkpoint, n_estimators in enumerate(n_estimators_checkpoints):
+                    forest.set_params(n_estimators=n_estimators)
+                    forest.fit(X_values[train], y_values[train])
+                    fold_scores[fold, checkpoint] = scorer(forest, X_values[test], y_values[test])
+
+            for checkpoint, n_estimators in enumerate(n_estimators_checkpoints):
+                candidates.append(dict(params, n_estimators=n_estimators))
+                scores.append(fold_scores[:, checkpoint].mean())
+
+        best_index = int(np.argmax(scores))
+        self.cv_results_ = {'params': candidates, 'mean_test_score': np.array(scores)}
+        self.best_index_ = best_index
+        self.best_params_ = candidates[best_index]
+        self.best_score_ = scores[best_index]
+
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+
+        return self
+
+    def predict(self, X):
+        """Predict with the best estimator."""
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        """Predict class probabilities with the best estimator."""
+        return self.best_estimator_.predict_proba(X)
+
+    @property
+    def classes_(self):
+        return self.best_estimator_.classes_
+
+    def _split_param_distributions(self):
+        """Split the sorted n_estimators checkpoints from the other hyperparameters."""
+        n_estimators = self.param_distributions.get('n_estimators')
+        if not isinstance(n_estimators, list) or len(n_estimators) == 0:
+            raise HealthcareAIError('A warm start search needs a list of n_estimators values in the hyperparameter '
+                                    'grid.')
+
+        other_params = {name: values for name, values in self.param_distributions.items() if name != 'n_estimators'}
+
+        return sorted(set(n_estimators)), other_params
+
+    def _sample_other_params(self, other_params):
+        """Return every combination of the other hyperparameters, or n_iter samples of them if there are more."""
+        all_lists = all(isinstance(values, list) for values in other_params.values())
+        if all_lists and len(ParameterGrid(other_params)) <= self.n_iter:
+            return list(ParameterGrid(other_params))
+
+        return list(ParameterSampler(other_params, n_iter=self.n_iter))
@@ -2,14 +2,22 @@ from os.path import dirname
 from os.path import join
 import pandas as pd
 
+import healthcareai.common.dtype_planning as hcai_dtypes
 
-def load_data(data_file_name):
+
+def load_data(data_file_name, downcast=False):
     """Loads data from module_path/data/data_file_name
 
+    Every dataset loader takes the same downcast argument.
+
     Args:
         data_file_name (str) : Name of csv file to be loaded from
         module_path/data/data_file_name. Example: 'diabetes.csv'
 
+        downcast (bool) : True to store the columns with compact dtypes
+        (float32, small integers and categoricals for low cardinality
+        strings, see `healthcareai.common.dtype_planning`)
+
     Returns:
         Pandas.core.frame.DataFrame: A pandas dataframe containing the loaded data.
 
@@ -17,10 +25,13 @@ def load_data(data_file_name):
         >>> load_data('diabetes.csv')
     """
     file_path = join(dirname(__file__), 'data', data_file_name)
-    return pd.read_csv(file_path, na_values=['None'])
+    dataframe = pd.read_csv(file_path, na_values=['None'])
+    if downcast:
+        hcai_dtypes.downcast_dtypes(dataframe)
+    return dataframe
 
 
-def load_acute_inflammations():
+def load_acute_inflammations(downcast=False):
     """
     Loads the Acute Inflammations dataset from the UCI ML Library
 
@@ -37,10 +48,10 @@ def load_acute_inflammations():
         `Inflammation`: Inflammation of urinary bladder { 1, 0 }
         `Nephritis`: Nephritis of renal pelvis origin { 1, 0 }
     """
-    return load_data('acute_inflammations.csv')
+    return load_data('acute_inflammations.csv', downcast=downcast)
 
 
-def load_cervical_cancer():
+def load_cervical_cancer(downcast=False):
     """
     Loads the Cervical Cancer (Risk Factors) dataset from the UCI ML Library
 
@@ -85,10 +96,10 @@ def load_cervical_cancer():
         Cytology: target variable
         Biopsy: target variable
     """
-    return load_data('cervical_cancer.csv')
+    return load_data('cervical_cancer.csv', downcast=downcast)
 
 
-def load_diabetes():
+def load_diabetes(downcast=False):
     """
     Loads the healthcare.ai sample diabetes dataset
 
@@ -101,10 +112,10 @@ def load_diabetes():
         GenderFLG
         ThirtyDayReadmitFLG
     """
-    return load_data('diabetes.csv')
+    return load_data('diabetes.csv', downcast=downcast)
 
 
-def load_diagnostic_breast_cancer():
+def load_diagnostic_breast_cancer(downcast=False):
     """
     Loads the Wisconsin Diagnostic Breast Cancer dataset from the UCI ML Library
 
@@ -133,10 +144,10 @@ def load_diagnostic_breast_cancer():
         "M" indicate Mean Radius. Features ending with "S" indicate Standard
         Error. Features ending with "W" indicate Worst Radius.
     """
-    return load_data('diagnostic_breast_cancer.csv')
+    return load_data('diagnostic_breast_cancer.csv', downcast=downcast)
 
 
-def load_fertility():
+def load_fertility(downcast=False):
     """
     Loads the Fertility dataset from the UCI ML Library
 
@@ -161,10 +172,10 @@ def load_fertility():
         `SittingHours`: Number of hours spent sitting per day ene-16 (0, 1)
         `Diagnosis`: Diagnosis normal (N), altered (O)
     """
-    return load_data('fertility.csv')
+    return load_data('fertility.csv', downcast=downcast)
 
 
-def load_heart_disease():
+def load_heart_disease(downcast=False):
     """
     Loads the Stratlog (Heart) dataset from the UCI ML Library
 
@@ -187,10 +198,10 @@ def load_heart_disease():
         `Thal`: thal: 3 = normal; 6 = fixed defect; 7 = reversable defect
         `Outcome`: Absence (1) or presence (2) of heart disease
     """
-    return load_data('heart_disease.csv')
+    return load_data('heart_disease.csv', downcast=downcast)
 
 
-def load_mammographic_masses():
+def load_mammographic_masses(downcast=False):
     """
     Loads the Mammographic Mass dataset from the UCI ML Library
 
@@ -207,10 +218,10 @@ def load_mammographic_masses():
         `Density`: mass density high=1 iso=2 low=3 fat-containing=4 (ordinal)
         `Severity`: benign=0 or malignant=1 (binominal, goal field!)
     """
-    return load_data('mammographic_masses.csv')
+    return load_data('mammographic_masses.csv', downcast=downcast)
 
 
-def load_pima_indians_diabetes():
+def load_pima_indians_diabetes(downcast=False):
     """
     Loads the PIMA Indians Diabetes dataset from the UCI ML Library
 
@@ -229,10 +240,10 @@ def load_pima_indians_diabetes():
         `Age`: Age (years)
         `Diabetes`: Class variable (Y or N)
     """
-    return load_data('pima_indians_diabetes.csv')
+    return load_data('pima_indians_diabetes.csv', downcast=downcast)
 
 
-def load_prognostic_breast_cancer():
+def load_prognostic_breast_cancer(downcast=False):
     """
     Loads the Wisconsin Prognostic Breast Cancer dataset from the UCI ML Library
 
@@ -264,10 +275,10 @@ def load_prognostic_breast_cancer():
         "M" indicate Mean Radius. Features ending with "S" indicate Standard
         Error. Features ending with "W" indicate Worst Radius.
     """
-    return load_data('prognostic_breast_cancer.csv')
+    return load_data('prognostic_breast_cancer.csv', downcast=downcast)
 
 
-def load_thoracic_surgery():
+def load_thoracic_surgery(downcast=False):
     """
     Loads the Thoracic Surgery dataset from the UCI ML Library
 
@@ -296,4 +307,4 @@ def load_thoracic_surgery():
         `AGE`: Age at surgery (numeric)
         `Risk1Y`: 1 year survival period - (T)rue value if died (T,F)
     """
-    return load_data('thoracic_surgery.csv')
+    return load_data('thoracic_surgery.csv', downcast=downcast)
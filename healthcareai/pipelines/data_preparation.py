@@ -4,24 +4,108 @@ import healthcareai.common.transformers as hcai_transformers
 import healthcareai.common.filters as hcai_filters
 
 
-def full_pipeline(model_type, predicted_column, grain_column, impute=True, verbose=True):
+def full_pipeline(model_type, predicted_column, grain_column, impute=True, verbose=True, sparse=False, downcast=False):
     """
     Builds the data preparation pipeline. Sequentially runs transformers and filters to clean and prepare the data.
     
     Note advanced users may wish to use their own custom pipeline.
+
+    Set sparse to True when there are high cardinality categorical columns (such as diagnosis codes or providers). The
+    prepared features are then stored sparsely and stay sparse through training, prediction and top factors.
+
+    Set downcast to True to store the data with compact dtypes (float32 floats, small integers and categoricals for low
+    cardinality strings) from the start of the pipeline, which cuts its memory use several times over and gives the
+    models a float32 matrix.
+
+    The first step copies the input dataframe (minus any DTS columns) and every later step modifies that copy in place
+    or only rebuilds single columns, so the caller's dataframe is never changed and the data is copied once on the way
+    in rather than by every step.
     """
 
     # Note: this could be done more elegantly using FeatureUnions _if_ you are not using pandas dataframes for
     #   inputs of the later pipelines as FeatureUnion intrinsically converts outputs to numpy arrays.
-    pipeline = Pipeline([
+    steps = [
         ('remove_DTS_columns', hcai_filters.DataframeColumnSuffixFilter()),
-        ('remove_grain_column', hcai_filters.DataframeColumnRemover(grain_column)),
+        ('remove_grain_column', hcai_filters.DataframeColumnRemover(grain_column, copy=False)),
+    ]
+
+    if downcast:
+        # The predicted column keeps its dtype so the target conversions see the raw values
+        steps.append(('downcast_dtypes',
+                      hcai_transformers.DataFrameDowncastDtypes(excluded_columns=[predicted_column])))
+
+    steps.extend([
         # Perform one of two basic imputation methods
         # TODO we need to think about making this optional to solve the problem of rare and very predictive values
-        ('imputation', hcai_transformers.DataFrameImputer(impute=impute, verbose=verbose)),
-        ('null_row_filter', hcai_filters.DataframeNullValueFilter(excluded_columns=None)),
+        ('imputation', hcai_transformers.DataFrameImputer(impute=impute, verbose=verbose, copy=False)),
+        ('null_row_filter', hcai_filters.DataframeNullValueFilter(excluded_columns=None, copy=False)),
         ('convert_target_to_binary', hcai_transformers.DataFrameConvertTargetToBinary(model_type, predicted_column)),
         ('prediction_to_numeric', hcai_transformers.DataFrameConvertColumnToNumeric(predicted_column)),
-        ('create_dummy_variables', hcai_transformers.DataFrameCreateDummyVariables(excluded_columns=[predicted_column])),
+        ('create_dummy_variables', hcai_transformers.DataFrameCreateDummyVariables(excluded_columns=[predicted_column],
+                                                                                   copy=False, sparse=sparse)),
     ])
+    return Pipeline(steps)
+
+
+def prediction_pipeline(fit_pipeline, dataframe):
+    """
+    Builds the prediction-time pipeline from a `full_pipeline` that was already fit on the training data.
+
+    Prediction data is always imputed (otherwise rows are dropped and predictions go missing), so the prediction
+    pipeline is the fit pipeline with an imputer that imputes. The other fit steps are shared. If the fit
+    pipeline already imputes, its fit imputer is reused as is. Otherwise a new imputer is fit on the training data as
+    the imputation step sees it, without running the data through the rest of the pipeline.
+
+    Args:
+        fit_pipeline (sklearn.pipeline.Pipeline): A `full_pipeline` fit on the training data
+        dataframe (pandas.core.frame.DataFrame): The raw training data the pipeline was fit on
+
+    Returns:
+        sklearn.pipeline.Pipeline: A fit pipeline for preparing prediction data
+    """
+    steps = list(fit_pipeline.steps)
+    step_names = [name for name, _ in steps]
+    imputation_index = step_names.index('imputation')
+    imputer = steps[imputation_index][1]
+
+    if not imputer.impute:
+        # Only the column filters before the imputer need to run to fit it
+        x = dataframe
+        for _, step in steps[:imputation_index]:
+            x = step.transform(x)
+
+        imputer = hcai_transformers.DataFrameImputer(impute=True, verbose=False, copy=False).fit(x)
+        steps[imputation_index] = ('imputation', imputer)
+
+    return Pipeline(steps)
+
+
+def fit_pipeline_on_chunks(pipeline, chunks):
+    """
+    Fits a data preparation pipeline (such as `full_pipeline`) on training data that arrives in chunks, for training
+    data that doesn't fit in memory once it is prepared. For example::
+
+        chunks = pd.read_sql(query, connection, chunksize=100000)
+        pipeline = fit_pipeline_on_chunks(full_pipeline('classification', 'ThirtyDayReadmitFLG', 'PatientEncounterID'),
+                                          chunks)
+
+    Each chunk runs through the steps in turn. Steps with a `partial_fit` (the dtype plan, the imputer's running means
+    and modes and the dummy variables' level sets) learn from the chunk before transforming it for the next step, the
+    other steps are stateless. Once every chunk has been seen the pipeline transforms any chunk to the same columns,
+    so the training data can be prepared chunk by chunk (and stored sparsely, for example) with `pipeline.transform`.
+
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): An unfit data preparation pipeline
+        chunks (iterable): The pandas.core.frame.DataFrame chunks of the training data
+
+    Returns:
+        sklearn.pipeline.Pipeline: The pipeline fit on all the chunks
+    """
+    for chunk in chunks:
+        x = chunk
+        for _, step in pipeline.steps:
+            if hasattr(step, 'partial_fit'):
+                step.partial_fit(x)
+            x = step.transform(x)
+
     return pipeline
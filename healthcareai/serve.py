@@ -0,0 +1,247 @@
+"""A lightweight local HTTP scoring service for saved models.
+
+Loads a model saved with `TrainedSupervisedModel.save()` once and serves predictions over HTTP, which avoids paying
+the pickle load and library import costs on every batch. Concurrent requests are coalesced into micro-batches that
+are scored by a pool of worker threads.
+
+With `--processes`, the model is loaded once and the server is then forked into several processes that accept
+connections on the same socket. The processes share the loaded model's memory (copy on write) instead of each holding
+a private copy, and its arrays are memory-mapped from the artifact.
+
+Usage:
+
+    python -m healthcareai.serve 2017-05-31T12-36-21_classification_RandomForestClassifier.pkl --port 8000
+
+Endpoints:
+
+    POST /predict                   Predictions (grain id and prediction)
+    POST /predict_with_factors?k=3  Predictions with the top k factors (defaults to 3)
+    GET  /health                    Model details for health checks
+    GET  /metrics                   Request, row, batch and error counts and scoring time
+
+Prediction requests take either a JSON list of records (or an object with a "records" list) or a CSV body (with a
+`text/csv` content type). Responses are JSON records, or CSV when the request has a `text/csv` Accept header.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from healthcareai.common.file_io_utilities import load_saved_model
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.micro_batching import MicroBatcher
+
+
+class ScoringServer(ThreadingMixIn, HTTPServer):
+    """An HTTP server that handles each request on its own thread and scores through a shared micro batcher."""
+
+    daemon_threads = True
+    # Allow bursts of concurrent connections to queue up instead of being reset
+    request_queue_size = 128
+
+    def __init__(self, server_address, trained_model, batcher):
+        """
+        Create a scoring server.
+
+        Args:
+            server_address (tuple): The (host, port) to listen on. Port 0 picks a free port.
+            trained_model (TrainedSupervisedModel): The loaded model
+            batcher (MicroBatcher): The micro batcher that scores requests
+        """
+        HTTPServer.__init__(self, server_address, ScoringRequestHandler)
+        self.trained_model = trained_model
+        self.batcher = batcher
+        self.started_at = time.time()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    """Handle health, metrics and prediction requests."""
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+
+        if path == '/health':
+            model = self.server.trained_model
+            self._send_json(200, {
+                'status': 'ok',
+                'algorithm_name': model.algorithm_name,
+                'model_type': model.model_type,
+                'grain_column': model.grain_column,
+                'prediction_column': model.prediction_column})
+        elif path == '/metrics':
+            metrics = self.server.batcher.metrics
+            metrics['uptime_seconds'] = time.time() - self.server.started_at
+            self._send_json(200, metrics)
+        else:
+            self._send_json(404, {'error': 'Unknown endpoint: {}'.format(path)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+
+        if url.path not in ['/predict', '/predict_with_factors']:
+            self._send_json(404, {'error': 'Unknown endpoint: {}'.format(url.path)})
+            return
+
+        try:
+            number_top_features = None
+            if url.path == '/predict_with_factors':
+                number_top_features = self._read_number_top_features(url.query)
+
+            dataframe = self._read_dataframe()
+            results = self.server.batcher.score(dataframe, number_top_features=number_top_features)
+        except (HealthcareAIError, ValueError) as e:
+            self._send_json(400, {'error': getattr(e, 'message', str(e))})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        if 'text/csv' in self.headers.get('Accept', ''):
+            self._send(200, 'text/csv', results.to_csv(index=False))
+        else:
+            self._send(200, 'application/json', results.to_json(orient='records'))
+
+    def _read_number_top_features(self, query):
+        """Parse the number of top factors (k, defaults to 3) from the query string."""
+        k = parse_qs(query).get('k', ['3'])[0]
+        try:
+            number_top_features = int(k)
+        except ValueError:
+            number_top_features = 0
+
+        if number_top_features < 1:
+            raise HealthcareAIError('The number of top factors (k) must be a positive integer. You passed in {}'.format(
+                k))
+
+        return number_top_features
+
+    def _read_dataframe(self):
+        """Parse the request body (JSON records or CSV) into a raw prediction dataframe."""
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+
+        if 'text/csv' in self.headers.get('Content-Type', ''):
+            # Use the same null values as healthcareai.load_csv()
+            return pd.read_csv(io.StringIO(body), na_values=['None', 'null'])
+
+        records = json.loads(body)
+        if isinstance(records, dict):
+            records = records.get('records', [records])
+        if not isinstance(records, list) or len(records) == 0:
+            raise HealthcareAIError('Please send a non-empty JSON list of records or an object with a "records" list.')
+
+        return pd.DataFrame(records)
+
+    def _send_json(self, status, payload):
+        self._send(status, 'application/json', json.dumps(payload))
+
+    def _send(self, status, content_type, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet, scoring volume would otherwise flood it
+        pass
+
+
+def create_server(trained_model, host='127.0.0.1', port=8000, workers=1, max_batch_size=1000, max_wait=0.005):
+    """
+    Create (but don't start) a scoring server for a loaded model.
+
+    Args:
+        trained_model (TrainedSupervisedModel): The loaded model
+        host (str): The host to listen on. Defaults to localhost only.
+        port (int): The port to listen on. Port 0 picks a free port.
+        workers (int): The number of threads scoring micro-batches
+        max_batch_size (int): A micro-batch is scored as soon as it holds this many rows
+        max_wait (float): The maximum number of seconds a request waits for others to join its micro-batch
+
+    Returns:
+        ScoringServer: The server. Call `serve_forever()` to start it and `batcher.close()` after shutting it down.
+    """
+    batcher = MicroBatcher(trained_model, max_batch_size=max_batch_size, max_wait=max_wait, workers=workers)
+    return ScoringServer((host, port), trained_model, batcher)
+
+
+def fork_processes(processes):
+    """
+    Fork this process into the given number of processes, which share the memory allocated so far (such as a loaded
+    model) until one of them writes to it. Fork before starting any threads, they don't survive the fork.
+
+    Args:
+        processes (int): The total number of processes, including this one
+
+    Returns:
+        list: The process ids of the forked processes in this process, and an empty list in the forked processes
+    """
+    if not hasattr(os, 'fork'):
+        raise HealthcareAIError('Serving from several processes needs os.fork, which this platform does not have.')
+
+    # Keep the garbage collector from touching (and thereby copying) the pages of the objects loaded so far
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    children = []
+    for _ in range(processes - 1):
+        pid = os.fork()
+        if pid == 0:
+            return []
+        children.append(pid)
+
+    return children
+
+
+def main(args=None):
+    """Load a saved model and serve it until interrupted."""
+    parser = argparse.ArgumentParser(description='Serve predictions from a saved healthcare.ai model over HTTP.')
+    parser.add_argument('model', help='The saved model file (from TrainedSupervisedModel.save())')
+    parser.add_argument('--host', default='127.0.0.1', help='The host to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='The port to listen on (default: 8000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The number of scoring threads per process (default: 1)')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='The number of server processes sharing the loaded model (default: 1)')
+    parser.add_argument('--max-batch-size', type=int, default=1000,
+                        help='The maximum number of rows per micro-batch (default: 1000)')
+    parser.add_argument('--max-wait-ms', type=float, default=5,
+                        help='The maximum milliseconds to wait for requests to batch together (default: 5)')
+    arguments = parser.parse_args(args)
+
+    # The server only scores, so it skips the evaluation payload of model artifacts and shares their arrays
+    trained_model = load_saved_model(arguments.model, scoring_only=True, memory_map=True)
+
+    # Every process accepts connections on the socket bound here, and starts its own scoring threads after the fork
+    server = ScoringServer((arguments.host, arguments.port), trained_model, None)
+    children = fork_processes(arguments.processes) if arguments.processes > 1 else []
+    server.batcher = MicroBatcher(trained_model,
+                                  max_batch_size=arguments.max_batch_size,
+                                  max_wait=arguments.max_wait_ms / 1000,
+                                  workers=arguments.workers)
+
+    if children or arguments.processes == 1:
+        print('Serving {} predictions on http://{}:{} from {} process(es)'.format(
+            trained_model.algorithm_name, server.server_address[0], server.server_address[1], arguments.processes))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+        for pid in children:
+            os.waitpid(pid, 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,8 @@ class SupervisedModelTrainer(object):
     reports appropriate metrics.
     """
 
-    def __init__(self, dataframe, predicted_column, model_type, impute=True, grain_column=None, verbose=True):
+    def __init__(self, dataframe, predicted_column, model_type, impute=True, grain_column=None, verbose=True,
+                 n_jobs=-1, sparse=False, downcast=False):
         """
         Set up a SupervisedModelTrainer.
 
@@ -38,6 +39,18 @@ class SupervisedModelTrainer(object):
             grain_column (str): The name of the grain column
 
             verbose (bool): Set to true for verbose output. Defaults to True.
+
+            n_jobs (int): The number of CPUs used to train models. Defaults to
+            -1 (all CPUs). Use 1 to train on a single CPU.
+
+            sparse (bool): Set to True to store the dummy variables of
+            categorical columns sparsely, which saves a lot of memory for high
+            cardinality columns. Defaults to False.
+
+            downcast (bool): Set to True to store the data with compact
+            dtypes (float32, small integers and categoricals for low
+            cardinality strings), which cuts the memory of the prepared data
+            several times over. Defaults to False.
         """
         self.predicted_column = predicted_column
         self.grain_column = grain_column
@@ -47,10 +60,7 @@ class SupervisedModelTrainer(object):
         # impute, then some rows on the prediction
         # data frame will be removed, which results in missing predictions.
         pipeline = hcai_pipelines.full_pipeline(model_type, predicted_column, grain_column, impute=impute,
-                                                verbose=True)
-
-        prediction_pipeline = hcai_pipelines.full_pipeline(model_type, predicted_column, grain_column, impute=True,
-                                                           verbose=False)
+                                                verbose=True, sparse=sparse, downcast=downcast)
 
         # Run a low and high cardinality check. Warn the user, and allow
         # them to proceed.
@@ -59,7 +69,9 @@ class SupervisedModelTrainer(object):
 
         # Run the raw data through the data preparation pipeline
         clean_dataframe = pipeline.fit_transform(dataframe)
-        _ = prediction_pipeline.fit_transform(dataframe)
+
+        # Reuse the fit state for the prediction pipeline rather than running the data through a second pipeline
+        prediction_pipeline = hcai_pipelines.prediction_pipeline(pipeline, dataframe)
 
         # Instantiate the advanced class
         self._advanced_trainer = AdvancedSupervisedModelTrainer(pipeline=pipeline,
@@ -68,7 +80,8 @@ class SupervisedModelTrainer(object):
             predicted_column=predicted_column,
             grain_column=grain_column,
             original_column_names=dataframe.columns.values,
-            verbose=verbose)
+            verbose=verbose,
+            n_jobs=n_jobs)
 
         # Save the pipeline to the parent class
         self._advanced_trainer.pipeline = prediction_pipeline
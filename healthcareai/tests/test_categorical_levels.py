@@ -4,7 +4,7 @@ import pandas as pd
 
 from healthcareai.common.healthcareai_error import HealthcareAIError
 from healthcareai.supervised_model_trainer import SupervisedModelTrainer
-from healthcareai.common.get_categorical_levels import get_categorical_levels
+from healthcareai.common.get_categorical_levels import get_categorical_levels, CategoricalLevelCounter
 
 
 class TestTopFactors(unittest.TestCase):
@@ -103,13 +103,9 @@ class TestTopFactors(unittest.TestCase):
                                                   'mathematicians', 'predicted'])
         # Set mathematician column to category and choose the order in which the levels are listed (default is
         # alphabetical)
-        cls.get_levels_df['mathematicians'] = cls.get_levels_df['mathematicians'].astype('category',
-                                                                                         categories=['Wiles',
-                                                                                                     'Euler',
-                                                                                                     'Grotheniek',
-                                                                                                     'Hilbert',
-                                                                                                     'Gauss'],
-                                                                                         ordered=False)
+        mathematicians_dtype = pd.CategoricalDtype(categories=['Wiles', 'Euler', 'Grotheniek', 'Hilbert', 'Gauss'],
+                                                   ordered=False)
+        cls.get_levels_df['mathematicians'] = cls.get_levels_df['mathematicians'].astype(mathematicians_dtype)
 
         # Reset random seed
         np.random.seed()
@@ -119,8 +115,8 @@ class TestTopFactors(unittest.TestCase):
         row1_predictions = self.trained_lr.make_predictions(self.one_row1)
         row2_predictions = self.trained_lr.make_predictions(self.one_row2)
         # Compare predictions to fixed values
-        self.assertEqual(np.round(row1_predictions.iloc[0, 1], decimals=6), 0.921645)
-        self.assertEqual(np.round(row2_predictions.iloc[0, 1], decimals=6), 0.935244)
+        self.assertEqual(np.round(row1_predictions.iloc[0, 1], decimals=6), 0.928522)
+        self.assertEqual(np.round(row2_predictions.iloc[0, 1], decimals=6), 0.935326)
         # As a futher sanity check, note that using the "true" decision boundary, we would have
         # sigmoid(2.4 - 0.7 + 1) = sigmoid(2.7) ~ 0.937 in the first case and
         # sigmoid(0 + 1 + 0 + 2) = sigmoid(3) ~ 0.953 in the second case
@@ -165,3 +161,21 @@ class TestTopFactors(unittest.TestCase):
         self.assertEqual(categorical_level_info['numbers_mod_3'].index[1], '1')
         self.assertEqual(categorical_level_info['mathematicians'].index[0], 'Wiles')
         self.assertEqual(categorical_level_info['mathematicians'].index[4], 'Gauss')
+
+
+class TestCategoricalLevelCounter(unittest.TestCase):
+    def test_chunks_match_whole_dataframe(self):
+        df = pd.DataFrame({'grain': range(6),
+                           'letters': ['B', 'A', 'A', None, 'C', 'A'],
+                           'ranks': pd.Categorical(['low', 'high', 'low', 'low', 'mid', 'low'],
+                                                   categories=['low', 'mid', 'high'])})
+        expected = get_categorical_levels(df, columns_to_ignore=['grain'])
+
+        counter = CategoricalLevelCounter(columns_to_ignore=['grain'])
+        for start in range(0, 6, 2):
+            counter.partial_fit(df.iloc[start:start + 2])
+        result = counter.levels()
+
+        self.assertListEqual(sorted(result), ['letters', 'ranks'])
+        for column in expected:
+            pd.testing.assert_series_equal(result[column], expected[column], check_dtype=False)
@@ -0,0 +1,111 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+import healthcareai.pipelines.data_preparation as hcai_pipelines
+
+
+class TestPredictionPipeline(unittest.TestCase):
+    def setUp(self):
+        self.training_df = pd.DataFrame({
+            'id': [1, 2, 3, 4, 5],
+            'x': [1.0, np.nan, 3.0, 4.0, 7.0],
+            'color': ['red', 'blue', None, 'blue', 'green'],
+            'AdmitDTS': ['2017-01-01'] * 5,
+            'target': ['Y', 'N', 'Y', 'N', 'Y']},
+            columns=['id', 'x', 'color', 'AdmitDTS', 'target'])
+
+    def _separately_fit_prediction_pipeline(self):
+        pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=True, verbose=False)
+        pipeline.fit_transform(self.training_df.copy())
+
+        return pipeline
+
+    def test_matches_separately_fit_pipeline_without_imputation(self):
+        pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=False, verbose=False)
+        pipeline.fit_transform(self.training_df.copy())
+
+        prediction_pipeline = hcai_pipelines.prediction_pipeline(pipeline, self.training_df)
+
+        assert_frame_equal(prediction_pipeline.transform(self.training_df.copy()),
+                           self._separately_fit_prediction_pipeline().transform(self.training_df.copy()))
+        # The training pipeline still drops rows instead of imputing them
+        self.assertFalse(pipeline.named_steps['imputation'].impute)
+
+    def test_reuses_fit_imputer_with_imputation(self):
+        pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=True, verbose=False)
+        pipeline.fit_transform(self.training_df.copy())
+
+        prediction_pipeline = hcai_pipelines.prediction_pipeline(pipeline, self.training_df)
+
+        self.assertIs(prediction_pipeline.named_steps['imputation'], pipeline.named_steps['imputation'])
+        assert_frame_equal(prediction_pipeline.transform(self.training_df.copy()),
+                           self._separately_fit_prediction_pipeline().transform(self.training_df.copy()))
+
+
+class TestFullPipeline(unittest.TestCase):
+    def test_input_dataframe_is_not_modified(self):
+        training_df = pd.DataFrame({
+            'id': [1, 2, 3, 4, 5],
+            'x': [1.0, np.nan, 3.0, 4.0, 7.0],
+            'color': ['red', 'blue', None, 'blue', 'green'],
+            'AdmitDTS': ['2017-01-01'] * 5,
+            'target': ['Y', 'N', 'Y', 'N', 'Y']},
+            columns=['id', 'x', 'color', 'AdmitDTS', 'target'])
+        original_df = training_df.copy()
+
+        for impute in [True, False]:
+            pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=impute, verbose=False)
+            pipeline.fit_transform(training_df)
+
+            assert_frame_equal(training_df, original_df)
+
+
+class TestFitPipelineOnChunks(unittest.TestCase):
+    def setUp(self):
+        self.training_df = pd.DataFrame({
+            'id': range(8),
+            'x': [1.0, np.nan, 3.0, 4.0, 7.0, 2.0, np.nan, 5.0],
+            'color': ['red', 'red', None, 'red', 'green', 'blue', 'blue', 'green'],
+            'AdmitDTS': ['2017-01-01'] * 8,
+            'target': ['Y', 'N', 'Y', 'N', 'Y', 'N', 'N', 'Y']},
+            columns=['id', 'x', 'color', 'AdmitDTS', 'target'])
+
+    def test_matches_pipeline_fit_on_whole_dataframe(self):
+        for impute in [True, False]:
+            pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=impute, verbose=False)
+            expected = pipeline.fit(self.training_df).transform(self.training_df)
+
+            chunks = (self.training_df.iloc[start:start + 3] for start in range(0, 8, 3))
+            chunked_pipeline = hcai_pipelines.fit_pipeline_on_chunks(
+                hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=impute, verbose=False), chunks)
+
+            assert_frame_equal(chunked_pipeline.transform(self.training_df), expected)
+
+    def test_chunks_are_transformed_to_the_same_columns(self):
+        chunks = [self.training_df.iloc[:4], self.training_df.iloc[4:]]
+        pipeline = hcai_pipelines.fit_pipeline_on_chunks(
+            hcai_pipelines.full_pipeline('classification', 'target', 'id', verbose=False), chunks)
+
+        # The first chunk only has red and missing colors
+        first = pipeline.transform(chunks[0])
+        second = pipeline.transform(chunks[1])
+
+        self.assertListEqual(list(first.columns), list(second.columns))
+        self.assertListEqual(list(first.columns), ['x', 'target', 'color.green', 'color.red'])
+
+    def test_downcast_pipeline_fits_on_chunks(self):
+        pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', verbose=False, downcast=True)
+        expected = pipeline.fit(self.training_df).transform(self.training_df)
+
+        chunks = (self.training_df.iloc[start:start + 3] for start in range(0, 8, 3))
+        chunked_pipeline = hcai_pipelines.fit_pipeline_on_chunks(
+            hcai_pipelines.full_pipeline('classification', 'target', 'id', verbose=False, downcast=True), chunks)
+
+        assert_frame_equal(chunked_pipeline.transform(self.training_df), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
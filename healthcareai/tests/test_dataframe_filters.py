@@ -257,5 +257,28 @@ class TestDataframeNullValueFilter(unittest.TestCase):
 
         self.assertRaises(HealthcareAIError, filters.DataframeNullValueFilter().fit_transform, df)
 
+    def test_keeps_rows_with_nulls_in_excluded_columns(self):
+        df = pd.DataFrame({
+            'category': ['a', None, 'c'],
+            'age': [1, 5, None]
+        })
+
+        result = filters.DataframeNullValueFilter(excluded_columns=['category']).fit_transform(df)
+        self.assertEqual(list(result['age']), [1, 5])
+
+    def test_copy_leaves_input_unchanged(self):
+        df = pd.DataFrame({'age': [1, 5, None]})
+
+        result = filters.DataframeNullValueFilter().fit_transform(df)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(len(df), 3)
+
+    def test_no_copy_drops_rows_in_place(self):
+        df = pd.DataFrame({'age': [1, 5, None]})
+
+        result = filters.DataframeNullValueFilter(copy=False).fit_transform(df)
+        self.assertIs(result, df)
+        self.assertEqual(len(df), 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,4 @@
+import pickle
 import pandas as pd
 import numpy as np
 import unittest
@@ -93,6 +94,56 @@ class TestDataframeImputer(unittest.TestCase):
         # Assert column types remain identical
         self.assertTrue(list(result.dtypes) == list(df.dtypes))
 
+    def test_partial_fit_on_chunks_matches_fit(self):
+        df = pd.DataFrame({
+            'category': ['a', 'b', 'b', None, 'c', 'b'],
+            'number': [1.0, np.nan, 2.0, 4.0, np.nan, 5.0],
+            'flag': [True, False, True, True, False, True],
+        })
+        expected = transformers.DataFrameImputer(verbose=False).fit(df)
+
+        imputer = transformers.DataFrameImputer(verbose=False)
+        for start in range(0, 6, 2):
+            imputer.partial_fit(df.iloc[start:start + 2])
+
+        pd.testing.assert_series_equal(imputer.fill, expected.fill)
+        self.assertListEqual(list(imputer.object_columns), ['category'])
+
+    def test_running_statistics_are_not_kept_or_pickled(self):
+        df = pd.DataFrame({'category': ['a', 'b', 'b', None], 'number': [1.0, np.nan, 2.0, 4.0]})
+
+        fit_imputer = transformers.DataFrameImputer(verbose=False).fit(df)
+        self.assertIsNone(fit_imputer._statistics)
+
+        chunk_imputer = transformers.DataFrameImputer(verbose=False).partial_fit(df.iloc[:2]).partial_fit(df.iloc[2:])
+        loaded = pickle.loads(pickle.dumps(chunk_imputer))
+        self.assertIsNone(loaded._statistics)
+        pd.testing.assert_series_equal(loaded.fill, fit_imputer.fill)
+        pd.testing.assert_frame_equal(loaded.transform(df), fit_imputer.transform(df))
+
+    def test_mode_of_categorical_dtype_column(self):
+        df = pd.DataFrame({'category': pd.Categorical(['x', 'y', 'y', None], categories=['z', 'x', 'y'])})
+
+        imputer = transformers.DataFrameImputer(verbose=False).fit(df)
+
+        self.assertEqual(imputer.fill['category'], 'y')
+
+    def test_float32_columns_stay_float32(self):
+        df = pd.DataFrame({'number': np.array([1.1, np.nan, 2.3], dtype=np.float32), 'category': ['a', None, 'a']})
+
+        result = transformers.DataFrameImputer(verbose=False).fit_transform(df)
+
+        self.assertEqual(result['number'].dtype, np.float32)
+        self.assertAlmostEqual(result['number'][1], 1.7, places=5)
+
+    def test_fit_on_row_sample(self):
+        df = pd.DataFrame({'number': np.arange(1000, dtype=float)})
+
+        imputer = transformers.DataFrameImputer(verbose=False, sample_size=10, random_seed=0).fit(df)
+        expected = df.sample(n=10, random_state=0)['number'].mean()
+
+        self.assertAlmostEqual(imputer.fill['number'], expected)
+
 
 class TestDataFrameConvertTargetToBinary(unittest.TestCase):
     def test_does_nothing_on_regression(self):
@@ -172,6 +223,97 @@ class TestDataFrameCreateDummyVariables(unittest.TestCase):
 
         self.assertTrue(result.equals(expected))
 
+    def test_dummies_in_place_match_copied_dummies(self):
+        df = pd.DataFrame({
+            'color': ['red', 'blue', 'green', 'blue'],
+            'aa_outcome': [1, 5, 4, 2],
+            'size': pd.Categorical(['s', 'm', 'l', 's']),
+            'numeric': [1.0, 2.0, 1.0, 3.0],
+        }, columns=['color', 'aa_outcome', 'size', 'numeric'])
+
+        expected = transformers.DataFrameCreateDummyVariables(['aa_outcome']).fit_transform(df)
+        result = transformers.DataFrameCreateDummyVariables(['aa_outcome'], copy=False).fit_transform(df)
+
+        self.assertIs(result, df)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_sparse_dummies_match_dense_dummies(self):
+        df = pd.DataFrame({
+            'color': ['red', 'blue', 'green', 'blue'],
+            'aa_outcome': [1, 5, 4, 2],
+            'numeric': [1.0, 0.0, 1.0, 3.0],
+        }, columns=['color', 'aa_outcome', 'numeric'])
+
+        expected = transformers.DataFrameCreateDummyVariables(['aa_outcome']).fit_transform(df)
+
+        for copy in [True, False]:
+            result = transformers.DataFrameCreateDummyVariables(['aa_outcome'], copy=copy,
+                                                                sparse=True).fit_transform(df.copy())
+
+            # Every column except the excluded outcome is sparse
+            self.assertFalse(isinstance(result['aa_outcome'].dtype, pd.SparseDtype))
+            self.assertTrue(all(isinstance(result[column].dtype, pd.SparseDtype)
+                                for column in result.columns if column != 'aa_outcome'))
+            self.assertListEqual(list(result.columns), list(expected.columns))
+            self.assertTrue(np.allclose(result.drop('aa_outcome', axis=1).sparse.to_dense().values.astype(float),
+                                        expected.drop('aa_outcome', axis=1).values.astype(float)))
+
+    def test_learned_levels_give_every_dataframe_the_same_dummies(self):
+        training_df = pd.DataFrame({'color': ['red', 'blue', 'green'], 'aa_outcome': [1, 5, 4]})
+        # A dataframe with a missing level, an unseen level and an index that isn't a range
+        df = pd.DataFrame({'color': ['blue', 'purple'], 'aa_outcome': [2, 3]}, index=[7, 3])
+
+        for copy in [True, False]:
+            dummies = transformers.DataFrameCreateDummyVariables(['aa_outcome'], copy=copy).fit(training_df)
+            result = dummies.transform(df.copy())
+
+            self.assertListEqual(list(result.columns), ['aa_outcome', 'color.green', 'color.red'])
+            self.assertListEqual(list(result.index), [7, 3])
+            self.assertTrue((result[['color.green', 'color.red']].values == 0).all())
+
+    def test_partial_fit_learns_levels_of_every_chunk(self):
+        dummies = transformers.DataFrameCreateDummyVariables(['aa_outcome'])
+        dummies.partial_fit(pd.DataFrame({'color': ['red', 'blue'], 'aa_outcome': [1, 5]}))
+        dummies.partial_fit(pd.DataFrame({'color': ['green', None], 'aa_outcome': [4, 2]}))
+
+        self.assertListEqual(list(dummies.levels_by_column['color']), ['blue', 'green', 'red'])
+
+
+class TestDataFrameCategoricalEncoder(unittest.TestCase):
+    def setUp(self):
+        self.training_df = pd.DataFrame({
+            'color': ['red', 'blue', None, 'blue'],
+            'size': ['s', 'm', 'l', 's'],
+            'aa_outcome': ['Y', 'N', 'Y', 'N'],
+            'numeric': [1.0, 2.0, 1.0, 3.0],
+        })
+
+    def test_learns_sorted_levels_of_categorical_columns(self):
+        encoder = transformers.DataFrameCategoricalEncoder(excluded_columns=['aa_outcome']).fit(self.training_df)
+
+        self.assertEqual(sorted(encoder.level_index_by_column), ['color', 'size'])
+        self.assertListEqual(list(encoder.level_index_by_column['color']), ['blue', 'red'])
+
+    def test_codes_of_unseen_levels_and_missing_values_are_negative_one(self):
+        encoder = transformers.DataFrameCategoricalEncoder({'color': ['blue', 'red']}).fit()
+        codes = encoder.codes('color', np.array(['red', 'purple', None, 'blue'], dtype=object))
+
+        self.assertListEqual(list(codes), [1, -1, -1, 0])
+        self.assertEqual(encoder.code('color', 'red'), 1)
+        self.assertEqual(encoder.code('color', 'purple'), -1)
+
+    def test_transform_uses_training_levels(self):
+        encoder = transformers.DataFrameCategoricalEncoder(excluded_columns=['aa_outcome']).fit(self.training_df)
+        prediction_df = pd.DataFrame({'color': ['purple', 'red'], 'size': ['m', 'xl'], 'aa_outcome': ['Y', 'N']})
+
+        result = encoder.transform(prediction_df)
+
+        self.assertListEqual(list(result['color'].cat.categories), ['blue', 'red'])
+        self.assertTrue(pd.isnull(result['color'][0]))
+        self.assertEqual(result['color'][1], 'red')
+        self.assertTrue(pd.isnull(result['size'][1]))
+        self.assertEqual(result['aa_outcome'].dtype, object)
+
 
 class TestDataFrameConvertColumnToNumeric(unittest.TestCase):
     def test_integer_strings(self):
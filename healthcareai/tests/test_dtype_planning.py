@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import healthcareai.common.dtype_planning as hcai_dtypes
+
+
+class TestPlanDtypes(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': [1, 2, 3, 4],
+            'big_id': [1, 2, 3, 2 ** 40],
+            'measurement': [98.6, np.nan, 101.2, 99.1],
+            'float_id': [1.0, 2.0, np.nan, 2.0 ** 30],
+            'flag': ['Y', 'N', 'Y', 'Y'],
+            'notes': ['a', 'b', 'c', 'd'],
+            'is_active': [True, False, True, True],
+        })
+
+    def test_plan(self):
+        plan = hcai_dtypes.plan_dtypes(self.df)
+
+        self.assertDictEqual(plan, {'id': np.dtype(np.uint8), 'measurement': np.dtype(np.float32), 'flag': 'category'})
+
+    def test_excluded_columns_are_not_planned(self):
+        plan = hcai_dtypes.plan_dtypes(self.df, excluded_columns=['flag', 'id'])
+
+        self.assertListEqual(list(plan), ['measurement'])
+
+    def test_downcast_keeps_values(self):
+        result = hcai_dtypes.downcast_dtypes(self.df.copy())
+
+        self.assertTrue(np.allclose(result['measurement'], self.df['measurement'], equal_nan=True))
+        self.assertListEqual(list(result['flag']), list(self.df['flag']))
+        self.assertListEqual(list(result['id']), list(self.df['id']))
+        self.assertLess(result.memory_usage(deep=True).sum(), self.df.memory_usage(deep=True).sum())
+
+    def test_plan_only_applies_to_values_that_fit(self):
+        plan = hcai_dtypes.plan_dtypes(self.df)
+        new_df = pd.DataFrame({'id': [1, 300], 'measurement': [98.6, 97.0], 'flag': ['N', None]})
+
+        result = hcai_dtypes.apply_dtype_plan(new_df, plan)
+
+        # 300 overflows the planned uint8
+        self.assertEqual(result['id'].dtype, np.int64)
+        self.assertEqual(result['measurement'].dtype, np.float32)
+        self.assertTrue(pd.api.types.is_categorical_dtype(result['flag']))
+
+
+class TestMergeDtypePlans(unittest.TestCase):
+    def test_plans_are_widened_to_hold_both_chunks(self):
+        plan = {'id': np.dtype(np.uint8), 'measurement': np.dtype(np.float32), 'flag': 'category',
+                'code': 'category'}
+        other_plan = {'id': np.dtype(np.int16), 'measurement': np.dtype(np.float64), 'flag': 'category',
+                      'code': np.dtype('O'), 'count': np.dtype(np.uint8)}
+
+        merged_plan = hcai_dtypes.merge_dtype_plans(plan, other_plan)
+
+        self.assertDictEqual(merged_plan, {'id': np.dtype(np.int16), 'measurement': np.dtype(np.float64),
+                                           'flag': 'category', 'code': np.dtype('O'), 'count': np.dtype(np.uint8)})
+
+
+if __name__ == '__main__':
+    unittest.main()
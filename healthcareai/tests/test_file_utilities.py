@@ -1,4 +1,12 @@
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
+
+import numpy as np
+
+import healthcareai.common.compression as hcai_compression
 import healthcareai.common.file_io_utilities as hcai_io
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
@@ -32,3 +40,71 @@ class TestFileIOUtilities(unittest.TestCase):
 
     def test_load_saved_model_raises_error_on_non_string_filename(self):
         self.assertRaises(HealthcareAIError, hcai_io.load_saved_model, self.bad_filename)
+
+
+class TestCompressedPickles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'object.pkl')
+        self.object = {
+            'name': 'model',
+            'weights': np.arange(100000, dtype=np.float64),
+            'matrix': np.asfortranarray(np.arange(600, dtype=np.int32).reshape(20, 30)),
+            'levels': np.array(['Y', 'N'], dtype=object),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertObjectEqual(self, loaded):
+        self.assertEqual(loaded['name'], self.object['name'])
+        for name in ['weights', 'matrix', 'levels']:
+            self.assertTrue(np.array_equal(loaded[name], self.object[name]))
+            self.assertEqual(loaded[name].dtype, self.object[name].dtype)
+        self.assertTrue(loaded['matrix'].flags.f_contiguous)
+
+    def test_compressed_pickle_round_trip(self):
+        hcai_io.save_object_as_pickle(self.object, self.filename, compression='zlib', n_jobs=2)
+
+        self.assertObjectEqual(hcai_io.load_pickle_file(self.filename, n_jobs=2))
+        self.assertLess(os.path.getsize(self.filename), self.object['weights'].nbytes / 2)
+
+    def test_uncompressed_pickle_is_a_plain_pickle(self):
+        hcai_io.save_object_as_pickle(self.object, self.filename)
+
+        with open(self.filename, 'rb') as open_file:
+            # Protocol 5 pickles start with the PROTO opcode and the protocol number
+            self.assertEqual(open_file.read(2), b'\x80\x05')
+            open_file.seek(0)
+            self.assertObjectEqual(pickle.load(open_file))
+
+    def test_unknown_compression_raises_error(self):
+        self.assertRaises(HealthcareAIError, hcai_io.save_object_as_pickle, self.object, self.filename,
+                          compression='rar')
+
+    @unittest.skipIf(hcai_compression.zstandard_is_loaded, 'zstandard is installed')
+    def test_missing_compression_library_raises_error(self):
+        self.assertRaises(HealthcareAIError, hcai_io.save_object_as_pickle, self.object, self.filename,
+                          compression='zstd')
+
+
+class TestCompression(unittest.TestCase):
+    def test_chunks_round_trip(self):
+        # Spans several chunks, the last one partial
+        data = np.random.RandomState(0).randint(0, 16, size=2 * hcai_compression.CHUNK_BYTES + 1000).astype(np.uint8)
+
+        chunks = hcai_compression.compress_chunks(data, 'zlib', n_jobs=2)
+        block = hcai_compression.decompress_chunks(chunks, 'zlib', data.nbytes, hcai_compression.CHUNK_BYTES, n_jobs=2)
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(bytes(block), data.tobytes())
+
+    def test_chunks_are_read_with_the_chunk_size_they_were_written_with(self):
+        data = np.arange(10000, dtype=np.int64)
+
+        chunks = hcai_compression.compress_chunks(data, 'zlib', chunk_bytes=30000)
+        block = hcai_compression.decompress_chunks(chunks, 'zlib', data.nbytes, 30000)
+
+        self.assertEqual(bytes(block), data.tobytes())
+        self.assertRaises(HealthcareAIError, hcai_compression.decompress_chunks, chunks, 'zlib', data.nbytes, 40000)
+        self.assertRaises(HealthcareAIError, hcai_compression.decompress_chunks, chunks, 'zlib', data.nbytes - 8, 30000)
@@ -0,0 +1,141 @@
+import asyncio
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.micro_batching import AsyncMicroBatcher, MicroBatcher, score_dataframes
+
+
+class DoublingModel(object):
+    """A stand in for a trained supervised model that predicts twice the value of column x."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def make_predictions(self, dataframe):
+        self.calls += 1
+        if 'x' not in dataframe.columns:
+            raise HealthcareAIError('Missing column x')
+        return pd.DataFrame({'Prediction': dataframe['x'].values * 2})
+
+    def make_predictions_with_k_factors(self, dataframe, number_top_features=3):
+        results = pd.DataFrame({'Factor1TXT': ['x'] * len(dataframe)}, index=dataframe.index)
+        results['Prediction'] = dataframe['x'].values * 2
+        return results
+
+
+class TestScoreDataframes(unittest.TestCase):
+    def test_results_are_split_back_per_dataframe(self):
+        model = DoublingModel()
+        dataframes = [pd.DataFrame({'x': [1, 2]}), pd.DataFrame({'x': [3]}), pd.DataFrame({'x': [4, 5, 6]})]
+
+        results = score_dataframes(model, dataframes)
+
+        self.assertEqual(model.calls, 1)
+        self.assertEqual([list(result['Prediction']) for result in results], [[2, 4], [6], [8, 10, 12]])
+        self.assertEqual(list(results[2].index), [0, 1, 2])
+
+    def test_factor_results_keep_the_original_index(self):
+        dataframes = [pd.DataFrame({'x': [1, 2]}, index=[10, 11]), pd.DataFrame({'x': [3]}, index=[7])]
+
+        results = score_dataframes(DoublingModel(), dataframes, number_top_features=1)
+
+        self.assertEqual(list(results[0].index), [10, 11])
+        self.assertEqual(list(results[1].index), [7])
+
+    def test_bad_dataframe_does_not_fail_the_others(self):
+        dataframes = [pd.DataFrame({'x': [1]}), pd.DataFrame({'y': [3]})]
+
+        results = score_dataframes(DoublingModel(), dataframes)
+
+        self.assertEqual(list(results[0]['Prediction']), [2])
+        self.assertIsInstance(results[1], HealthcareAIError)
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.model = DoublingModel()
+        self.batcher = MicroBatcher(self.model, max_wait=0.05)
+
+    def tearDown(self):
+        self.batcher.close()
+
+    def test_concurrent_requests_are_batched(self):
+        futures = [self.batcher.submit(pd.DataFrame({'x': [i]})) for i in range(10)]
+        results = [future.result() for future in futures]
+
+        self.assertEqual([result['Prediction'][0] for result in results], [i * 2 for i in range(10)])
+        self.assertLess(self.batcher.metrics['batches'], 10)
+        self.assertEqual(self.batcher.metrics['rows'], 10)
+
+    def test_errors_are_raised_to_the_caller(self):
+        self.assertRaises(HealthcareAIError, self.batcher.score, pd.DataFrame({'y': [1]}))
+
+    def test_zero_workers_raises_error(self):
+        self.assertRaises(HealthcareAIError, MicroBatcher, self.model, workers=0)
+
+    def test_non_integer_workers_raises_error(self):
+        for workers in [1.5, True]:
+            self.assertRaises(HealthcareAIError, MicroBatcher, self.model, workers=workers)
+
+    def test_numpy_integer_workers(self):
+        batcher = MicroBatcher(self.model, workers=np.int64(2))
+        self.assertEqual(list(batcher.score(pd.DataFrame({'x': [3]}))['Prediction']), [6])
+        batcher.close()
+
+
+class TestAsyncMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.model = DoublingModel()
+        self.batcher = AsyncMicroBatcher(self.model, max_wait=0.05)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def gather(self, *coroutines):
+        async def gather_all():
+            return await asyncio.gather(*coroutines, return_exceptions=True)
+
+        return self.loop.run_until_complete(gather_all())
+
+    def test_concurrent_coroutines_are_scored_in_one_batch(self):
+        results = self.gather(*[self.batcher.score(pd.DataFrame({'x': [i]})) for i in range(10)])
+
+        self.assertEqual([result['Prediction'][0] for result in results], [i * 2 for i in range(10)])
+        self.assertEqual(self.model.calls, 1)
+        self.assertEqual(self.batcher.metrics['batches'], 1)
+
+    def test_factor_and_prediction_requests_in_the_same_batch(self):
+        results = self.gather(self.batcher.score(pd.DataFrame({'x': [1]})),
+                              self.batcher.score(pd.DataFrame({'x': [2]}), number_top_features=1))
+
+        self.assertNotIn('Factor1TXT', results[0].columns)
+        self.assertEqual(list(results[1]['Factor1TXT']), ['x'])
+
+    def test_full_batch_is_scored_without_waiting(self):
+        self.batcher.max_wait = 60
+        self.batcher.max_batch_size = 2
+
+        results = self.gather(*[self.batcher.score(pd.DataFrame({'x': [i]})) for i in range(2)])
+
+        self.assertEqual([result['Prediction'][0] for result in results], [0, 2])
+
+    def test_errors_are_raised_to_the_caller(self):
+        results = self.gather(self.batcher.score(pd.DataFrame({'x': [1]})),
+                              self.batcher.score(pd.DataFrame({'y': [1]})))
+
+        self.assertEqual(list(results[0]['Prediction']), [2])
+        self.assertIsInstance(results[1], HealthcareAIError)
+        self.assertEqual(self.batcher.metrics['errors'], 1)
+
+    def test_finished_scoring_tasks_are_released(self):
+        self.gather(*[self.batcher.score(pd.DataFrame({'x': [i]})) for i in range(3)])
+
+        self.assertEqual(len(self.batcher._tasks), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
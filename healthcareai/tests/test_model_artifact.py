@@ -0,0 +1,175 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import numpy as np
+
+import healthcareai.common.file_io_utilities as hcai_io
+import healthcareai.common.model_artifact as hcai_artifact
+import healthcareai.datasets as hcai_datasets
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.supervised_model_trainer import SupervisedModelTrainer
+
+
+class TestModelArtifact(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dataframe = hcai_datasets.load_diabetes().drop(['PatientID'], axis=1)
+
+        trainer = SupervisedModelTrainer(cls.dataframe, 'ThirtyDayReadmitFLG', 'classification',
+                                         grain_column='PatientEncounterID', verbose=False)
+        cls.trained_forest = trainer._advanced_trainer.random_forest_classifier(trees=20, randomized_search=True)
+        cls.trained_lr = trainer.logistic_regression()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'model.hcai')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _predictions(self, trained_model):
+        return trained_model.make_predictions(self.dataframe)['Prediction'].values
+
+    def test_round_trip(self):
+        self.trained_forest.save(self.filename, debug=False)
+        loaded = hcai_io.load_saved_model(self.filename, debug=False)
+
+        self.assertTrue(np.array_equal(self._predictions(loaded), self._predictions(self.trained_forest)))
+        self.assertTrue(np.array_equal(loaded.test_set_actual, self.trained_forest.test_set_actual))
+        self.assertTrue(np.array_equal(loaded.metrics['roc_thresholds'], self.trained_forest.metrics['roc_thresholds']))
+        # The hyperparameter search is put back together around the best estimator
+        self.assertEqual(type(loaded.model), type(self.trained_forest.model))
+        self.assertIs(loaded.model.best_estimator_, hcai_artifact.hcai_helpers.extract_estimator_from_meta_estimator(
+            loaded.model))
+        self.assertEqual(loaded.best_hyperparameters, self.trained_forest.best_hyperparameters)
+
+    def test_scoring_only_skips_evaluation_payload(self):
+        self.trained_forest.save(self.filename, debug=False)
+        loaded = hcai_io.load_saved_model(self.filename, debug=False, scoring_only=True)
+
+        self.assertTrue(np.array_equal(self._predictions(loaded), self._predictions(self.trained_forest)))
+        self.assertIsNone(loaded.test_set_predictions)
+        self.assertIsNone(loaded.test_set_actual)
+        self.assertNotIn('roc_thresholds', loaded.metrics)
+        self.assertAlmostEqual(loaded.metrics['roc_auc'], self.trained_forest.metrics['roc_auc'])
+        # Only the best estimator of the search is loaded
+        self.assertEqual(type(loaded.model).__name__, 'RandomForestClassifier')
+
+    def test_saving_leaves_model_unchanged(self):
+        model = self.trained_forest.model
+        self.trained_forest.save(self.filename, debug=False)
+
+        self.assertIs(self.trained_forest.model, model)
+        self.assertIsNotNone(self.trained_forest.test_set_predictions)
+
+    def test_arrays_are_stored_outside_the_pickles(self):
+        self.trained_forest.save(self.filename, debug=False)
+
+        with zipfile.ZipFile(self.filename) as archive:
+            manifest = hcai_artifact.read_manifest(archive)
+            scoring_info = archive.getinfo(manifest['sections']['scoring']['arrays'])
+
+        self.assertEqual(manifest['format_version'], hcai_artifact.UNCOMPRESSED_FORMAT_VERSION)
+        self.assertEqual(manifest['algorithm_name'], 'RandomForestClassifier')
+        # At least the node and value arrays of every tree
+        self.assertGreaterEqual(manifest['sections']['scoring']['array_count'], 40)
+        self.assertEqual(scoring_info.compress_type, zipfile.ZIP_STORED)
+
+    def test_memory_mapped_round_trip(self):
+        self.trained_forest.save(self.filename, debug=False)
+        loaded = hcai_io.load_saved_model(self.filename, debug=False, scoring_only=True, memory_map=True)
+
+        self.assertTrue(np.array_equal(self._predictions(loaded), self._predictions(self.trained_forest)))
+
+    def test_memory_mapped_arrays_are_aligned_read_only_views_of_the_file(self):
+        arrays = {'column': np.arange(1000.0), 'matrix': np.asfortranarray(np.random.rand(30, 20)),
+                  'small': np.arange(3)}
+
+        with zipfile.ZipFile(self.filename, 'w') as archive:
+            # Shift the array block off any alignment it would have had by chance
+            archive.writestr('padding', b'abc')
+            section = hcai_artifact._write_section(archive, 'section', arrays)
+        with zipfile.ZipFile(self.filename) as archive:
+            loaded = hcai_artifact._read_section(archive, section, memory_map=True)
+            data_offset = hcai_artifact._data_offset(archive, archive.getinfo(section['arrays']))
+
+        for name, array in arrays.items():
+            self.assertTrue(np.array_equal(loaded[name], array))
+        self.assertTrue(loaded['matrix'].flags.f_contiguous)
+        self.assertEqual(data_offset % hcai_artifact.ARRAY_ALIGNMENT, 0)
+        self.assertFalse(loaded['column'].flags.writeable)
+        self.assertFalse(loaded['column'].flags.owndata)
+
+    def test_compressed_round_trip(self):
+        self.trained_forest.save(self.filename, debug=False, compression='zlib', n_jobs=2)
+        uncompressed_filename = os.path.join(self.directory, 'uncompressed.hcai')
+        self.trained_forest.save(uncompressed_filename, debug=False)
+
+        loaded = hcai_io.load_saved_model(self.filename, debug=False, n_jobs=2)
+        # Compressed artifacts can't be memory-mapped, so they are read instead
+        mapped = hcai_io.load_saved_model(self.filename, debug=False, scoring_only=True, memory_map=True)
+        with zipfile.ZipFile(self.filename) as archive:
+            manifest = hcai_artifact.read_manifest(archive)
+
+        self.assertTrue(np.array_equal(self._predictions(loaded), self._predictions(self.trained_forest)))
+        self.assertTrue(np.array_equal(self._predictions(mapped), self._predictions(self.trained_forest)))
+        self.assertTrue(np.array_equal(loaded.test_set_actual, self.trained_forest.test_set_actual))
+        self.assertEqual(manifest['format_version'], hcai_artifact.ARTIFACT_FORMAT_VERSION)
+        self.assertLess(os.path.getsize(self.filename), os.path.getsize(uncompressed_filename))
+
+    def test_export_for_scoring_makes_the_same_predictions(self):
+        exported = self.trained_forest.export_for_scoring()
+
+        self.assertTrue(np.array_equal(self._predictions(exported), self._predictions(self.trained_forest)))
+        # Factors need the feature model
+        self.assertIs(exported.feature_model, self.trained_forest.feature_model)
+
+    def test_export_for_scoring_drops_the_training_payload(self):
+        exported = self.trained_forest.export_for_scoring()
+
+        self.assertIsNone(exported.test_set_predictions)
+        self.assertIsNone(exported.test_set_actual)
+        self.assertNotIn('roc_thresholds', exported.metrics)
+        self.assertEqual(exported.metrics['roc_auc'], self.trained_forest.metrics['roc_auc'])
+        self.assertIs(exported.model, self.trained_forest.model.best_estimator_)
+        self.assertLess(len(pickle.dumps(exported)), len(pickle.dumps(self.trained_forest)))
+        # The model itself is untouched
+        self.assertIsNotNone(self.trained_forest.test_set_predictions)
+        self.assertIn('roc_thresholds', self.trained_forest.metrics)
+
+    def test_exported_model_raises_error_on_roc(self):
+        exported = self.trained_forest.export_for_scoring()
+
+        self.assertRaises(HealthcareAIError, exported.roc, print_output=False)
+
+    def test_newer_format_version_raises_error(self):
+        self.trained_lr.save(self.filename, debug=False)
+        newer_filename = os.path.join(self.directory, 'newer.hcai')
+
+        with zipfile.ZipFile(self.filename) as archive, zipfile.ZipFile(newer_filename, 'w') as newer:
+            for info in archive.infolist():
+                data = archive.read(info)
+                if info.filename == hcai_artifact.MANIFEST_NAME:
+                    manifest = json.loads(data.decode('utf-8'))
+                    manifest['format_version'] = hcai_artifact.ARTIFACT_FORMAT_VERSION + 1
+                    data = json.dumps(manifest)
+                newer.writestr(info, data)
+
+        self.assertRaises(HealthcareAIError, hcai_io.load_saved_model, newer_filename, debug=False)
+
+    def test_pickled_models_still_load(self):
+        pickle_filename = os.path.join(self.directory, 'model.pkl')
+        hcai_io.save_object_as_pickle(self.trained_lr, pickle_filename)
+
+        loaded = hcai_io.load_saved_model(pickle_filename, debug=False)
+
+        self.assertTrue(np.array_equal(self._predictions(loaded), self._predictions(self.trained_lr)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import unittest
-from healthcareai.common.helpers import calculate_random_forest_mtry_hyperparameter
+
+import numpy as np
+import pandas as pd
+
+from healthcareai.common.helpers import calculate_random_forest_mtry_hyperparameter, iter_dataframe_chunks
 from healthcareai.common.healthcareai_error import HealthcareAIError
 
 
@@ -67,5 +71,30 @@ class TestCalculateRandomForestCalculateMTry(unittest.TestCase):
         self.assertEqual(result, [32, 33, 34])
 
 
+class TestIterDataframeChunks(unittest.TestCase):
+    def setUp(self):
+        self.dataframe = pd.DataFrame({'a': range(10), 'b': range(10, 20)})
+
+    def test_single_dataframe_is_split_into_chunks(self):
+        chunks = list(iter_dataframe_chunks(self.dataframe, chunk_size=4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        self.assertTrue(pd.concat(chunks).equals(self.dataframe))
+
+    def test_no_chunk_size_yields_source_chunks(self):
+        chunks = list(iter_dataframe_chunks([self.dataframe, self.dataframe], chunk_size=None))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10])
+
+    def test_bad_chunk_size_raises_error(self):
+        for chunk_size in [0, -1, 2.5, True, '4']:
+            self.assertRaises(HealthcareAIError, list, iter_dataframe_chunks(self.dataframe, chunk_size=chunk_size))
+
+    def test_numpy_integer_chunk_size(self):
+        chunks = list(iter_dataframe_chunks(self.dataframe, chunk_size=np.int64(4)))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+
+    def test_non_dataframe_chunk_raises_error(self):
+        self.assertRaises(HealthcareAIError, list, iter_dataframe_chunks(['foo'], chunk_size=2))
+
+
 if __name__ == '__main__':
     unittest.main()
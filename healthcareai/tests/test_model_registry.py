@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+import healthcareai.common.file_io_utilities as hcai_io
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def save(self, name, model):
+        filename = os.path.join(self.directory, name)
+        hcai_io.save_object_as_pickle(model, filename)
+        return filename
+
+    def test_model_is_loaded_once(self):
+        filename = self.save('model.pkl', {'weights': [1, 2, 3]})
+        registry = ModelRegistry()
+
+        first = registry.get(filename)
+        second = registry.get(filename)
+
+        self.assertIs(first, second)
+        self.assertEqual(first, {'weights': [1, 2, 3]})
+        self.assertEqual(registry.metrics, {'hits': 1, 'loads': 1, 'reloads': 0, 'evictions': 0})
+
+    def test_changed_file_is_reloaded(self):
+        filename = self.save('model.pkl', {'version': 1})
+        registry = ModelRegistry()
+        registry.get(filename)
+
+        self.save('model.pkl', {'version': 2, 'retrained': True})
+        # Make sure the modification time differs even on file systems with coarse timestamps
+        os.utime(filename, ns=(0, os.stat(filename).st_mtime_ns + 10 ** 9))
+
+        self.assertEqual(registry.get(filename)['version'], 2)
+        self.assertEqual(registry.metrics['reloads'], 1)
+        self.assertEqual(len(registry), 1)
+
+    def test_least_recently_used_model_is_evicted_over_budget(self):
+        filenames = [self.save('model{}.pkl'.format(i), {'weights': [i] * 100}) for i in range(3)]
+        registry = ModelRegistry(max_bytes=2 * os.path.getsize(filenames[0]))
+
+        registry.get(filenames[0])
+        registry.get(filenames[1])
+        # Use the first model again, so the second is the least recently used
+        registry.get(filenames[0])
+        registry.get(filenames[2])
+
+        self.assertIn(filenames[0], registry)
+        self.assertNotIn(filenames[1], registry)
+        self.assertIn(filenames[2], registry)
+        self.assertLessEqual(registry.loaded_bytes, registry.max_bytes)
+        self.assertEqual(registry.metrics['evictions'], 1)
+
+    def test_model_larger_than_budget_is_still_returned(self):
+        filename = self.save('model.pkl', {'weights': list(range(1000))})
+        registry = ModelRegistry(max_bytes=10)
+
+        self.assertEqual(len(registry.get(filename)['weights']), 1000)
+        self.assertIn(filename, registry)
+
+    def test_concurrent_gets_load_once(self):
+        filename = self.save('model.pkl', {'weights': [1, 2, 3]})
+        registry = ModelRegistry()
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(registry.get(filename))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(registry.metrics['loads'], 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_evict_and_clear(self):
+        filenames = [self.save('model{}.pkl'.format(i), {'weights': [i]}) for i in range(2)]
+        registry = ModelRegistry()
+        for filename in filenames:
+            registry.get(filename)
+
+        self.assertTrue(registry.evict(filenames[0]))
+        self.assertFalse(registry.evict(filenames[0]))
+        self.assertEqual(len(registry), 1)
+
+        registry.clear()
+        self.assertEqual(len(registry), 0)
+
+    def test_missing_file_raises_error(self):
+        self.assertRaises(HealthcareAIError, ModelRegistry().get, os.path.join(self.directory, 'missing.pkl'))
+
+    def test_bad_budget_raises_error(self):
+        for max_bytes in [0, 1.5, True]:
+            self.assertRaises(HealthcareAIError, ModelRegistry, max_bytes=max_bytes)
+
+    def test_numpy_integer_budget(self):
+        self.assertEqual(ModelRegistry(max_bytes=np.int64(100)).max_bytes, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import healthcareai.common.parallel_scoring as hcai_parallel
+from healthcareai.common.healthcareai_error import HealthcareAIError
+
+
+class RowCounter(object):
+    """A picklable stand in for a trained model."""
+
+    def count_rows(self, dataframe, offset=0):
+        return pd.DataFrame({'rows': [len(dataframe) + offset]})
+
+
+class TestEffectiveNJobs(unittest.TestCase):
+    def test_none_is_one_job(self):
+        self.assertEqual(hcai_parallel.effective_n_jobs(None), 1)
+
+    def test_positive_n_jobs_are_unchanged(self):
+        self.assertEqual(hcai_parallel.effective_n_jobs(3), 3)
+
+    def test_negative_one_uses_all_cpus(self):
+        self.assertEqual(hcai_parallel.effective_n_jobs(-1), multiprocessing.cpu_count())
+
+    def test_zero_raises_error(self):
+        self.assertRaises(HealthcareAIError, hcai_parallel.effective_n_jobs, 0)
+
+    def test_non_integer_raises_error(self):
+        for n_jobs in ['foo', 2.0, True]:
+            self.assertRaises(HealthcareAIError, hcai_parallel.effective_n_jobs, n_jobs)
+
+    def test_numpy_integer_n_jobs(self):
+        self.assertEqual(hcai_parallel.effective_n_jobs(np.int64(2)), 2)
+
+
+class TestImapOrdered(unittest.TestCase):
+    def test_results_are_in_chunk_order(self):
+        chunks = [pd.DataFrame({'a': range(rows)}) for rows in [5, 1, 4, 2, 3]]
+        results = hcai_parallel.imap_ordered(RowCounter(), 'count_rows', chunks, n_jobs=2,
+                                             method_kwargs={'offset': 10})
+        self.assertEqual([result['rows'][0] for result in results], [15, 11, 14, 12, 13])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+
+from healthcareai.common.parallel_training import FitCandidate, fit_and_evaluate, fit_candidates
+
+
+def make_classification_data(rows=200):
+    random = np.random.RandomState(7)
+    x = pd.DataFrame({'a': random.normal(size=rows), 'b': random.normal(size=rows)})
+    y = pd.Series((x['a'] + random.normal(scale=0.5, size=rows) > 0).astype(int))
+    return x[:150], y[:150], x[150:], y[150:]
+
+
+class TestFitAndEvaluate(unittest.TestCase):
+    def test_classification(self):
+        candidate = fit_and_evaluate(LogisticRegression(), 'classification', *make_classification_data())
+
+        self.assertIsInstance(candidate, FitCandidate)
+        self.assertEqual(candidate.test_set_predictions.shape, (50, 2))
+        self.assertEqual(len(candidate.test_set_class_labels), 50)
+        self.assertIn('roc_auc', candidate.metric_by_name)
+
+    def test_regression(self):
+        x_train, y_train, x_test, y_test = make_classification_data()
+        candidate = fit_and_evaluate(LinearRegression(), 'regression', x_train, x_train['a'], x_test, x_test['a'])
+
+        self.assertIsNone(candidate.test_set_class_labels)
+        self.assertAlmostEqual(candidate.metric_by_name['mean_squared_error'], 0)
+
+
+class TestFitCandidates(unittest.TestCase):
+    def test_concurrent_fits_match_sequential_fits(self):
+        data = make_classification_data()
+        algorithm_by_name = {'KNN': KNeighborsClassifier(), 'Logistic Regression': LogisticRegression()}
+
+        sequential = fit_candidates(algorithm_by_name, 'classification', *data, n_jobs=1)
+        concurrent = fit_candidates(algorithm_by_name, 'classification', *data, n_jobs=2)
+
+        self.assertEqual(set(concurrent.keys()), {'KNN', 'Logistic Regression'})
+        for name in algorithm_by_name:
+            self.assertEqual(sequential[name].metric_by_name['roc_auc'], concurrent[name].metric_by_name['roc_auc'])
+            self.assertTrue(np.array_equal(sequential[name].test_set_predictions,
+                                           concurrent[name].test_set_predictions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+import healthcareai.common.filters as hcai_filters
+import healthcareai.pipelines.data_preparation as hcai_pipelines
+from healthcareai.common.get_categorical_levels import get_categorical_levels
+from healthcareai.common.prediction_plan import compile_prediction_plan
+
+
+class TestPredictionPlan(unittest.TestCase):
+    def setUp(self):
+        self.training_df = pd.DataFrame({
+            'id': [1, 2, 3, 4, 5],
+            'x': [1.0, np.nan, 3.0, 4.0, 7.0],
+            'color': ['red', 'blue', None, 'blue', 'green'],
+            'AdmitDTS': ['2017-01-01'] * 5,
+            'target': ['Y', 'N', 'Y', 'N', 'Y']},
+            columns=['id', 'x', 'color', 'AdmitDTS', 'target'])
+
+        self.pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=True, verbose=False)
+        clean_df = self.pipeline.fit_transform(self.training_df.copy())
+        self.column_names = list(clean_df.drop('target', axis=1).columns)
+        self.categorical_column_info = get_categorical_levels(self.training_df, columns_to_ignore=['id', 'target'])
+
+        self.plan = compile_prediction_plan(self.pipeline, self.column_names, self.training_df.columns.values,
+                                            self.categorical_column_info, 'target')
+
+    def test_plan_compiles_for_full_pipeline(self):
+        self.assertIsNotNone(self.plan)
+
+    def test_plan_is_none_for_custom_pipeline(self):
+        pipeline = Pipeline([('remove_grain_column', hcai_filters.DataframeColumnRemover('id'))])
+        plan = compile_prediction_plan(pipeline, self.column_names, self.training_df.columns.values,
+                                       self.categorical_column_info, 'target')
+        self.assertIsNone(plan)
+
+    def test_plan_transform_columns(self):
+        result = self.plan.transform(self.training_df)
+        self.assertListEqual(list(result.columns), ['x', 'color.green', 'color.red'])
+
+    def test_plan_imputes_and_dummifies(self):
+        prediction_df = pd.DataFrame({
+            'id': [10, 11, 12],
+            'x': [2.0, np.nan, 5.0],
+            'color': ['green', 'purple', None],
+            'AdmitDTS': ['2017-02-01'] * 3},
+            columns=['id', 'x', 'color', 'AdmitDTS'])
+
+        # x is imputed with the training mean (3.75) and color with the training mode ('blue', the dropped level)
+        expected = np.array([[2.0, 1, 0],
+                             [3.75, 0, 0],
+                             [5.0, 0, 0]])
+        result = self.plan.transform(prediction_df)
+
+        self.assertTrue(np.allclose(result.values, expected))
+
+    def test_plan_transform_records_matches_transform(self):
+        records = [
+            {'id': 10, 'x': 2.0, 'color': 'green', 'AdmitDTS': '2017-02-01'},
+            {'id': 11, 'x': None, 'color': 'purple', 'AdmitDTS': '2017-02-01'},
+            {'id': 12, 'x': 5.0, 'color': None, 'AdmitDTS': '2017-02-01'}]
+        expected = self.plan.transform(pd.DataFrame(records)).values
+
+        self.assertTrue(np.allclose(self.plan.transform_records(records), expected))
+
+    def test_plan_transform_records_raises_key_error_on_missing_column(self):
+        self.assertRaises(KeyError, self.plan.transform_records, [{'id': 10, 'x': 2.0}])
+
+    def test_plan_raises_key_error_on_missing_column(self):
+        self.assertRaises(KeyError, self.plan.transform, self.training_df.drop('color', axis=1))
+
+    def test_sparse_plan_matches_sparse_pipeline(self):
+        pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=True, verbose=False,
+                                                sparse=True)
+        pipeline.fit_transform(self.training_df.copy())
+        plan = compile_prediction_plan(pipeline, self.column_names, self.training_df.columns.values,
+                                       self.categorical_column_info, 'target')
+
+        result = plan.transform(self.training_df)
+
+        self.assertTrue(plan.sparse)
+        self.assertTrue(all(isinstance(dtype, pd.SparseDtype) for dtype in result.dtypes))
+        self.assertTrue(np.allclose(result.sparse.to_dense().values, self.plan.transform(self.training_df).values))
+
+    def test_downcast_plan_matches_downcast_pipeline(self):
+        pipeline = hcai_pipelines.full_pipeline('classification', 'target', 'id', impute=True, verbose=False,
+                                                downcast=True)
+        pipeline.fit_transform(self.training_df.copy())
+        plan = compile_prediction_plan(pipeline, self.column_names, self.training_df.columns.values,
+                                       self.categorical_column_info, 'target')
+
+        result = plan.transform(self.training_df)
+        expected = pipeline.transform(self.training_df.copy())[self.column_names]
+
+        self.assertEqual(plan.dtype, np.float32)
+        self.assertEqual(result.values.dtype, np.float32)
+        self.assertTrue(np.array_equal(result.values, expected.values))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.model_selection import RandomizedSearchCV
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.randomized_search import get_algorithm, set_estimator_n_jobs, split_n_jobs
+from healthcareai.common.warm_start_search import WarmStartForestSearchCV
+
+
+class TestSplitNJobs(unittest.TestCase):
+    def test_search_gets_cpus_first(self):
+        self.assertEqual(split_n_jobs(8, 15), (8, 1))
+
+    def test_leftover_cpus_go_to_the_estimator(self):
+        self.assertEqual(split_n_jobs(16, 5), (5, 3))
+
+    def test_single_cpu(self):
+        self.assertEqual(split_n_jobs(1, 15), (1, 1))
+
+    def test_total_never_exceeds_n_jobs(self):
+        for n_jobs in range(1, 33):
+            for number_of_fits in range(1, 40):
+                search_n_jobs, estimator_n_jobs = split_n_jobs(n_jobs, number_of_fits)
+                self.assertLessEqual(search_n_jobs * estimator_n_jobs, n_jobs)
+
+
+class TestGetAlgorithmNJobs(unittest.TestCase):
+    def test_estimator_gets_all_cpus_without_search(self):
+        algorithm = get_algorithm(RandomForestClassifier, 'roc_auc', {}, False, n_jobs=4, n_estimators=10)
+
+        self.assertEqual(algorithm.n_jobs, 4)
+        self.assertEqual(algorithm.n_estimators, 10)
+
+    def test_search_and_estimator_share_cpus(self):
+        algorithm = get_algorithm(RandomForestClassifier, 'roc_auc', {'max_features': [1, 2]}, True,
+                                  number_iteration_samples=2, n_jobs=64)
+
+        self.assertIsInstance(algorithm, RandomizedSearchCV)
+        self.assertLessEqual(algorithm.n_jobs * algorithm.estimator.n_jobs, 64)
+        self.assertGreater(algorithm.estimator.n_jobs, 1)
+
+    def test_estimator_without_n_jobs(self):
+        algorithm = get_algorithm(LogisticRegression, 'roc_auc', {'C': [1, 10]}, True, number_iteration_samples=2,
+                                  n_jobs=2)
+
+        self.assertEqual(algorithm.n_jobs, 2)
+
+    def test_defaults_to_one_cpu(self):
+        algorithm = get_algorithm(KNeighborsClassifier, 'roc_auc', {'n_neighbors': [5, 6]}, True,
+                                  number_iteration_samples=2)
+
+        self.assertEqual(algorithm.n_jobs, 1)
+        self.assertEqual(algorithm.estimator.n_jobs, 1)
+
+    def test_bad_n_jobs_raises_error(self):
+        self.assertRaises(HealthcareAIError, get_algorithm, LinearRegression, 'r2', {}, False, n_jobs=0)
+
+
+class TestGetAlgorithmHalvingSearch(unittest.TestCase):
+    def test_forest_budget_is_trees(self):
+        algorithm = get_algorithm(RandomForestClassifier, 'roc_auc', {'n_estimators': [10, 90], 'max_features': [1, 2]},
+                                  True, number_iteration_samples=2, search_strategy='halving')
+
+        self.assertEqual(algorithm.resource, 'n_estimators')
+        self.assertEqual(algorithm.max_resources, 90)
+        self.assertNotIn('n_estimators', algorithm.param_distributions)
+        self.assertEqual(algorithm.n_candidates, 6)
+
+    def test_other_budget_is_rows(self):
+        algorithm = get_algorithm(KNeighborsClassifier, 'roc_auc', {'n_neighbors': [5, 6]}, True,
+                                  number_iteration_samples=2, search_strategy='halving')
+
+        self.assertEqual(algorithm.resource, 'n_samples')
+
+    def test_fit_finds_best_estimator(self):
+        x, y = make_classification(n_samples=300, n_features=4, random_state=0)
+        algorithm = get_algorithm(RandomForestClassifier, 'roc_auc', {'n_estimators': [9, 27], 'max_features': [1, 2]},
+                                  True, number_iteration_samples=2, search_strategy='halving')
+        algorithm.fit(x, y)
+
+        self.assertEqual(algorithm.best_estimator_.n_estimators, 27)
+
+
+class TestGetAlgorithmWarmStartSearch(unittest.TestCase):
+    def test_forest_gets_all_cpus(self):
+        algorithm = get_algorithm(RandomForestClassifier, 'roc_auc', {'n_estimators': [10, 20]}, True,
+                                  search_strategy='warm_start', n_jobs=4)
+
+        self.assertIsInstance(algorithm, WarmStartForestSearchCV)
+        self.assertEqual(algorithm.estimator.n_jobs, 4)
+
+    def test_non_forest_raises_error(self):
+        self.assertRaises(HealthcareAIError, get_algorithm, LogisticRegression, 'roc_auc', {'C': [1, 10]}, True,
+                          search_strategy='warm_start')
+
+
+class TestGetAlgorithmSearchStrategy(unittest.TestCase):
+    def test_bad_search_strategy_raises_error(self):
+        self.assertRaises(HealthcareAIError, get_algorithm, LinearRegression, 'r2', {}, True,
+                          search_strategy='grid')
+
+
+class TestSetEstimatorNJobs(unittest.TestCase):
+    def test_sets_estimator_n_jobs(self):
+        estimator = RandomForestClassifier(n_jobs=-1)
+        set_estimator_n_jobs(estimator, 1)
+        self.assertEqual(estimator.n_jobs, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
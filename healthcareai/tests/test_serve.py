@@ -0,0 +1,82 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+from healthcareai.serve import create_server
+from healthcareai.tests.test_micro_batching import DoublingModel
+
+
+class ServableDoublingModel(DoublingModel):
+    algorithm_name = 'Doubling'
+    model_type = 'regression'
+    grain_column = None
+    prediction_column = 'y'
+
+
+class TestScoringServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = create_server(ServableDoublingModel(), port=0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.batcher.close()
+
+    def post(self, path, body, content_type='application/json', accept='application/json'):
+        request = urllib.request.Request(self.url + path, data=body.encode('utf-8'),
+                                         headers={'Content-Type': content_type, 'Accept': accept})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8')
+
+    def test_health(self):
+        with urllib.request.urlopen(self.url + '/health') as response:
+            self.assertEqual(json.loads(response.read().decode('utf-8'))['status'], 'ok')
+
+    def test_metrics(self):
+        with urllib.request.urlopen(self.url + '/metrics') as response:
+            self.assertIn('batches', json.loads(response.read().decode('utf-8')))
+
+    def test_predict_json(self):
+        status, body = self.post('/predict', json.dumps([{'x': 1}, {'x': 2}]))
+        self.assertEqual(status, 200)
+        self.assertEqual([record['Prediction'] for record in json.loads(body)], [2, 4])
+
+    def test_predict_with_factors_json(self):
+        status, body = self.post('/predict_with_factors?k=1', json.dumps({'records': [{'x': 3}]}))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), [{'Factor1TXT': 'x', 'Prediction': 6}])
+
+    def test_predict_csv(self):
+        csv = pd.DataFrame({'x': [1, 5]}).to_csv(index=False)
+        status, body = self.post('/predict', csv, content_type='text/csv', accept='text/csv')
+        self.assertEqual(status, 200)
+        self.assertEqual(body.split(), ['Prediction', '2', '10'])
+
+    def test_bad_request_returns_400(self):
+        status, _ = self.post('/predict', json.dumps([{'y': 1}]))
+        self.assertEqual(status, 400)
+
+    def test_bad_number_of_factors_returns_400(self):
+        for k in ['0', '-2', 'three']:
+            status, body = self.post('/predict_with_factors?k={}'.format(k), json.dumps([{'x': 3}]))
+            self.assertEqual(status, 400)
+            self.assertIn('positive integer', body)
+
+    def test_unknown_endpoint_returns_404(self):
+        status, _ = self.post('/foo', '[]')
+        self.assertEqual(status, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
 import pandas as pd
 import numpy as np
+import scipy.sparse
+from sklearn.linear_model import LinearRegression
 
+import healthcareai.common.top_factors as hcai_factors
 from healthcareai.common.healthcareai_error import HealthcareAIError
 from healthcareai.supervised_model_trainer import SupervisedModelTrainer
 
@@ -107,5 +110,57 @@ class TestTopFactors(unittest.TestCase):
         self.assertTrue(result.equals(expected))
 
 
+class TestTopKIndices(unittest.TestCase):
+    def test_top_k_indices_are_sorted_descending(self):
+        contributions = np.array([[0.1, 0.5, 0.3, 0.9],
+                                  [4.0, 1.0, 3.0, 2.0]])
+        expected = np.array([[3, 1, 2],
+                             [0, 2, 3]])
+        self.assertTrue(np.array_equal(hcai_factors.top_k_indices(contributions, 3), expected))
+
+    def test_top_k_indices_break_ties_by_column_order(self):
+        contributions = np.array([[0, 1, 0, 1, 0],
+                                  [0, 0, 0, 0, 0]])
+        expected = np.array([[1, 3, 0],
+                             [0, 1, 2]])
+        self.assertTrue(np.array_equal(hcai_factors.top_k_indices(contributions, 3), expected))
+
+    def test_top_k_indices_matches_full_sort(self):
+        np.random.seed(42)
+        contributions = np.abs(np.random.normal(size=(100, 20)))
+        expected = np.argsort(-contributions, axis=1)[:, :4]
+        self.assertTrue(np.array_equal(hcai_factors.top_k_indices(contributions, 4), expected))
+        np.random.seed()
+
+    def test_sparse_top_k_indices_match_dense(self):
+        np.random.seed(42)
+        contributions = np.random.choice([0, 0, 0, 1, 2.5], size=(100, 12))
+        sparse_contributions = scipy.sparse.csr_matrix(contributions)
+        np.random.seed()
+
+        for k in [1, 3, 12]:
+            self.assertTrue(np.array_equal(hcai_factors.top_k_indices_sparse(sparse_contributions, k),
+                                           hcai_factors.top_k_indices(contributions, k)))
+
+    def test_sparse_dataframe_factors_match_dense(self):
+        dense = pd.DataFrame({'a': [1.0, 0, 0, 2], 'b': [0, 1.0, 0, 0], 'c': [0, 0, 0, 3.0]})
+        sparse = dense.astype(pd.SparseDtype(np.float64, 0))
+        linear_model = LinearRegression().fit(dense, [1.0, 2.0, 0.5, 4.0])
+
+        expected = hcai_factors.top_k_features(dense, linear_model, k=2)
+        result = hcai_factors.top_k_features(sparse, linear_model, k=2)
+
+        self.assertEqual([list(row) for row in result], [list(row) for row in expected])
+
+    def test_zero_factors_are_empty(self):
+        dense = pd.DataFrame({'a': [1.0, 0, 0, 2], 'b': [0, 1.0, 0, 0], 'c': [0, 0, 0, 3.0]})
+        sparse = dense.astype(pd.SparseDtype(np.float64, 0))
+        linear_model = LinearRegression().fit(dense, [1.0, 2.0, 0.5, 4.0])
+
+        for dataframe in [dense, sparse]:
+            result = hcai_factors.top_k_features(dataframe, linear_model, k=0)
+            self.assertEqual([list(row) for row in result], [[], [], [], []])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -78,6 +78,38 @@ class TestTrainedSupervisedModel(unittest.TestCase):
         results = self.predictions_with_3_factors.columns.values
         self.assertTrue(set(expected) == set(results))
 
+    def test_predictions_with_factors_match_predictions_and_factors(self):
+        factor_columns = ['Factor1TXT', 'Factor2TXT', 'Factor3TXT']
+        self.assertListEqual(list(self.predictions_with_3_factors['Prediction']), list(self.predictions['Prediction']))
+        self.assertTrue(self.predictions_with_3_factors[factor_columns].equals(self.factors[factor_columns]))
+
+    def test_iter_predictions_matches_predictions(self):
+        chunks = list(self.trained_linear_model.iter_predictions(self.prediction_df, chunk_size=300))
+        self.assertEqual(len(chunks), 4)
+        self.assertListEqual(list(pd.concat(chunks)['Prediction']), list(self.predictions['Prediction']))
+
+    def test_iter_predictions_raises_error_on_non_method_generator(self):
+        self.assertRaises(HealthcareAIError, list, self.trained_linear_model.iter_predictions(self.prediction_df,
+                                                                                                prediction_generator='foo'))
+
+    def test_parallel_predictions_with_factors_match_serial(self):
+        parallel_results = self.trained_linear_model.make_predictions_with_k_factors(self.prediction_df, n_jobs=2)
+        self.assertTrue(parallel_results.equals(self.predictions_with_3_factors))
+
+    def test_score_records_match_predictions_with_factors(self):
+        records = self.prediction_df.to_dict('records')
+        results = pd.DataFrame(self.trained_linear_model.score_records(records, number_top_features=3))
+        expected = self.predictions_with_3_factors.reset_index(drop=True)
+        self.assertTrue(results[expected.columns].equals(expected))
+
+    def test_score_record_returns_dict(self):
+        record = self.prediction_df.to_dict('records')[0]
+        result = self.trained_linear_model.score_record(record)
+        self.assertListEqual(sorted(result.keys()), ['PatientEncounterID', 'Prediction'])
+
+    def test_score_record_raises_error_on_missing_column(self):
+        self.assertRaises(HealthcareAIError, self.trained_linear_model.score_record, {'A1CNBR': 5.0})
+
     def test_original_with_predictions_factors_return_is_dataframe(self):
         self.assertIsInstance(self.original_with_predictions_3_factors, pd.DataFrame)
 
@@ -132,5 +164,36 @@ class TestTrainedSupervisedModel(unittest.TestCase):
                           bad_list)
 
 
+class TestParallelScoring(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        training_df = hcai_datasets.load_diabetes()
+        training_df.drop(['PatientID'], axis=1, inplace=True)
+
+        trainer = SupervisedModelTrainer(training_df, 'SystolicBPNBR', 'regression', impute=True,
+                                         grain_column='PatientEncounterID')
+        cls.trained_linear_model = trainer.linear_regression()
+
+        # Shuffle the rows so the index is neither sorted nor starting at 0
+        cls.prediction_df = training_df.sample(frac=1, random_state=42)
+
+    def test_parallel_predictions_are_identical_to_serial(self):
+        serial = self.trained_linear_model.make_predictions(self.prediction_df, n_jobs=1)
+        parallel = self.trained_linear_model.make_predictions(self.prediction_df, n_jobs=2)
+
+        pd.testing.assert_frame_equal(parallel, serial)
+
+
+class TestUnpickling(unittest.TestCase):
+    def test_models_saved_with_a_private_feature_model_still_load(self):
+        state = {'_feature_model': 'factor model', '_factor_model_trainer': None}
+        tsm = healthcareai.trained_models.trained_supervised_model.TrainedSupervisedModel.__new__(
+            healthcareai.trained_models.trained_supervised_model.TrainedSupervisedModel)
+        tsm.__setstate__(state)
+
+        self.assertEqual(tsm.feature_model, 'factor model')
+        self.assertNotIn('_factor_model_trainer', tsm.__dict__)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+from sklearn.datasets import make_classification, make_regression
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.model_selection import cross_val_score
+
+from healthcareai.common.healthcareai_error import HealthcareAIError
+from healthcareai.common.warm_start_search import WarmStartForestSearchCV
+
+
+class TestWarmStartForestSearchCV(unittest.TestCase):
+    def setUp(self):
+        self.x, self.y = make_classification(n_samples=300, n_features=6, random_state=0)
+
+    def test_checkpoint_scores_match_forests_trained_from_scratch(self):
+        search = WarmStartForestSearchCV(RandomForestClassifier(random_state=3),
+                                         {'n_estimators': [20, 5, 10], 'max_features': [2, 4]},
+                                         scoring='roc_auc',
+                                         cv=3)
+        search.fit(self.x, self.y)
+
+        self.assertEqual(len(search.cv_results_['params']), 6)
+        for params, score in zip(search.cv_results_['params'], search.cv_results_['mean_test_score']):
+            scratch_scores = cross_val_score(RandomForestClassifier(random_state=3, **params), self.x, self.y,
+                                             scoring='roc_auc', cv=3)
+            self.assertAlmostEqual(score, np.mean(scratch_scores))
+
+    def test_best_estimator_is_refit_without_warm_start(self):
+        search = WarmStartForestSearchCV(RandomForestClassifier(), {'n_estimators': [5, 10]}, scoring='roc_auc', cv=3)
+        search.fit(self.x, self.y)
+
+        self.assertEqual(search.best_estimator_.n_estimators, search.best_params_['n_estimators'])
+        self.assertFalse(search.best_estimator_.warm_start)
+        self.assertEqual(search.predict_proba(self.x).shape, (300, 2))
+        self.assertEqual(list(search.classes_), [0, 1])
+
+    def test_regression(self):
+        x, y = make_regression(n_samples=200, n_features=4, random_state=0)
+        search = WarmStartForestSearchCV(RandomForestRegressor(), {'n_estimators': [5, 10]},
+                                         scoring='neg_mean_squared_error', cv=3)
+        search.fit(x, y)
+
+        self.assertEqual(len(search.predict(x)), 200)
+
+    def test_more_combinations_than_n_iter_are_sampled(self):
+        search = WarmStartForestSearchCV(RandomForestClassifier(), {'n_estimators': [5], 'max_features': [1, 2, 3, 4]},
+                                         scoring='roc_auc', n_iter=2, cv=3)
+        search.fit(self.x, self.y)
+
+        self.assertEqual(len(search.cv_results_['params']), 2)
+
+    def test_missing_n_estimators_raises_error(self):
+        search = WarmStartForestSearchCV(RandomForestClassifier(), {'max_features': [1, 2]}, scoring='roc_auc')
+        self.assertRaises(HealthcareAIError, search.fit, self.x, self.y)
+
+
+if __name__ == '__main__':
+    unittest.main()
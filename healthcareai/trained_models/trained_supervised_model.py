@@ -1,4 +1,5 @@
 """A Trained Supervised Model."""
+import math
 import time
 from datetime import datetime
 
@@ -6,10 +7,13 @@ import numpy as np
 import pandas as pd
 
 import healthcareai.common.database_writers
-import healthcareai.common.file_io_utilities as hcai_io
 import healthcareai.common.helpers as hcai_helpers
+import healthcareai.common.model_artifact as hcai_artifact
 import healthcareai.common.model_eval as hcai_model_evaluation
+import healthcareai.common.parallel_scoring as hcai_parallel
+import healthcareai.common.prediction_plan as hcai_plan
 import healthcareai.common.top_factors as hcai_factors
+import healthcareai.common.transformers as hcai_transformers
 import healthcareai.common.database_connections as hcai_db
 import healthcareai.common.database_validators as hcai_dbval
 from healthcareai.common.healthcareai_error import HealthcareAIError
@@ -49,7 +53,7 @@ class TrainedSupervisedModel(object):
         
         Args:
             model (sklearn.base.BaseEstimator): The fit scikit learn algorithm for prediction
-            feature_model (sklearn.base.BaseEstimator): The fit scikit learn algorithm for feature importance 
+            feature_model (sklearn.base.BaseEstimator): The fit scikit learn algorithm for feature importance
             fit_pipeline (sklearn.pipeline.Pipeline): A fit pipeline for use on cleaning new raw data 
             model_type (str): 'classification' or 'regression'
             column_names (list): List of column names used as features
@@ -81,6 +85,14 @@ class TrainedSupervisedModel(object):
         self.categorical_column_info = categorical_column_info
         self.train_time = training_time
 
+    def __setstate__(self, state):
+        """Restore a pickled model, including models saved while the feature model was stored as _feature_model."""
+        if '_feature_model' in state:
+            state['feature_model'] = state.pop('_feature_model')
+        state.pop('_factor_model_trainer', None)
+
+        self.__dict__.update(state)
+
     @property
     def algorithm_name(self):
         """Model name extracted from the class type."""
@@ -124,6 +136,7 @@ class TrainedSupervisedModel(object):
         if self.is_regression:
             raise HealthcareAIError('ROC/PR plots are not used to evaluate regression models.')
 
+        self.validate_evaluation_results()
         predictions = np.squeeze(self.test_set_predictions[:, 1])
 
         return predictions
@@ -133,46 +146,152 @@ class TrainedSupervisedModel(object):
         """Return the metrics that were calculated when the model was trained."""
         return self._metric_by_name
 
-    def save(self, filename=None, debug=True):
+    def save(self, filename=None, debug=True, compression=None, n_jobs=1):
         """
-        Save this object to a pickle file with the given file name.
+        Save this object to a model artifact with the given file name.
+
+        The artifact (see `healthcareai.common.model_artifact`) stores the scoring objects separately from the
+        evaluation payload (test set predictions, ROC/PR curves and hyperparameter search results), so scoring jobs
+        can load just what they need with `load_saved_model(filename, scoring_only=True)`.
         
         Args:
-            filename (str): Optional filename override. Defaults to `timestamp_<MODEL_TYPE>_<ALGORITHM_NAME>.pkl`. For
-                example: `2017-05-27T09-12-30_regression_LinearRegression.pkl`
+            filename (str): Optional filename override. Defaults to `timestamp_<MODEL_TYPE>_<ALGORITHM_NAME>.hcai`.
+                For example: `2017-05-27T09-12-30_regression_LinearRegression.hcai`
             debug (bool): Print debug output to console by default
+            compression (str): Optional compression: 'zlib', 'lz4' or 'zstd'. Compressed models are smaller to move
+                between environments, but can't be memory-mapped when they are loaded.
+            n_jobs (int): The number of threads compressing. -1 uses all CPUs.
         """
         if filename is None:
             time_string = time.strftime("%Y-%m-%dT%H-%M-%S")
-            filename = '{}_{}_{}.pkl'.format(time_string, self.model_type, self.algorithm_name)
+            filename = '{}_{}_{}.hcai'.format(time_string, self.model_type, self.algorithm_name)
 
-        hcai_io.save_object_as_pickle(self, filename)
+        hcai_artifact.save_model_artifact(self, filename, compression=compression, n_jobs=n_jobs)
 
         if debug:
             print('Trained {} model saved as {}'.format(self.algorithm_name, filename))
 
-    def make_predictions(self, dataframe):
+    def export_for_scoring(self):
+        """
+        Return a slim copy of this model that only holds what making predictions and factors needs.
+
+        The copy leaves out the training time payload: the test set predictions and actuals, the ROC and PR curves
+        (only the scalar metrics are kept) and the hyperparameter search, of which only the best estimator is kept.
+        It makes the same predictions and factors as this model and is faster to load and cheaper to ship to scoring
+        hosts, whether it is pickled or saved with `.save()`. This model is not changed.
+
+        Returns:
+            TrainedSupervisedModel: The slim copy
+        """
+        return hcai_artifact.scoring_copy(self)
+
+    def make_predictions(self, dataframe, n_jobs=1):
         """
         Given a new dataframe, apply data transformations and return a dataframe of predictions.
 
         Args:
             dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
+            n_jobs (int): Number of worker processes to split the rows across. Defaults to 1 (no parallelism). Use -1
+                for all CPUs.
 
         Returns:
             pandas.core.frame.DataFrame: A dataframe containing the grain id and predicted values
         """
+        if hcai_parallel.effective_n_jobs(n_jobs) > 1:
+            return self._score_in_parallel('make_predictions', dataframe, n_jobs, keep_index=False)
+
+        y_predictions, _ = self._score(dataframe)
+
+        return self._predictions_dataframe(dataframe, y_predictions)
+
+    def _score(self, dataframe, number_top_features=None, predict=True):
+        """
+        Run the raw dataframe through the preparation process once and score the prepared data.
+
+        This is the single scoring path used by all the prediction methods so that the (expensive) data preparation
+        pipeline only runs once per dataframe, regardless of whether predictions, factors or both are needed.
+
+        Args:
+            dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
+            number_top_features (int): Number of top features per row. Factors are not calculated if None.
+            predict (bool): False to only calculate the factors
+
+        Returns:
+            tuple: The predictions (numpy.ndarray, or None if not requested) and the top features (list, or None if
+                not requested)
+        """
         # Run the raw dataframe through the preparation process
         prepared_dataframe = self.prepare_and_subset(dataframe)
 
+        y_predictions = None
+        if predict:
+            y_predictions = self._predict_prepared(prepared_dataframe)
+
+        top_features = None
+        if number_top_features is not None:
+            # Get a 2 dimensional list of all the factors
+            top_features = hcai_factors.top_k_features(prepared_dataframe, self.feature_model, k=number_top_features)
+
+        # Verify that the number of predictions matches the number of rows in the original dataframe.
+        if any(results is not None and len(results) != len(dataframe) for results in [y_predictions, top_features]):
+            raise HealthcareAIError('Warning! The number of predictions does not match the number of rows.')
+
+        return y_predictions, top_features
+
+    def _score_in_parallel(self, method_name, dataframe, n_jobs, keep_index, **method_kwargs):
+        """
+        Shard the rows of a dataframe across worker processes and reassemble the results in the original order.
+
+        Note that on platforms that spawn new processes (such as Windows) the calling script must be protected with
+        an `if __name__ == '__main__':` block.
+
+        Args:
+            method_name (str): The name of the prediction method each worker runs on its shard
+            dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
+            n_jobs (int): Number of worker processes
+            keep_index (bool): True if the prediction method returns results indexed like the dataframe, False if it
+                returns results indexed from 0. The reassembled results are indexed the same way.
+            **method_kwargs: Keyword arguments for the prediction method
+
+        Returns:
+            pandas.core.frame.DataFrame: The concatenated results of each shard
+        """
+        n_jobs = hcai_parallel.effective_n_jobs(n_jobs)
+        chunk_size = max(int(math.ceil(len(dataframe) / n_jobs)), 1)
+        chunks = hcai_helpers.iter_dataframe_chunks(dataframe, chunk_size=chunk_size)
+
+        results = pd.concat(list(hcai_parallel.imap_ordered(self, method_name, chunks, n_jobs, method_kwargs)))
+
+        # Index the results as if the whole dataframe was scored at once
+        if keep_index:
+            results.index = dataframe.index
+        else:
+            results.reset_index(drop=True, inplace=True)
+
+        return results
+
+    def _predict_prepared(self, prepared_dataframe):
+        """
+        Make predictions on data that has already been run through the preparation pipeline.
+
+        Args:
+            prepared_dataframe (pandas.core.frame.DataFrame): Prepared and subsetted prediction data
+
+        Returns:
+            numpy.ndarray: The probability of the positive class for classification or the predicted values for
+            regression
+        """
         # make predictions returning probabity of a class or value of regression
         if self.is_classification:
             # Only save the prediction of one of the two classes
-            y_predictions = self.model.predict_proba(prepared_dataframe)[:, 1]
+            return self.model.predict_proba(prepared_dataframe)[:, 1]
         elif self.is_regression:
-            y_predictions = self.model.predict(prepared_dataframe)
+            return self.model.predict(prepared_dataframe)
         else:
             raise HealthcareAIError('Model type appears to be neither regression or classification.')
 
+    def _predictions_dataframe(self, dataframe, y_predictions):
+        """Build the grain and prediction dataframe returned by `make_predictions`."""
         # Create a new dataframe with the grain column from the original dataframe
         results = pd.DataFrame()
 
@@ -184,6 +303,143 @@ class TrainedSupervisedModel(object):
 
         return results
 
+    def _factors_dataframe(self, dataframe, top_features, number_top_features):
+        """Build the grain and factors dataframe returned by `make_factors`."""
+        # Create a new dataframe. If grain column exists, add the grain 
+        # column from the original dataframe; otherwise, 
+        # just create a new empty dataframe. 
+        if self.grain_column is not None: 
+            results = dataframe[[self.grain_column]] 
+        else: 
+            results = pd.DataFrame() 
+
+        # Create a list of column names
+        reason_col_names = ['Factor{}TXT'.format(i) for i in range(1, number_top_features + 1)]
+
+        # Create a dataframe from the column names and top features
+        reasons_df = pd.DataFrame(top_features, columns=reason_col_names, index=dataframe.index)
+
+        # Join the top features and results dataframes
+        results = pd.concat([results, reasons_df], axis=1).reindex(dataframe.index)
+        # results.set_index(keys=self.grain_column, inplace=True)
+
+        return results
+
+    def score_record(self, record, number_top_features=None):
+        """
+        Score a single raw record with as little overhead as possible.
+
+        This is intended for real time scoring (for example when an ADT event arrives) where building a one row
+        dataframe and running it through pandas would cost far more than the model itself.
+
+        Args:
+            record (dict): A mapping of the raw column names to values
+            number_top_features (int): Optional number of top features to include. Factors are skipped if None.
+
+        Returns:
+            dict: The grain id (if there is a grain column), the factors (if requested) and the prediction
+        """
+        return self.score_records([record], number_top_features=number_top_features)[0]
+
+    def score_records(self, records, number_top_features=None):
+        """
+        Score a list of raw records with as little overhead as possible.
+
+        The records are encoded straight into the model's feature matrix using the precomputed imputation values and
+        dummy variable column indices of the prediction plan, skipping dataframe construction and the pandas pipeline.
+
+        Args:
+            records (list): Dictionaries mapping the raw column names to values
+            number_top_features (int): Optional number of top features to include. Factors are skipped if None.
+
+        Returns:
+            list: A dictionary per record containing the grain id (if there is a grain column), the factors (if
+            requested) and the prediction
+        """
+        records = list(records)
+        plan = self.prediction_plan
+
+        if plan is None:
+            # A custom pipeline can only run on a dataframe
+            dataframe = pd.DataFrame(records)
+            if number_top_features is None:
+                return self.make_predictions(dataframe).to_dict('records')
+            return self.make_predictions_with_k_factors(dataframe, number_top_features).to_dict('records')
+
+        try:
+            matrix = plan.transform_records(records)
+        except KeyError as ke:
+            found_columns = list(records[0].keys()) if len(records) > 0 else []
+            raise self._missing_columns_error(found_columns, ke)
+
+        if np.isnan(matrix).any():
+            raise HealthcareAIError('One or more records contain null values in a column that was entirely null in '
+                                    'the training data, so they cannot be imputed or scored.')
+
+        y_predictions = self._predict_prepared(matrix)
+
+        top_features = None
+        if number_top_features is not None:
+            top_features = hcai_factors.top_k_features_from_array(matrix, plan.column_names, self.feature_model,
+                                                                  k=number_top_features)
+
+        results = []
+        for row, record in enumerate(records):
+            result = {}
+            if self.grain_column is not None:
+                result[self.grain_column] = record.get(self.grain_column)
+            if top_features is not None:
+                for i, factor in enumerate(top_features[row], start=1):
+                    result['Factor{}TXT'.format(i)] = factor
+            result['Prediction'] = float(y_predictions[row])
+            results.append(result)
+
+        return results
+
+    def iter_predictions(self, source, chunk_size=None, prediction_generator=None, n_jobs=1):
+        """
+        Score an iterable of dataframes chunk by chunk, yielding the results for each chunk.
+
+        Only one chunk (plus its prepared copy) is held in memory at a time, so arbitrarily large prediction
+        populations can be scored. For example:
+
+            chunks = pd.read_csv('encounters.csv', chunksize=50000)
+            for results in trained_model.iter_predictions(chunks, prediction_generator=trained_model.make_factors):
+                ...
+
+        Args:
+            source (pandas.core.frame.DataFrame or iterable): A raw prediction dataframe or an iterable of them, such
+                as the readers returned by `pandas.read_csv(..., chunksize=...)` or `pandas.read_sql(...,
+                chunksize=...)`
+            chunk_size (int): Optional maximum number of rows to score at a time. Larger source chunks are split.
+            prediction_generator (method): One of the trained supervised model prediction methods (for example
+                `make_predictions_with_k_factors` or `create_catalyst_dataframe`). Defaults to `make_predictions`.
+            n_jobs (int): Number of worker processes that score chunks concurrently. Defaults to 1 (no parallelism).
+                Use -1 for all CPUs. Results are still yielded in the original chunk order.
+
+        Returns:
+            generator: A dataframe of results for each chunk, in the same format the prediction generator returns
+        """
+        if prediction_generator is None:
+            prediction_generator = self.make_predictions
+
+        # validate inputs
+        if type(prediction_generator).__name__ != 'method':
+            raise HealthcareAIError(
+                'Use of this method requires a prediction generator from a trained supervised model')
+
+        chunks = hcai_helpers.iter_dataframe_chunks(source, chunk_size=chunk_size)
+
+        if hcai_parallel.effective_n_jobs(n_jobs) > 1:
+            # Workers hold their own copy of this model, so only the method name can be sent to them
+            if prediction_generator.__self__ is not self:
+                raise HealthcareAIError('Parallel scoring requires a prediction generator from this trained model')
+            for results in hcai_parallel.imap_ordered(self, prediction_generator.__name__, chunks, n_jobs):
+                yield results
+        else:
+            for chunk in chunks:
+                yield prediction_generator(chunk)
+
     def prepare_and_subset(self, dataframe):
         """
         Prepare and subset the raw data using the pipeline saved during training.
@@ -193,6 +449,10 @@ class TrainedSupervisedModel(object):
         
         This prevents any unexpected changes to incoming columns from interfering with the predictions.
 
+        When the saved pipeline is the standard data preparation pipeline it is compiled once into a
+        `PredictionPlan` that produces the same values without replaying each pipeline step on intermediate
+        dataframes.
+
         Args:
             dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
 
@@ -208,24 +468,19 @@ class TrainedSupervisedModel(object):
            dataframe[self.prediction_column] = np.NaN
 
         try:
+            if self.prediction_plan is not None:
+                return self.prediction_plan.transform(dataframe)
+
             # Raise an error here if any of the columns the model expects are not in the prediction dataframe
             df2 = dataframe.copy()
             if self.original_column_names is not None:
                 df2 = df2[self.original_column_names]
 
             # Change the dtype of the categorical columns in the prediction dataframe to 'category' with levels
-            # determined by the training data before running the data preparation pipeline
-            if self.categorical_column_info is not None:
-                for column in self.categorical_column_info:
-                    col_categories = self.categorical_column_info[column].index
-                    df2[column] = df2[column].astype('category', categories=col_categories)
-                    # Check whether the prediction data contains categories not present in the training set and print
-                    # a message warning that these new values will be dropped and imputed
-                    new_values = {v for v in dataframe[column].unique() if not (v in col_categories or pd.isnull(v))}
-                    if len(new_values) > 0:
-                        category_message = """Column {} contains levels not seen in the training set. These levels have
-                        been removed and will be imputed or the corresponding rows dropped.\nNew levels: {}"""
-                        print(category_message.format(column, new_values))
+            # determined by the training data before running the data preparation pipeline. Levels not present in the
+            # training set are reported and become missing values that will be imputed.
+            if self.categorical_encoder is not None:
+                df2 = self.categorical_encoder.transform(df2)
 
             # Run the saved data preparation pipeline
             prepared_dataframe = self.fit_pipeline.transform(df2)
@@ -233,12 +488,17 @@ class TrainedSupervisedModel(object):
             # Subset the dataframe to only columns that were saved from the original model training
             prepared_dataframe = prepared_dataframe[self.column_names]
         except KeyError as ke:
-            required_columns = self.column_names
-            found_columns = list(dataframe.columns)
-            # If a pre-dummified dataset is expected as the input, list the pre-dummified columns instead of the dummies
-            if not self.original_column_names is None:
-                required_columns = self.original_column_names
-            error_message = """One or more of the columns that the saved trained model needs is not in the dataframe.\n
+            raise self._missing_columns_error(list(dataframe.columns), ke)
+
+        return prepared_dataframe
+
+    def _missing_columns_error(self, found_columns, key_error):
+        """Build a helpful HealthcareAIError listing the required columns when some are missing from new data."""
+        required_columns = self.column_names
+        # If a pre-dummified dataset is expected as the input, list the pre-dummified columns instead of the dummies
+        if not self.original_column_names is None:
+            required_columns = self.original_column_names
+        error_message = """One or more of the columns that the saved trained model needs is not in the dataframe.\n
             Please compare these lists to see which field(s) is/are missing. Note that you can pass in extra fields,\n
             which will be ignored, but you must pass in all the required fields.\n
             
@@ -247,53 +507,64 @@ class TrainedSupervisedModel(object):
             Given fields: {}
             
             Likely missing field(s): {}
-            """.format(required_columns, found_columns, ke)
-            raise HealthcareAIError(error_message)
+            """.format(required_columns, found_columns, key_error)
 
-        return prepared_dataframe
+        return HealthcareAIError(error_message)
 
-    def make_factors(self, dataframe, number_top_features=3):
+    @property
+    def prediction_plan(self):
+        """
+        The fit pipeline compiled into a PredictionPlan, or None if the pipeline can't be compiled.
+
+        The plan is compiled the first time it is needed, which also covers models saved before plans existed.
+        """
+        if not hasattr(self, '_prediction_plan'):
+            self._prediction_plan = hcai_plan.compile_prediction_plan(
+                self.fit_pipeline,
+                self.column_names,
+                self.original_column_names,
+                self.categorical_column_info,
+                self.prediction_column)
+
+        return self._prediction_plan
+
+    @property
+    def categorical_encoder(self):
+        """
+        A DataFrameCategoricalEncoder fit with the training levels of the categorical columns, or None if unknown.
+
+        The encoder is built the first time it is needed, which also covers models saved before encoders existed.
+        """
+        if not hasattr(self, '_categorical_encoder'):
+            self._categorical_encoder = None
+            if self.categorical_column_info is not None:
+                self._categorical_encoder = hcai_transformers.DataFrameCategoricalEncoder(
+                    self.categorical_column_info).fit()
+
+        return self._categorical_encoder
+
+    def make_factors(self, dataframe, number_top_features=3, n_jobs=1):
         """
         Given a prediction dataframe, build and return a list of the top k features in dataframe format.
         
         Args:
             dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
             number_top_features (int): Number of top features per row
+            n_jobs (int): Number of worker processes to split the rows across. Defaults to 1 (no parallelism). Use -1
+                for all CPUs.
 
         Returns:
             pandas.core.frame.DataFrame:  A dataframe containing the grain id and factors
         """
-        # Run the raw dataframe through the preparation process
-        prepared_dataframe = self.prepare_and_subset(dataframe)
-
-        # Create a new dataframe. If grain column exists, add the grain 
-        # column from the original dataframe; otherwise, 
-        # just create a new empty dataframe. 
-        if self.grain_column is not None: 
-            results = dataframe[[self.grain_column]] 
-        else: 
-            results = pd.DataFrame() 
-
-        # Create a list of column names
-        reason_col_names = ['Factor{}TXT'.format(i) for i in range(1, number_top_features + 1)]
-
-        # Get a 2 dimensional list of all the factors
-        top_features = hcai_factors.top_k_features(prepared_dataframe, self.feature_model, k=number_top_features)
-
-        # Verify that the number of factors matches the number of rows in the original dataframe.
-        if len(top_features) != len(dataframe):
-            raise HealthcareAIError('Warning! The number of predictions does not match the number of rows.')
+        if hcai_parallel.effective_n_jobs(n_jobs) > 1:
+            return self._score_in_parallel('make_factors', dataframe, n_jobs, keep_index=True,
+                                           number_top_features=number_top_features)
 
-        # Create a dataframe from the column names and top features
-        reasons_df = pd.DataFrame(top_features, columns=reason_col_names, index=dataframe.index)
+        _, top_features = self._score(dataframe, number_top_features=number_top_features, predict=False)
 
-        # Join the top features and results dataframes
-        results = pd.concat([results, reasons_df], axis=1, join_axes=[dataframe.index])
-        # results.set_index(keys=self.grain_column, inplace=True)
+        return self._factors_dataframe(dataframe, top_features, number_top_features)
 
-        return results
-
-    def make_predictions_with_k_factors(self, dataframe, number_top_features=3):
+    def make_predictions_with_k_factors(self, dataframe, number_top_features=3, n_jobs=1):
         """
         Create a datarrame with predictions and factors.
 
@@ -303,21 +574,22 @@ class TrainedSupervisedModel(object):
         Args:
             dataframe (pandas.core.frame.DataFrame): Raw prediction dataframe
             number_top_features (int): Number of top features per row
+            n_jobs (int): Number of worker processes to split the rows across. Defaults to 1 (no parallelism). Use -1
+                for all CPUs.
 
         Returns:
             pandas.core.frame.DataFrame: Predictions with factors and grain column
         """
-        # TODO Note this is inefficient since we are running the raw dataframe through the pipeline twice. Consider
-        # Get the factors and predictions
-        results = self.make_factors(dataframe, number_top_features=number_top_features)
-        predictions = self.make_predictions(dataframe)
+        if hcai_parallel.effective_n_jobs(n_jobs) > 1:
+            return self._score_in_parallel('make_predictions_with_k_factors', dataframe, n_jobs, keep_index=True,
+                                           number_top_features=number_top_features)
 
-        # Verify that the number of predictions matches the number of rows in the original dataframe.
-        if len(predictions) != len(dataframe):
-            raise HealthcareAIError('Warning! The number of predictions does not match the number of rows.')
+        # Get the factors and predictions from a single pass through the pipeline
+        y_predictions, top_features = self._score(dataframe, number_top_features=number_top_features)
+        results = self._factors_dataframe(dataframe, top_features, number_top_features)
 
         # Add predictions column to dataframe
-        results['Prediction'] = predictions['Prediction'].values
+        results['Prediction'] = y_predictions
 
         return results
 
@@ -335,7 +607,6 @@ class TrainedSupervisedModel(object):
         Returns:
             pandas.core.frame.DataFrame:  
         """
-        # TODO Note this is inefficient since we are running the raw dataframe through the pipeline twice.
         # Get the factors and predictions
         results = self.make_predictions_with_k_factors(dataframe, number_top_features=number_top_features)
 
@@ -456,6 +727,7 @@ class TrainedSupervisedModel(object):
             dict: A subset of TrainedSupervisedModel.metrics() that are ROC specific
         """
         self.validate_classification()
+        self.validate_evaluation_results()
         metrics = self._metric_by_name
         roc = {
             'roc_auc': metrics['roc_auc'],
@@ -512,6 +784,7 @@ class TrainedSupervisedModel(object):
             dict: A subset of TrainedSupervisedModel.metrics() that are PR specific
         """
         self.validate_classification()
+        self.validate_evaluation_results()
         metrics = self._metric_by_name
         pr = {
             'pr_auc': metrics['pr_auc'],
@@ -558,6 +831,16 @@ class TrainedSupervisedModel(object):
         if self.model_type != 'classification':
             raise HealthcareAIError('This function only runs on a binary classification model.')
 
+    def validate_evaluation_results(self):
+        """
+        Validate that a model still has its test set results and raise an error if it does not.
+
+        Models exported for scoring (or loaded with `scoring_only=True`) only keep the scalar metrics.
+        """
+        if self.test_set_predictions is None:
+            raise HealthcareAIError('This model was exported or loaded for scoring only, so it has no test set results '
+                                    'or ROC/PR curves. Please use the full saved model.')
+
     def print_training_results(self):
         """
         Print metrics, stats and hyperparameters of a trained supervised model.
@@ -30,15 +30,21 @@ setup(name='healthcareai',
       packages=find_packages(),
       install_requires=[
           'matplotlib>=1.5.3',
-          'numpy>=1.11.2',
-          'pandas>=0.20.0',
+          # Protocol 5 pickling of arrays (with out of band buffers) needs numpy 1.16
+          'numpy>=1.16.0',
+          # SparseDtype and DataFrame.sparse need pandas 0.25
+          'pandas>=0.25.0',
           'tabulate==0.7.7',
           # 'pyodbc>=3.0.10',
-          'scipy>=0.18.1',
-          'scikit-learn>=0.18',
-          'imbalanced-learn>=0.2.1',
+          'scipy>=0.19.1',
+          # The halving search strategy needs scikit-learn 0.24
+          'scikit-learn>=0.24',
+          # The first imbalanced-learn that supports scikit-learn 0.24
+          'imbalanced-learn>=0.7.0',
           'sqlalchemy>=1.1.5', 'sklearn'
       ],
+      # Saved models use pickle protocol 5
+      python_requires='>=3.8',
       package_data={
           'examples': ['*.py', '*.ipynb']
       },
@@ -54,12 +60,12 @@ setup(name='healthcareai',
           "Intended Audience :: Developers",
           "Operating System :: OS Independent",
           "License :: OSI Approved :: MIT License",
-          "Programming Language :: Python :: 2.7",
           "Programming Language :: Python :: 3",
-          "Programming Language :: Python :: 3.2",
-          "Programming Language :: Python :: 3.3",
-          "Programming Language :: Python :: 3.4",
-          "Programming Language :: Python :: 3.5",
+          "Programming Language :: Python :: 3 :: Only",
+          "Programming Language :: Python :: 3.8",
+          "Programming Language :: Python :: 3.9",
+          "Programming Language :: Python :: 3.10",
+          "Programming Language :: Python :: 3.11",
           "Topic :: Scientific/Engineering :: Artificial Intelligence",
           "Topic :: Scientific/Engineering :: Information Analysis",
           "Topic :: Software Development :: Libraries :: Python Modules",